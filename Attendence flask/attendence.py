@@ -1,243 +1,3550 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session
+from flask import Flask, Blueprint, current_app, render_template, request, redirect, url_for, flash, stream_with_context, jsonify, g
+from jinja2 import FileSystemBytecodeCache
+from werkzeug.http import is_resource_modified
+from werkzeug.local import LocalProxy
+import click
 import os
-from datetime import datetime
+import atexit
+from datetime import datetime, timezone
 import json
+import logging
+import mmap
+import re
+import shutil
+import sqlite3
 import csv
+import codecs
+import functools
+import gzip
+import inspect
+import struct
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter, OrderedDict
+from collections.abc import Mapping
+from contextlib import contextmanager
 from io import StringIO
+from itertools import islice
+from operator import lt
 
-class EnhancedAttendanceSystem:
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+log = logging.getLogger(__name__)
+
+# NumPy is optional and slow to import, so the analytics mode imports it on first use
+numpy = None
+_numpy_checked = False
+
+def _import_numpy():
+    """Import NumPy once if it is installed; the analytics mode otherwise uses one bytearray per matrix row."""
+    global numpy, _numpy_checked
+    if not _numpy_checked:
+        _numpy_checked = True
+        try:
+            import numpy as module
+        except ImportError:
+            module = None
+        numpy = module
+    return numpy
+
+class ReadWriteLock:
+    """Reentrant readers-writer lock: any number of readers, or a single writer.
+    
+    Waiting writers block new readers so a steady stream of page views cannot starve
+    a mutation. The writing thread may also take the read side (nested calls), but a
+    reader cannot upgrade to a writer.
+    """
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = None  # ident of the thread holding the write side
+        self._writer_depth = 0
+        self._waiting_writers = 0
+        self._local = threading.local()
+    
+    @contextmanager
+    def reading(self):
+        """Hold the shared side of the lock for the duration of a with block."""
+        local = self._local
+        depth = getattr(local, 'read_depth', 0)
+        counted = False
+        if not depth and self._writer != threading.get_ident():
+            with self._cond:
+                while self._writer is not None or self._waiting_writers:
+                    self._cond.wait()
+                self._readers += 1
+            counted = True
+        local.read_depth = depth + 1
+        try:
+            yield
+        finally:
+            local.read_depth = depth
+            if counted:
+                with self._cond:
+                    self._readers -= 1
+                    if not self._readers:
+                        self._cond.notify_all()
+    
+    @contextmanager
+    def writing(self):
+        """Hold the exclusive side of the lock for the duration of a with block."""
+        me = threading.get_ident()
+        if self._writer == me:
+            self._writer_depth += 1
+        else:
+            with self._cond:
+                self._waiting_writers += 1
+                while self._readers or self._writer is not None:
+                    self._cond.wait()
+                self._waiting_writers -= 1
+                self._writer = me
+                self._writer_depth = 1
+        try:
+            yield
+        finally:
+            self._writer_depth -= 1
+            if not self._writer_depth:
+                with self._cond:
+                    self._writer = None
+                    self._cond.notify_all()
+
+class FileLock:
+    """Advisory inter-process lock held on "<filename>.lock" for the duration of a with block.
+    
+    Shared locks let several readers catch up at once; Windows only supports the
+    exclusive kind, so shared requests are exclusive there.
+    """
+    def __init__(self, filename, shared: bool = False):
+        self.path = f"{filename}.lock"
+        self.shared = shared
+        self._file = None
+    
+    def __enter__(self):
+        self._file = open(self.path, 'a+')
+        if fcntl:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_SH if self.shared else fcntl.LOCK_EX)
+        else:
+            self._file.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue  # LK_LOCK gives up after ten seconds; keep waiting
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        if fcntl:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        else:
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        self._file.close()
+        self._file = None
+
+class ResultCache:
+    """Thread-safe LRU cache of computed results, each stamped with the data version it was built from.
+    
+    A lookup only hits when the stored stamp equals the caller's current one, so bumping a
+    version is enough to invalidate every entry built from it.
+    """
+    def __init__(self, maxsize: int = 32):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (stamp, value), least recently used first
+        self._lock = threading.Lock()
+    
+    def get(self, key, stamp):
+        """Return the value cached under key for this stamp, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != stamp:
+                if entry is not None:
+                    del self._entries[key]  # Built from older data; it can never hit again
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+    
+    def put(self, key, stamp, value):
+        """Cache a value, evicting the least recently used entries beyond maxsize."""
+        with self._lock:
+            self._entries[key] = (stamp, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        """Drop every cached result."""
+        with self._lock:
+            self._entries.clear()
+
+class WriteBehind:
+    """Background writer that coalesces an engine's changes into periodic durable flushes.
+    
+    Mutations only call notify(). The thread flushes once interval seconds have passed
+    since the oldest unwritten change, or straight away when batch_size changes are
+    waiting, and stop() writes out whatever is left.
+    """
+    def __init__(self, engine, filename: str, interval: float = 1.0, batch_size: int = 100):
+        self.engine = engine
+        self.filename = filename
+        self.interval = interval
+        self.batch_size = batch_size
+        self.flushes = 0
+        self.last_flush = None  # Wall-clock time of the last successful flush
+        self.last_error = None  # What made the last flush fail, until one succeeds
+        self._flushed_version = engine.data_version  # Engine data_version on disk
+        self._dirty_since = None  # Monotonic time of the oldest unwritten change
+        self._wake = threading.Condition()
+        self._flushing = threading.Lock()
+        self._stopping = False
+        self._thread = None
+    
+    def start(self):
+        """Start the writer thread."""
+        self._thread = threading.Thread(target=self._run, name='attendance-write-behind', daemon=True)
+        self._thread.start()
+    
+    def notify(self):
+        """Note a change; called with the engine lock held, after data_version moved."""
+        with self._wake:
+            if self._dirty_since is None:
+                self._dirty_since = time.monotonic()
+                self._wake.notify()  # Start the interval clock
+            elif self.pending() >= self.batch_size:
+                self._wake.notify()
+    
+    def synced(self):
+        """Note that memory matches the file again, as after a load."""
+        with self._wake:
+            self._flushed_version = self.engine.data_version
+            self._dirty_since = None
+    
+    def pending(self):
+        """Number of changes made but not yet written."""
+        return self.engine.data_version - self._flushed_version
+    
+    def _due(self):
+        """Whether a flush should start now (condition held)."""
+        if self._dirty_since is None:
+            return False
+        return self.pending() >= self.batch_size or time.monotonic() - self._dirty_since >= self.interval
+    
+    def _run(self):
+        while True:
+            with self._wake:
+                while not self._stopping and not self._due():
+                    timeout = None
+                    if self._dirty_since is not None:
+                        timeout = self._dirty_since + self.interval - time.monotonic()
+                    self._wake.wait(timeout)
+                if self._stopping:
+                    return  # stop() does the final flush itself
+            try:
+                self.flush()
+            except Exception:
+                # Already in last_error; keep the changes and try again an interval later
+                with self._wake:
+                    self._wake.wait(self.interval)
+    
+    def flush(self):
+        """Write out every change made so far; returns False if there was nothing to write."""
+        with self._flushing:
+            # The version check and clearing the dirty mark happen under the condition, so
+            # a change notified meanwhile either gets written now or marks itself again
+            with self._wake:
+                if not self.pending():
+                    self._dirty_since = None
+                    return False
+            try:
+                version = self.engine.flush(self.filename)
+            except Exception as exc:
+                self.last_error = exc
+                raise
+            with self._wake:
+                self._flushed_version = version
+                if not self.pending():
+                    self._dirty_since = None
+            self.flushes += 1
+            self.last_flush = time.time()
+            self.last_error = None
+            return True
+    
+    def stop(self):
+        """Stop the thread and write out the remaining changes."""
+        with self._wake:
+            self._stopping = True
+            self._wake.notify()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+    
+    def status(self):
+        """Describe the writer and how far the file lags behind memory."""
+        with self._wake:
+            dirty_since = self._dirty_since
+            pending = self.pending()
+        return {
+            'mode': 'write-behind',
+            'file': self.filename,
+            'interval': self.interval,
+            'batch_size': self.batch_size,
+            'running': self._thread is not None and self._thread.is_alive(),
+            'pending_changes': pending,
+            'lag_seconds': time.monotonic() - dirty_since if pending and dirty_since is not None else 0.0,
+            'flushes': self.flushes,
+            'last_flush': datetime.fromtimestamp(self.last_flush).isoformat() if self.last_flush else None,
+            'last_error': str(self.last_error) if self.last_error else None
+        }
+
+class Metrics:
+    """Thread-safe latency histograms and counters, rendered in the Prometheus text format.
+    
+    Recording an observation is one bisect and two additions under a lock, so it can stay on
+    around every engine call and request; a scrape only formats what has been counted.
+    """
+    # Upper bounds of the latency buckets, in seconds
+    BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+    DESCRIPTIONS = {
+        'attendance_http_request_duration_seconds': ('histogram', 'Time to handle a request, by route.'),
+        'attendance_engine_call_duration_seconds': ('histogram', 'Time spent in an attendance system method, lock waits included.'),
+        'attendance_save_duration_seconds': ('histogram', 'Time to write a snapshot or append to the journal.'),
+        'attendance_save_bytes_total': ('counter', 'Bytes written to snapshots and the journal.'),
+        'attendance_ready': ('gauge', 'Whether the data has finished loading.'),
+        'attendance_students': ('gauge', 'Number of students.'),
+        'attendance_courses': ('gauge', 'Number of courses.'),
+        'attendance_marks': ('gauge', 'Number of attendance marks, general and per course.'),
+    }
+    
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._histograms = {}  # (name, labels) -> [count per bucket..., count above the last, sum]
+        self._counters = {}  # (name, labels) -> value
+        self._lock = threading.Lock()
+    
+    def observe(self, name: str, labels: tuple, seconds: float):
+        """Add an observation to a histogram; labels is a tuple of (label, value) pairs."""
+        index = bisect_left(self.BUCKETS, seconds)
+        with self._lock:
+            counts = self._histograms.get((name, labels))
+            if counts is None:
+                counts = self._histograms[(name, labels)] = [0] * (len(self.BUCKETS) + 1) + [0.0]
+            counts[index] += 1
+            counts[-1] += seconds
+    
+    def inc(self, name: str, labels: tuple, amount: float = 1):
+        """Add to a counter."""
+        with self._lock:
+            self._counters[(name, labels)] = self._counters.get((name, labels), 0) + amount
+    
+    def reset(self):
+        """Forget every observation."""
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+    
+    @staticmethod
+    def _labels(labels, extra=()):
+        """Format label pairs as {a="1",b="2"}, escaped as the text format requires."""
+        pairs = []
+        for key, value in (*labels, *extra):
+            value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+            pairs.append(f'{key}="{value}"')
+        return '{' + ','.join(pairs) + '}' if pairs else ''
+    
+    def render(self, gauges=()):
+        """Return every metric in the Prometheus text format; gauges is a list of (name, labels, value)."""
+        with self._lock:
+            histograms = {key: list(counts) for key, counts in self._histograms.items()}
+            counters = dict(self._counters)
+        samples = {}  # name -> lines, so each metric's HELP/TYPE header is written once
+        for (name, labels), counts in sorted(histograms.items()):
+            lines = samples.setdefault(name, [])
+            cumulative = 0
+            for bound, count in zip((*self.BUCKETS, '+Inf'), counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{self._labels(labels, (('le', bound),))} {cumulative}")
+            lines.append(f"{name}_sum{self._labels(labels)} {counts[-1]!r}")
+            lines.append(f"{name}_count{self._labels(labels)} {cumulative}")
+        for (name, labels), value in sorted(counters.items()):
+            samples.setdefault(name, []).append(f"{name}{self._labels(labels)} {value}")
+        for name, labels, value in gauges:
+            samples.setdefault(name, []).append(f"{name}{self._labels(labels)} {value}")
+        output = []
+        for name, lines in samples.items():
+            kind, text = self.DESCRIPTIONS.get(name, ('untyped', ''))
+            output.append(f"# HELP {name} {text}")
+            output.append(f"# TYPE {name} {kind}")
+            output.extend(lines)
+        return '\n'.join(output) + '\n'
+
+# The metrics of the app handling the current request; create_app() keeps them in
+# app.extensions and hands them to its engine, which also records outside requests
+metrics = LocalProxy(lambda: current_app.extensions['attendance_metrics'])
+
+def _timed(method):
+    """Record each call of an engine method in the latency histogram of the engine's metrics."""
+    labels = (('method', method.__name__),)
+    
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        metrics = self.metrics
+        if metrics is None or not metrics.enabled:
+            return method(self, *args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            metrics.observe('attendance_engine_call_duration_seconds', labels, time.perf_counter() - start)
+    return wrapper
+
+def _instrumented(cls):
+    """Class decorator: time every public method the class defines.
+    
+    Generators are left alone, since a call only creates them.
+    """
+    for name, member in list(vars(cls).items()):
+        if (not name.startswith('_') and inspect.isfunction(member)
+                and not inspect.isgeneratorfunction(inspect.unwrap(member))):
+            setattr(cls, name, _timed(member))
+    return cls
+
+def _reads(method):
+    """Run an engine method under the shared side of the engine lock."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock.reading():
+            return method(self, *args, **kwargs)
+    return wrapper
+
+def _exclusive(method):
+    """Run an engine method under the exclusive side of the engine lock."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock.writing():
+            return method(self, *args, **kwargs)
+    return wrapper
+
+def _mutation(method):
+    """Run a mutating engine method exclusively.
+    
+    When the engine is attached to a data file, the change is made under the
+    inter-process file lock: first catch up with what other processes wrote,
+    then apply the change and write it out before the lock is released. In
+    write-behind mode the change is only queued for the writer thread.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock.writing():
+            if self.write_behind is not None and not self._replaying:
+                # Leave the change queued for the write-behind thread
+                version = self.data_version
+                result = method(self, *args, **kwargs)
+                if self.data_version != version:
+                    self.write_behind.notify()
+                return result
+            if self._data_file is None or self._syncing or self._replaying:
+                return method(self, *args, **kwargs)
+            self._syncing = True
+            try:
+                with FileLock(self._data_file):
+                    self._catch_up()
+                    version = self.data_version
+                    result = method(self, *args, **kwargs)
+                    if self.data_version != version:
+                        self._flush_pending(self._data_file)
+            finally:
+                self._syncing = False
+            return result
+    return wrapper
+
+# Dates as the date inputs send them; only these can be ordered and queried by range
+_ISO_DATE = re.compile(r'\d{4}-\d{2}-\d{2}\Z')
+
+# Status code -> status, in the order of EnhancedAttendanceSystem.STATUSES; statuses
+# found in older data files are appended as they are met
+_STATUS_NAMES = ["Present", "Absent", "Late", "Excused"]
+_STATUS_CODES = {status: code for code, status in enumerate(_STATUS_NAMES)}
+
+# Every YYYY-MM-DD date seen, both ways, so each is parsed once and its string shared
+_DAYS = {}  # date -> ordinal
+_DATES = {}  # ordinal -> date
+
+def _parse_day(date):
+    """Return the ordinal of a YYYY-MM-DD date, or 0 for any other value, without caching it.
+    
+    Used for dates from query arguments, which must not grow the tables above.
+    """
+    day = _DAYS.get(date)
+    if day is None:
+        try:
+            day = datetime.fromisoformat(date).toordinal() if _ISO_DATE.match(date) else 0
+        except (TypeError, ValueError):
+            day = 0
+    return day
+
+def _to_day(date):
+    """Return the ordinal of a YYYY-MM-DD date, or 0 for any other value."""
+    day = _DAYS.get(date)
+    if day is None:
+        day = _parse_day(date)
+        if day:
+            _DAYS[date] = day
+            _DATES[day] = date
+    return day
+
+def _to_date(day):
+    """Return the YYYY-MM-DD string of an ordinal."""
+    date = _DATES.get(day)
+    if date is None:
+        date = datetime.fromordinal(day).strftime('%Y-%m-%d')
+        _DAYS[date] = day
+        _DATES[day] = date
+    return date
+
+def _status_code(status):
+    """Return the small int code of a status."""
+    code = _STATUS_CODES.get(status)
+    if code is None:
+        code = _STATUS_CODES[status] = len(_STATUS_NAMES)
+        _STATUS_NAMES.append(status)
+    return code
+
+class MarkColumn(Mapping):
+    """One register of a student's marks, read and written like the {date: status} dict it replaces.
+    
+    Marks are parallel arrays kept in date order, int32 day ordinals and int8 status codes,
+    so a mark costs 5 bytes. Dates that are not YYYY-MM-DD have no ordinal and go in a
+    side dict: they still count, but never match a date range. A column loaded from a
+    binary snapshot leaves its arrays in the mapped file until they are first used.
+    Readers share the engine lock, so any of them may read such a column in meanwhile:
+    methods copy _source to a local once and only look at that.
+    """
+    __slots__ = ('days', 'codes', 'other', '_source')
+    
+    def __init__(self, marks=None):
+        self.other = None  # {date: code} for dates without an ordinal
+        self._source = None  # (_MappedMarks, start, stop) until a mapped column is read in
+        if not marks:
+            self.days = array('i')
+            self.codes = array('b')
+            return
+        known_day, known_code = _DAYS.get, _STATUS_CODES.get
+        days = [known_day(date) or _to_day(date) for date in marks]
+        codes = [known_code(status) if status in _STATUS_CODES else _status_code(status) for status in marks.values()]
+        if 0 in days:
+            for date, day, code in zip(marks, days, codes):
+                if not day:
+                    self.other = self.other or {}
+                    self.other[date] = code
+            dated = [(day, code) for day, code in zip(days, codes) if day]
+            days, codes = [day for day, code in dated], [code for day, code in dated]
+        if not all(map(lt, days, islice(days, 1, None))):
+            dated = sorted(zip(days, codes))
+            days, codes = [day for day, code in dated], [code for day, code in dated]
+        self.days = array('i', days)
+        self.codes = array('b', codes)
+    
+    @classmethod
+    def mapped(cls, marks, start: int, stop: int):
+        """Return a column backed by marks start:stop of a mapped snapshot, read in on first use."""
+        column = cls.__new__(cls)
+        column.other = None
+        column._source = (marks, start, stop)
+        return column
+    
+    def __getattr__(self, name):
+        # Only reached for unset slots: the arrays of a mapped column not read in yet
+        if name in ('days', 'codes') and self._source is not None:
+            self.materialise()
+            return getattr(self, name)
+        raise AttributeError(name)
+    
+    def materialise(self):
+        """Copy a mapped column's marks out of the snapshot; a no-op for any other column."""
+        source = self._source
+        if source is not None:
+            marks, start, stop = source
+            self.days, self.codes = marks.read(start, stop)
+            self._source = None
+    
+    def raw(self):
+        """Return (day bytes, status code bytes) in this machine's layout, without reading a mapped column in."""
+        source = self._source
+        if source is not None:
+            marks, start, stop = source
+            return marks.raw(start, stop)
+        return self.days.tobytes(), self.codes.tobytes()
+    
+    def _set_other(self, date, status):
+        """Store a mark whose date has no ordinal."""
+        if self.other is None:
+            self.other = {}
+        self.other[date] = _status_code(status)
+    
+    def _find(self, day):
+        """Return (position of day in the columns, whether it is there)."""
+        i = bisect_left(self.days, day)
+        return i, i < len(self.days) and self.days[i] == day
+    
+    def __getitem__(self, date):
+        day = _parse_day(date)
+        if day:
+            i, found = self._find(day)
+            if found:
+                return _STATUS_NAMES[self.codes[i]]
+        elif self.other and date in self.other:
+            return _STATUS_NAMES[self.other[date]]
+        raise KeyError(date)
+    
+    def __setitem__(self, date, status):
+        day = _to_day(date)
+        if not day:
+            self._set_other(date, status)
+            return
+        code = _status_code(status)
+        days = self.days
+        if not days or days[-1] < day:  # Marks usually arrive in date order
+            days.append(day)
+            self.codes.append(code)
+            return
+        i, found = self._find(day)
+        if found:
+            self.codes[i] = code
+        else:
+            days.insert(i, day)
+            self.codes.insert(i, code)
+    
+    def __contains__(self, date):
+        day = _parse_day(date)
+        if day:
+            return self._find(day)[1]
+        return bool(self.other) and date in self.other
+    
+    def get(self, date, default=None):
+        try:
+            return self[date]
+        except KeyError:
+            return default
+    
+    def __len__(self):
+        source = self._source
+        if source is not None:
+            dated = source[2] - source[1]
+        else:
+            dated = len(self.days)
+        return dated + (len(self.other) if self.other else 0)
+    
+    def __iter__(self):
+        for day in self.days:
+            yield _to_date(day)
+        if self.other:
+            yield from self.other
+    
+    def items(self):
+        """Return (date, status) pairs, dated marks in date order first."""
+        return list(self.as_dict().items())
+    
+    def as_dict(self):
+        """Return the marks as a plain {date: status} dict, dated marks in date order first."""
+        known = _DATES.get
+        marks = dict(zip([known(day) or _to_date(day) for day in self.days], map(_STATUS_NAMES.__getitem__, self.codes)))
+        if self.other:
+            marks.update((date, _STATUS_NAMES[code]) for date, code in self.other.items())
+        return marks
+    
+    def values(self):
+        return [status for date, status in self.items()]
+    
+    def __repr__(self):
+        return f"MarkColumn({self.as_dict()!r})"
+    
+    def _span(self, start_date=None, end_date=None):
+        """Return the slice of the columns inside an inclusive YYYY-MM-DD range."""
+        low = bisect_left(self.days, _parse_day(start_date)) if start_date else 0
+        high = bisect_right(self.days, _parse_day(end_date)) if end_date else len(self.days)
+        return slice(low, high)
+    
+    def window(self, start_date=None, end_date=None):
+        """Return (day ordinals, status codes) of the dated marks inside an inclusive date range."""
+        span = self._span(start_date, end_date)
+        return self.days[span], self.codes[span]
+    
+    def between(self, start_date=None, end_date=None):
+        """Return {date: status} for the marks inside an inclusive date range, in date order."""
+        span = self._span(start_date, end_date)
+        return {_to_date(day): _STATUS_NAMES[code] for day, code in zip(self.days[span], self.codes[span])}
+    
+    def counts(self):
+        """Count every mark, undated ones included, as {'total': n, status: n, ...}."""
+        source = self._source
+        if source is not None:
+            # Straight from the snapshot: counting does not need the column read in
+            marks, start, stop = source
+            counts = self._count(marks.codes_between(start, stop))
+        else:
+            counts = self._count(self.codes)
+        for code in (self.other or {}).values():
+            counts['total'] += 1
+            counts[_STATUS_NAMES[code]] += 1
+        return counts
+    
+    def tally(self, start_date=None, end_date=None):
+        """Count the dated marks inside an inclusive date range as {'total': n, status: n, ...}."""
+        return self._count(self.codes[self._span(start_date, end_date)])
+    
+    @staticmethod
+    def _count(codes):
+        """Count a run of status codes as {'total': n, status: n, ...}."""
+        counts = {'total': len(codes)}
+        for code, status in enumerate(_STATUS_NAMES):
+            counts[status] = codes.count(code)
+        return counts
+
+_EMPTY_COLUMN = MarkColumn()  # Shared empty column; never written to
+
+def _column(marks):
+    """Return a {date: status} dict as a MarkColumn; a MarkColumn is taken as is."""
+    return marks if isinstance(marks, MarkColumn) else MarkColumn(marks)
+
+class _Record:
+    """Dict-style reads of a __slots__ record, as in the dict records it replaced."""
+    __slots__ = ()
+    
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+    
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self.__slots__ else default
+    
+    def __eq__(self, other):
+        # Equal to a record or dict holding the same fields, like the dicts were
+        if not isinstance(other, (_Record, Mapping)):
+            return NotImplemented
+        fields = other.__slots__ if isinstance(other, _Record) else other
+        return set(fields) == set(self.__slots__) and all(getattr(self, key) == other[key] for key in self.__slots__)
+    
+    __hash__ = None
+    
+    def __repr__(self):
+        fields = ', '.join(f"{key}={getattr(self, key)!r}" for key in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+class Student(_Record):
+    """A student, their enrollments and their marks."""
+    __slots__ = ('name', 'email', 'courses', 'attendance', 'course_attendance')
+    
+    def __init__(self, name: str, email: str = "", courses=(), attendance: dict = None, course_attendance: dict = None):
+        self.name = name
+        self.email = email
+        self.courses = set(courses)
+        self.attendance = _column(attendance)  # Marks not tied to a course
+        self.course_attendance = {course_id: _column(marks) for course_id, marks in (course_attendance or {}).items()}
+    
+    def register(self, course_id: str = None):
+        """Return the mark column of a course, created on first use, or the general one."""
+        if not course_id:
+            return self.attendance
+        column = self.course_attendance.get(course_id)
+        if column is None:
+            column = self.course_attendance[course_id] = MarkColumn()
+        return column
+    
+    def to_dict(self):
+        """Return the record in its JSON snapshot form."""
+        return {
+            'name': self.name,
+            'email': self.email,
+            'attendance': self.attendance.as_dict(),
+            'course_attendance': {course_id: marks.as_dict() for course_id, marks in self.course_attendance.items()},
+            'courses': sorted(self.courses)
+        }
+
+class Course(_Record):
+    """A course."""
+    __slots__ = ('name', 'instructor', 'schedule')
+    
+    def __init__(self, name: str, instructor: str = "", schedule=()):
+        self.name = name
+        self.instructor = instructor
+        self.schedule = list(schedule)
+    
+    @classmethod
+    def from_dict(cls, data: dict):
+        """Build a course from its JSON snapshot form."""
+        return cls(data['name'], data.get('instructor', ''), data.get('schedule', ()))
+    
+    def to_dict(self):
+        """Return the record in its JSON snapshot form."""
+        return {'name': self.name, 'instructor': self.instructor, 'schedule': self.schedule}
+
+# Data files with this suffix are written and read as binary snapshots, any other as JSON
+BINARY_SNAPSHOT_SUFFIX = '.snap'
+
+_SNAPSHOT_MAGIC = b'ATTSNAP1'
+# Each section is a little-endian uint64 byte length followed by that many bytes
+_SNAPSHOT_SECTIONS = ('header', 'students', 'courses', 'offsets', 'days', 'codes', 'other')
+_DAY_BYTES = array('i').itemsize
+
+def is_binary_snapshot(filename: str):
+    """Whether a data file is in the binary snapshot format, going by its suffix."""
+    return filename.endswith(BINARY_SNAPSHOT_SUFFIX)
+
+class _MappedMarks:
+    """The day and status code columns of a memory-mapped binary snapshot.
+    
+    Slices are copied out when asked for, converted to this machine's byte order and
+    this process's status codes if the writer's were different.
+    """
+    
+    def __init__(self, days, codes, swap: bool, table: bytes = None):
+        self.days = days  # memoryview of the int32 day ordinals
+        self.codes = codes  # memoryview of the int8 status codes
+        self.swap = swap  # Written on a machine of the other byte order
+        self.table = table  # bytes.translate() table from the file's codes, if they differ
+    
+    def codes_between(self, start: int, stop: int):
+        """Return the status codes of marks start:stop as bytes."""
+        codes = bytes(self.codes[start:stop])
+        return codes.translate(self.table) if self.table else codes
+    
+    def read(self, start: int, stop: int):
+        """Return (days, codes) arrays for marks start:stop."""
+        days = array('i')
+        days.frombytes(self.days[start * _DAY_BYTES:stop * _DAY_BYTES])
+        if self.swap:
+            days.byteswap()
+        codes = array('b')
+        codes.frombytes(self.codes_between(start, stop))
+        return days, codes
+    
+    def raw(self, start: int, stop: int):
+        """Return (day bytes, code bytes) for marks start:stop, uncopied when no conversion is needed."""
+        if self.swap:
+            days, codes = self.read(start, stop)
+            return days.tobytes(), codes.tobytes()
+        return self.days[start * _DAY_BYTES:stop * _DAY_BYTES], self.codes_between(start, stop)
+
+def write_binary_snapshot(f, records: dict, courses: dict, journal_seq: int):
+    """Write students, courses and marks to a file opened for binary writing.
+    
+    Marks are stored column-wise: the day ordinals of every register back to back
+    (int32), then their status codes (int8), with the register boundaries in offsets
+    (int64). Registers follow the student order, general register first. Names,
+    enrollments, courses and undated marks are small and stay JSON.
+    """
+    students = []
+    offsets = array('q', [0])
+    days = []
+    codes = []
+    other = []  # [register, {date: status}] for marks without an ordinal
+    for student_id, student in records.items():
+        students.append([student_id, student.name, student.email, sorted(student.courses),
+                         list(student.course_attendance)])
+        for column in (student.attendance, *student.course_attendance.values()):
+            column_days, column_codes = column.raw()
+            days.append(column_days)
+            codes.append(column_codes)
+            offsets.append(offsets[-1] + len(column_codes))
+            if column.other:
+                other.append([len(offsets) - 2, {date: _STATUS_NAMES[code] for date, code in column.other.items()}])
+    
+    header = {'journal_seq': journal_seq, 'byteorder': sys.byteorder, 'statuses': _STATUS_NAMES}
+    sections = (
+        json.dumps(header).encode(),
+        json.dumps(students).encode(),
+        json.dumps({course_id: course.to_dict() for course_id, course in courses.items()}).encode(),
+        offsets.tobytes(),
+        b''.join(days),
+        b''.join(codes),
+        json.dumps(other).encode()
+    )
+    f.write(_SNAPSHOT_MAGIC)
+    for section in sections:
+        f.write(struct.pack('<Q', len(section)))
+        f.write(section)
+
+def read_binary_snapshot(filename: str):
+    """Map a binary snapshot into memory and return (records, courses, journal_seq).
+    
+    Students and courses are decoded at once, but every register's marks stay in the
+    mapping until first used. Raises ValueError for a file that is not a complete
+    binary snapshot.
+    """
+    with open(filename, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+    view = memoryview(mapping)
+    if view[:len(_SNAPSHOT_MAGIC)] != _SNAPSHOT_MAGIC:
+        raise ValueError("not a binary attendance snapshot")
+    sections = {}
+    position = len(_SNAPSHOT_MAGIC)
+    for name in _SNAPSHOT_SECTIONS:
+        if position + 8 > size:
+            raise ValueError("truncated binary snapshot")
+        length = struct.unpack_from('<Q', view, position)[0]
+        position += 8
+        if position + length > size:
+            raise ValueError("truncated binary snapshot")
+        sections[name] = view[position:position + length]
+        position += length
+    
+    header = json.loads(bytes(sections['header']))
+    codes = [_status_code(status) for status in header['statuses']]
+    table = None
+    if codes != list(range(len(codes))):
+        table = bytes(codes) + bytes(range(len(codes), 256))
+    swap = header['byteorder'] != sys.byteorder
+    marks = _MappedMarks(sections['days'], sections['codes'], swap, table)
+    
+    offsets = array('q')
+    offsets.frombytes(sections['offsets'])
+    if swap:
+        offsets.byteswap()
+    columns = [MarkColumn.mapped(marks, start, stop) for start, stop in zip(offsets, islice(offsets, 1, None))]
+    registers = iter(columns)
+    records = {}
+    for student_id, name, email, enrolled, course_ids in json.loads(bytes(sections['students'])):
+        general = next(registers)
+        records[student_id] = Student(name, email, enrolled, general,
+                                      {course_id: next(registers) for course_id in course_ids})
+    for register, dated in json.loads(bytes(sections['other'])):
+        columns[register].other = {date: _status_code(status) for date, status in dated.items()}
+    courses = {course_id: Course.from_dict(course) for course_id, course in json.loads(bytes(sections['courses'])).items()}
+    return records, courses, header['journal_seq']
+
+# Data files with this suffix are directories of shards: students, courses and enrollments in
+# core.json, and the marks of each register, the general one or a course's, in a binary
+# snapshot of their own, so a change only rewrites the shards it touched
+SHARDED_SNAPSHOT_SUFFIX = '.shards'
+_CORE_SHARD = 'core.json'
+_GENERAL_SHARD = 'general.snap'
+
+def is_sharded_snapshot(filename: str):
+    """Whether a data file is a sharded snapshot directory, going by its suffix."""
+    return filename.endswith(SHARDED_SNAPSHOT_SUFFIX)
+
+def _shard_path(dirname: str, course_id: str = None):
+    """Path of the shard holding a course's register, or the general register for None."""
+    if course_id is None:
+        return os.path.join(dirname, _GENERAL_SHARD)
+    # Hex keeps any course ID a valid file name, distinct even on case-insensitive file systems
+    return os.path.join(dirname, f"course-{course_id.encode().hex()}{BINARY_SNAPSHOT_SUFFIX}")
+
+def read_sharded_snapshot(dirname: str):
+    """Load a sharded snapshot and return (records, courses, {part: journal_seq}).
+    
+    A part is 'core', None for the general register or a course ID. Every shard is mapped
+    like a binary snapshot, so its marks stay on disk until first used. Raises ValueError
+    for a damaged shard.
+    """
+    with open(os.path.join(dirname, _CORE_SHARD)) as f:
+        core = json.load(f)
+    records = {student_id: Student(name, email, enrolled) for student_id, name, email, enrolled in core['students']}
+    courses = {course_id: Course.from_dict(course) for course_id, course in core['courses'].items()}
+    seqs = {'core': core['journal_seq']}
+    for entry in sorted(os.listdir(dirname)):
+        if entry == _GENERAL_SHARD:
+            course_id = None
+        elif entry.startswith('course-') and entry.endswith(BINARY_SNAPSHOT_SUFFIX):
+            course_id = bytes.fromhex(entry[len('course-'):-len(BINARY_SNAPSHOT_SUFFIX)]).decode()
+        else:
+            continue  # core.json, or a temporary file a crash left behind
+        # Each student in a shard carries that register as their general column
+        shard, _, seqs[course_id] = read_binary_snapshot(os.path.join(dirname, entry))
+        for student_id, holder in shard.items():
+            student = records.get(student_id)
+            if student is None:
+                continue
+            if course_id is None:
+                student.attendance = holder.attendance
+            else:
+                student.course_attendance[course_id] = holder.attendance
+    return records, courses, seqs
+
+class AttendanceMatrix:
+    """Marks of one register (a course, or the general one) as a student x session grid.
+    
+    Each cell is an int8 status code: 0 for no mark, otherwise the 1-based position of the
+    status in STATUSES (unknown statuses get the next code and only count in the total).
+    Rows are keyed by the student's position in the analytics index and columns by date.
+    """
     def __init__(self):
+        self.rows = {}  # student index -> row
+        self.row_students = []  # student index of each row
+        self.columns = {}  # date -> column
+        self._tallies = None  # Cached result of tallies(), dropped on every write
+        if numpy is not None:
+            self.grid = numpy.zeros((16, 16), dtype=numpy.int8)
+        else:
+            self.grid = []  # one bytearray per row, grown as dates appear
+    
+    def set(self, student, date, code):
+        """Write the status code of one mark."""
+        self._tallies = None
+        row = self.rows.get(student)
+        if row is None:
+            row = self.rows[student] = len(self.row_students)
+            self.row_students.append(student)
+        column = self.columns.get(date)
+        if column is None:
+            column = self.columns[date] = len(self.columns)
+        
+        if numpy is None:
+            if row == len(self.grid):
+                self.grid.append(bytearray())
+            line = self.grid[row]
+            if column >= len(line):
+                line.extend(bytes(column + 1 - len(line)))
+            line[column] = code
+            return
+        
+        # Double the grid along whichever axis ran out of room
+        height, width = self.grid.shape
+        if row >= height or column >= width:
+            grown = numpy.zeros((height * 2 if row >= height else height,
+                                 width * 2 if column >= width else width), dtype=numpy.int8)
+            grown[:height, :width] = self.grid
+            self.grid = grown
+        self.grid[row, column] = code
+    
+    def tallies(self, statuses: int):
+        """Return [total, count of code 1, ..., count of code statuses] for every row, in row order."""
+        if self._tallies is not None:
+            return self._tallies
+        if numpy is None:
+            codes = range(1, statuses + 1)
+            self._tallies = [[len(line) - line.count(0)] + [line.count(code) for code in codes]
+                             for line in self.grid]
+            return self._tallies
+        
+        # One bincount over (row, code) pairs counts every code of every row at once
+        height = len(self.row_students)
+        width = statuses + 2  # codes 0 (no mark) to statuses + 1 (unknown)
+        grid = self.grid[:height, :len(self.columns)]
+        offsets = numpy.arange(height, dtype=numpy.int64)[:, None] * width
+        counts = numpy.bincount((grid + offsets).ravel(), minlength=height * width).reshape(height, width)
+        self._tallies = numpy.column_stack([counts[:, 1:].sum(axis=1), counts[:, 1:statuses + 1]])
+        return self._tallies
+
+class ColumnarAnalytics:
+    """Status-code matrices for every register, reduced in bulk to answer summaries.
+    
+    Uses NumPy when it is installed and the stdlib otherwise; both give the same counts.
+    """
+    def __init__(self, statuses):
+        _import_numpy()
+        self.codes = {status: code for code, status in enumerate(statuses, 1)}
+        self.other = len(statuses) + 1
+        self.width = len(statuses) + 1  # total followed by one count per status
+        self.students = {}  # student_id -> index
+        self.registers = {}  # course_id, or '' for general marks -> AttendanceMatrix
+    
+    def record(self, student_id, course_id, date, status):
+        """Store a new or edited mark."""
+        student = self.students.get(student_id)
+        if student is None:
+            student = self.students[student_id] = len(self.students)
+        register = self.registers.get(course_id or '')
+        if register is None:
+            register = self.registers[course_id or ''] = AttendanceMatrix()
+        register.set(student, date, self.codes.get(status, self.other))
+    
+    def tallies(self, student_ids, course_id=None):
+        """Return [total, Present, Absent, Late, Excused] lists aligned with student_ids.
+        
+        With a course, only that course's marks count; otherwise every register is
+        summed per student.
+        """
+        zero = [0] * self.width
+        if course_id:
+            register = self.registers.get(course_id)
+            if register is None:
+                return [zero for _ in student_ids]
+            per_row = register.tallies(self.width - 1)
+            rows = [register.rows.get(self.students.get(student_id), -1) for student_id in student_ids]
+            if numpy is None:
+                return [per_row[row] if row >= 0 else zero for row in rows]
+            per_row = numpy.vstack([per_row, numpy.zeros((1, self.width), dtype=per_row.dtype)])
+            return per_row[rows].tolist()
+        
+        # The last row stays zero for students who have no marks at all
+        indexes = [self.students.get(student_id, -1) for student_id in student_ids]
+        if numpy is None:
+            totals = [[0] * self.width for _ in range(len(self.students) + 1)]
+            for register in self.registers.values():
+                for student, counts in zip(register.row_students, register.tallies(self.width - 1)):
+                    totals[student] = [a + b for a, b in zip(totals[student], counts)]
+            return [totals[index] for index in indexes]
+        totals = numpy.zeros((len(self.students) + 1, self.width), dtype=numpy.int64)
+        for register in self.registers.values():
+            if register.row_students:
+                # A student appears once per register, so plain fancy indexing adds correctly
+                totals[register.row_students] += register.tallies(self.width - 1)
+        return totals[indexes].tolist()
+
+def _prefix_end(prefix: str):
+    """Return the smallest string above every string starting with prefix, or None if there is none."""
+    prefix = prefix.rstrip('\U0010ffff')
+    if not prefix:
+        return None
+    code = ord(prefix[-1]) + 1
+    if 0xD800 <= code < 0xE000:
+        code = 0xE000  # Skip the surrogates, which cannot be encoded for SQLite
+    return prefix[:-1] + chr(code)
+
+@_instrumented
+class EnhancedAttendanceSystem:
+    # Mutating methods that may be replayed from the journal
+    JOURNAL_OPS = ('add_student', 'mark_attendance', 'mark_course_attendance', 'edit_attendance',
+                   'add_course', 'enroll_student', 'unenroll_student')
+    # The journal ops that change the core of a sharded snapshot rather than a register's shard
+    CORE_OPS = ('add_student', 'add_course', 'enroll_student', 'unenroll_student')
+    # The journal ops that only write marks
+    MARK_OPS = ('mark_attendance', 'mark_course_attendance', 'edit_attendance')
+    STATUSES = ("Present", "Absent", "Late", "Excused")
+    # import_csv() kinds: (required columns, optional columns), in the order the
+    # matching method takes them
+    IMPORT_COLUMNS = {
+        'students': (('student_id', 'name'), ('email',)),
+        'enrollments': (('student_id', 'course_id'), ()),
+        'attendance': (('student_id', 'date', 'status'), ('course_id',))
+    }
+    _NO_MARKS = {'total': 0}
+    ARCHIVE_CACHE_SIZE = 2  # Archives kept decompressed for queries that reach back into them
+
+    def __init__(self, journal: bool = False, compact_threshold: int = 1000, analytics: bool = False,
+                 cache_size: int = 32):
         """Initialize an empty attendance record."""
         self.records = {}
         self.courses = {}  # Added courses feature
+        
+        # Status counters kept in step with every mark, so summaries never rescan records
+        self._counts = {}  # student_id -> {'total': n, 'Present': n, ...}
+        self._course_counts = {}  # (student_id, course_id) -> same shape
+        self._mark_count = 0  # Marks across every register
+        
+        # Reverse enrollment index; each student's 'courses' is a set kept in step with it
+        self._course_students = {}  # course_id -> set(student_id)
+        
+        # Pre-sorted indexes for paged listings
+        self._ids_sorted = []  # student IDs in order
+        self._names_sorted = []  # (lower-cased name, student_id) in order
+        
+        # Optional columnar copy of every mark; summaries are then reduced in bulk
+        self._analytics = ColumnarAnalytics(self.STATUSES) if analytics else None
+        
+        # Trend counts per course (None: every register), built on first use and then
+        # kept in step with each mark, so weekly and monthly series never rescan marks
+        self._daily = {}  # course_id or None -> Counter((day ordinal, status code))
+        
+        # Attendance percentages in order, per course roster (None: across every register),
+        # built on first use and kept in step with each mark for at-risk queries
+        self._risk_index = {}  # course_id or None -> sorted [(percentage, student_id)]
+        self.risk_threshold = 75.0  # Percentage below which a student is at risk
+        self._risk_listeners = []
+        
+        # Journaled persistence: mutations are appended to "<data file>.log" and
+        # folded into a fresh snapshot once the log holds compact_threshold entries
+        self.journal = journal
+        self.compact_threshold = compact_threshold
+        self._pending_ops = []
+        self._journal_seq = 0  # Sequence number of the last logged mutation
+        self._journal_size = 0  # Entries in the log since the last snapshot
+        self._replaying = False
+        self._replay_time = 0.0  # When the journal entry being replayed was made
+        
+        # Concurrency: one engine lock for request threads, and, once attach() binds
+        # a data file, a file lock plus an on-disk fingerprint for other processes
+        self._lock = ReadWriteLock()
+        self._data_file = None
+        self._syncing = False
+        self._seen_version = None  # (snapshot stat, journal size) last seen on disk
+        self._journal_offset = 0  # Bytes of the journal already applied
+        self._journal_resets = 0  # Times the journal was truncated or read again from the start
+        
+        # Sharded snapshots: the directory the parts in memory were last read from or written
+        # to, what changed since, and the journal position each part was loaded at
+        self._shards_dir = None
+        self._core_dirty = False
+        self._dirty_registers = set()  # course IDs, None for the general register
+        self._shard_seqs = None  # {part: journal_seq} after loading a sharded snapshot
+        
+        # Archived marks: read-only, compressed files next to the data file, listed in its
+        # index, and only opened for date ranges reaching back into them
+        self._archives = []  # index entries, oldest first
+        self._archived_before = None  # Dated marks before this day are archived
+        self._archived_courses = set()  # Courses whose whole register is archived
+        self._archive_cache = ResultCache(self.ARCHIVE_CACHE_SIZE)
+        
+        self.data_version = 0  # Bumped by every successful mutation
+        # Cleared while attach_in_background() loads, and set again once the data is in
+        self.ready = threading.Event()
+        self.ready.set()
+        self.load_error = None  # What stopped a background attach, if anything
+        self.write_behind = None  # WriteBehind writing changes out, once started
+        self.metrics = None  # Metrics to record calls and saves in, if any
+        
+        # Summaries are cached per course; a course's version moves with every
+        # mutation that touches it, and the generation with every full reload
+        self._results = ResultCache(cache_size) if cache_size else None
+        self._course_versions = {}  # course_id -> version
+        self._generation = 0
+        
+        # Per-student versions and change times back the API's ETag and Last-Modified headers.
+        # Versions are the journal sequence numbers of the last change and times come from the
+        # journal, so every process attached to the same data file gives the same answers
+        self._student_versions = {}  # student_id -> version
+        self._changed_at = {}  # ('student', id), ('course', id) or None for anything -> time.time()
+        self._snapshot_stamp = (0, time.time())  # (journal_seq, mtime) of the data file's snapshot
+
+    @_mutation
+    def add_student(self, student_id: str, name: str, email: str = ""):
+        """Add a new student to the attendance system with error handling."""
+        if not student_id or not name:
+            return False, "Student ID and name cannot be empty."
+        if student_id in self.records:
+            return False, f"Error: Student ID {student_id} already exists."
+        else:
+            self.records[student_id] = Student(name, email)
+            insort(self._ids_sorted, student_id)
+            insort(self._names_sorted, (name.lower(), student_id))
+            self._log_op('add_student', student_id=student_id, name=name, email=email)
+            return True, f"Student {name} added successfully."
+
+    @_mutation
+    def mark_attendance(self, student_id: str, date: str, status: str = "Present", course_id: str = None):
+        """Mark a student's attendance for a specific date with validation."""
+        if student_id not in self.records:
+            return False, f"Error: Student ID {student_id} not found."
+        
+        # Create attendance by course if course_id is provided
+        if course_id:
+            if course_id not in self.courses:
+                return False, f"Error: Course ID {course_id} not found."
+            
+            if course_id not in self.records[student_id].courses:
+                return False, f"Error: Student not enrolled in this course."
+        
+        error = self._archived_error(date, course_id)
+        if error:
+            return False, error
+        marks = self._marks(student_id, course_id)
+        if date in marks:
+            return False, f"Error: Attendance for {self.records[student_id].name} on {date} is already recorded."
+        
+        if status not in self.STATUSES:  # Added more status options
+            return False, "Error: Status must be 'Present', 'Absent', 'Late', or 'Excused'."
+        
+        self._set_mark(student_id, course_id, date, status)
+        self._log_op('mark_attendance', student_id=student_id, date=date, status=status, course_id=course_id)
+        return True, f"Attendance marked for {self.records[student_id].name} on {date} as {status}."
+
+    @_mutation
+    def mark_course_attendance(self, course_id: str, date: str, statuses: dict = None,
+                               default_status: str = "Present", skip_marked: bool = False):
+        """Mark a whole course roster for one date; nothing is recorded unless every mark is valid.
+        
+        Students missing from statuses get default_status. With skip_marked, students who
+        already have a mark for the date are left alone instead of failing the batch.
+        """
+        if course_id not in self.courses:
+            return False, f"Error: Course ID {course_id} not found."
+        if not date:
+            return False, "Error: Date cannot be empty."
+        error = self._archived_error(date, course_id)
+        if error:
+            return False, error
+        
+        statuses = statuses or {}
+        roster = self._course_students[course_id]
+        
+        # Validate the whole batch before touching any record
+        errors = []
+        for student_id in statuses:
+            if student_id not in roster:
+                errors.append(f"{student_id} is not enrolled in this course")
+        marks = {}
+        for student_id in self.get_course_roster(course_id):
+            status = statuses.get(student_id, default_status)
+            if status not in self.STATUSES:
+                errors.append(f"{student_id} has invalid status '{status}'")
+            elif date in self._marks(student_id, course_id):
+                if not skip_marked:
+                    errors.append(f"{student_id} is already marked on {date}")
+            else:
+                marks[student_id] = status
+        if errors:
+            more = f" (and {len(errors) - 5} more)" if len(errors) > 5 else ""
+            return False, "Error: " + "; ".join(errors[:5]) + more + "."
+        if not marks:
+            return False, f"Error: No students left to mark in this course on {date}."
+        
+        for student_id, status in marks.items():
+            self._set_mark(student_id, course_id, date, status)
+        self._log_op('mark_course_attendance', course_id=course_id, date=date, statuses=marks, skip_marked=True)
+        return True, f"Attendance marked for {len(marks)} students in {self.courses[course_id].name} on {date}."
+
+    @_mutation
+    def edit_attendance(self, student_id: str, date: str, status: str, course_id: str = None):
+        """Edit an existing attendance record."""
+        if student_id not in self.records:
+            return False, f"Error: Student ID {student_id} not found."
+        error = self._archived_error(date, course_id)
+        if error:
+            return False, error
+            
+        marks = self._marks(student_id, course_id)
+            
+        if date not in marks:
+            return False, f"Error: No attendance record found for this date."
+            
+        if status not in self.STATUSES:
+            return False, "Error: Status must be 'Present', 'Absent', 'Late', or 'Excused'."
+            
+        self._set_mark(student_id, course_id, date, status)
+        self._log_op('edit_attendance', student_id=student_id, date=date, status=status, course_id=course_id)
+        return True, f"Attendance updated for {self.records[student_id].name} on {date} as {status}."
+
+    def _marks(self, student_id: str, course_id: str = None):
+        """Return the date -> status column of a student, scoped to a course if given."""
+        if course_id:
+            return self.records[student_id].course_attendance.get(course_id, _EMPTY_COLUMN)
+        return self.records[student_id].attendance
+    
+    def _archived_error(self, date: str, course_id: str = None):
+        """Return an error message if a mark on date in a register would fall in an archive, else None."""
+        if course_id in self._archived_courses:
+            return f"Error: Course {course_id} is archived and read-only."
+        if self._archived_before and _parse_day(date) and date < self._archived_before:
+            return f"Error: Attendance before {self._archived_before} is archived and read-only."
+        return None
+    
+    def _registers(self, student_id: str, course_id: str = None, start_date: str = None, end_date: str = None):
+        """Return a student's register of a course (None: general) and the archived parts of it a date range reaches."""
+        return [self._marks(student_id, course_id),
+                *(marks for register, marks in self._archived_registers(student_id, start_date, end_date)
+                  if register == course_id)]
+    
+    def _archives_between(self, start_date: str = None, end_date: str = None):
+        """Return the archives holding dated marks in an inclusive date range; none without a range."""
+        if not (start_date or end_date):
+            return []
+        return [archive for archive in self._archives if archive['first_date']
+                and (not start_date or start_date <= archive['last_date'])
+                and (not end_date or end_date >= archive['first_date'])]
+    
+    def _archived_registers(self, student_id: str, start_date: str = None, end_date: str = None):
+        """Yield (course_id or None, marks) for each archived register of a student a date range reaches."""
+        for archive in self._archives_between(start_date, end_date):
+            yield from self._archive_marks(archive).get(student_id, {}).items()
+    
+    def _archive_marks(self, archive):
+        """Return {student_id: {course_id or None: marks}} of an archive, decompressed on first use."""
+        marks = self._archive_cache.get(archive['path'], archive['seq'])
+        if marks is None:
+            with gzip.open(archive['path'], 'rt') as f:
+                students = json.load(f)['students']
+            marks = {student_id: {course_id or None: MarkColumn(column) for course_id, column in registers.items()}
+                     for student_id, registers in students.items()}
+            self._archive_cache.put(archive['path'], archive['seq'], marks)
+        return marks
+    
+    def _set_mark(self, student_id: str, course_id: str, date: str, status: str):
+        """Store a new or edited mark and keep the counters and analytics in step."""
+        watched = self._risk_index or (self._risk_listeners and not self._replaying)
+        if watched:
+            before = self._percentages(student_id, course_id)
+        marks = self.records[student_id].register(course_id)
+        old_status = marks.get(date)
+        marks[date] = status
+        if old_status is not None:
+            self._adjust_counts(student_id, course_id, old_status, -1)
+        else:
+            self._mark_count += 1
+        self._adjust_counts(student_id, course_id, status, 1)
+        if self._analytics is not None:
+            self._analytics.record(student_id, course_id, date, status)
+        day = _to_day(date) if self._daily else 0
+        if day:
+            for scope in (course_id, None) if course_id else (None,):
+                daily = self._daily.get(scope)
+                if daily is not None:
+                    if old_status is not None:
+                        daily[(day, _STATUS_CODES[old_status])] -= 1
+                    daily[(day, _status_code(status))] += 1
+        if watched:
+            for scope, old, new in zip((None, course_id), before, self._percentages(student_id, course_id)):
+                if new != old:
+                    self._rate_moved(student_id, scope, old, new)
+    
+    @staticmethod
+    def _percentage(counts):
+        """Attendance percentage of a status counter, or None without marks."""
+        return counts['Present'] / counts['total'] * 100 if counts and counts['total'] else None
+    
+    def _percentages(self, student_id: str, course_id: str = None):
+        """Return a student's (overall, course) attendance percentages; None where there are no marks."""
+        course_rate = self._percentage(self._course_counts.get((student_id, course_id))) if course_id else None
+        return self._percentage(self._counts.get(student_id)), course_rate
+    
+    def _rate_moved(self, student_id: str, course_id: str, old: float, new: float):
+        """Move a student within an at-risk index, and tell the listeners if risk_threshold was crossed."""
+        index = self._risk_index.get(course_id)
+        if index is not None and (course_id is None or student_id in self._course_students.get(course_id, ())):
+            if old is not None:
+                del index[bisect_left(index, (old, student_id))]
+            insort(index, (new, student_id))
+        if not self._replaying:
+            self._check_risk(student_id, course_id, old, new)
+    
+    def _check_risk(self, student_id: str, course_id: str, old: float, new: float):
+        """Call the risk listeners if a percentage moved across risk_threshold."""
+        threshold = self.risk_threshold
+        if (old is not None and old < threshold) != (new < threshold):
+            for listener in self._risk_listeners:
+                listener(student_id, course_id, new, new < threshold)
+    
+    def add_risk_listener(self, listener):
+        """Call listener(student_id, course_id, percentage, below) when a new or edited mark takes a
+        student's percentage across risk_threshold, below=True on the way down.
+        
+        course_id is None for the percentage across all of the student's registers. Listeners
+        run with the engine lock held, so keep them short; marks other processes make, and
+        marks replayed from the journal, do not call them.
+        """
+        self._risk_listeners.append(listener)
+    
+    @classmethod
+    def check_date_range(cls, start_date: str = None, end_date: str = None):
+        """Return an error message if the bounds of a date range are malformed, else None."""
+        for value in (start_date, end_date):
+            # _parse_day() also rejects impossible days such as 2025-02-30
+            if value and not _parse_day(value):
+                return f"Error: Invalid date '{value}'. Use the YYYY-MM-DD format."
+        if start_date and end_date and start_date > end_date:
+            return "Error: Start date must not be after end date."
+        return None
+    
+    def _range_counts(self, student_id: str, course_id: str = None, start_date: str = None, end_date: str = None):
+        """Count a student's statuses within a date range, in one course or across every register."""
+        student = self.records[student_id]
+        if course_id:
+            registers = self._registers(student_id, course_id, start_date, end_date)
+        else:
+            registers = [student.attendance, *student.course_attendance.values(),
+                         *(marks for _, marks in self._archived_registers(student_id, start_date, end_date))]
+        counts = {}
+        for marks in registers:
+            for key, count in marks.tally(start_date, end_date).items():
+                counts[key] = counts.get(key, 0) + count
+        return counts
+
+    @_reads
+    def get_attendance(self, student_id: str, course_id: str = None, start_date: str = None, end_date: str = None):
+        """Retrieve the attendance record of a specific student with validation.
+        
+        With start_date and/or end_date (inclusive, YYYY-MM-DD) only the marks in that
+        range are returned, ordered by date.
+        """
+        if student_id not in self.records:
+            return False, f"Error: Student ID {student_id} not found.", {}
+        error = self.check_date_range(start_date, end_date)
+        if error:
+            return False, error, {}
+        
+        # Course marks live in their own column; without a course only general marks are returned
+        if start_date or end_date:
+            live, *archived = self._registers(student_id, course_id, start_date, end_date)
+            marks = live.between(start_date, end_date)
+            if archived:
+                for older in archived:
+                    marks.update(older.between(start_date, end_date))
+                marks = dict(sorted(marks.items()))
+            return True, "Success", marks
+        return True, "Success", self._marks(student_id, course_id).as_dict()
+    
+    @_reads
+    def get_attendance_rows(self, student_id: str, start_date: str = None, end_date: str = None):
+        """List every mark of a student as {'date', 'course_id', 'status'} rows ordered by date.
+        
+        With start_date and/or end_date (inclusive) only the marks in that range are listed,
+        archived ones included.
+        """
+        if student_id not in self.records:
+            return []
+        student = self.records[student_id]
+        registers = [(None, student.attendance), *student.course_attendance.items()]
+        if start_date or end_date:
+            registers.extend(self._archived_registers(student_id, start_date, end_date))
+            registers = [(course_id, marks.between(start_date, end_date)) for course_id, marks in registers]
+        rows = []
+        for course_id, marks in registers:
+            rows.extend({'date': date, 'course_id': course_id, 'status': status}
+                        for date, status in marks.items())
+        rows.sort(key=lambda row: (row['date'], row['course_id'] or ''))
+        return rows
+        
+    def _adjust_counts(self, student_id: str, course_id: str, status: str, delta: int):
+        """Apply a mark (delta=1) or remove one (delta=-1) from the status counters."""
+        keys = [(self._counts, student_id)]
+        if course_id:
+            keys.append((self._course_counts, (student_id, course_id)))
+        for counters, key in keys:
+            counts = counters.get(key)
+            if counts is None:
+                counts = counters[key] = {'total': 0, 'Present': 0, 'Absent': 0, 'Late': 0, 'Excused': 0}
+            counts['total'] += delta
+            counts[status] = counts.get(status, 0) + delta
+    
+    def _rebuild_indexes(self):
+        """Recompute the enrollment index and status counters from the loaded records."""
+        self._generation += 1
+        self._course_students = {course_id: set() for course_id in self.courses}
+        self._ids_sorted = sorted(self.records)
+        self._names_sorted = sorted((student.name.lower(), student_id) for student_id, student in self.records.items())
+        self._counts = {}
+        self._course_counts = {}
+        self._mark_count = 0
+        self._daily = {}
+        self._risk_index = {}
+        if self._analytics is not None:
+            self._analytics = ColumnarAnalytics(self.STATUSES)
+        analytics = self._analytics
+        for student_id, student in self.records.items():
+            for course_id in student.courses:
+                self._course_students.setdefault(course_id, set()).add(student_id)
+            for course_id, marks in (('', student.attendance), *student.course_attendance.items()):
+                if not marks:
+                    continue
+                # Count a whole column at once rather than replaying _adjust_counts per mark
+                counts = marks.counts()
+                self._mark_count += counts['total']
+                self._merge_counts(self._counts, student_id, counts)
+                if course_id:
+                    self._merge_counts(self._course_counts, (student_id, course_id), counts)
+                if analytics is not None:
+                    for date, status in marks.items():
+                        analytics.record(student_id, course_id or None, date, status)
+    
+    @staticmethod
+    def _merge_counts(counters, key, counts):
+        """Add a column's {'total': n, status: n} tally to one status counter."""
+        merged = counters.get(key)
+        if merged is None:
+            merged = counters[key] = {'total': 0, 'Present': 0, 'Absent': 0, 'Late': 0, 'Excused': 0}
+        for status, count in counts.items():
+            if count:
+                merged[status] = merged.get(status, 0) + count
+    
+    @staticmethod
+    def _upgrade_record(data):
+        """Move legacy "<date>_<course_id>" attendance keys into course_attendance."""
+        if 'course_attendance' in data:
+            return
+        data['course_attendance'] = {}
+        general = {}
+        for attendance_key, status in data['attendance'].items():
+            if '_' in attendance_key:
+                # Dates never contain '_', so the first one separates the course ID
+                date, course_id = attendance_key.split('_', 1)
+                data['course_attendance'].setdefault(course_id, {})[date] = status
+            else:
+                general[attendance_key] = status
+        data['attendance'] = general
+    
+    @staticmethod
+    def _summary_row(name, total, present, absent, late, excused):
+        """Shape one summary row from a student's aggregated counts."""
+        present = present or 0
+        return {
+            'name': name,
+            'total_days': total,
+            'present_days': present,
+            'absent_days': absent or 0,
+            'late_days': late or 0,
+            'excused_days': excused or 0,
+            'attendance_percentage': (present / total * 100) if total > 0 else 0.0
+        }
+    
+    @_reads
+    def summarize_student(self, student_id: str, course_id: str = None, start_date: str = None, end_date: str = None):
+        """Build the summary row of one student from the status counters, or from the date index for a range."""
+        # Counters are scoped to the course if specified; they only cover all-time totals
+        if start_date or end_date:
+            counts = self._range_counts(student_id, course_id, start_date, end_date)
+        elif course_id:
+            counts = self._course_counts.get((student_id, course_id), self._NO_MARKS)
+        else:
+            counts = self._counts.get(student_id, self._NO_MARKS)
+        
+        return self._summary_row(self.records[student_id].name, counts['total'],
+                                 *(counts.get(status, 0) for status in self.STATUSES))
+    
+    def iter_summary(self, course_id: str = None, start_date: str = None, end_date: str = None):
+        """Yield (student_id, summary row) pairs one student at a time, optionally filtered by course and dates."""
+        if self._analytics is not None and not (start_date or end_date):
+            yield from self._iter_summary_columnar(course_id)
+            return
+        
+        # Only visit the course roster when filtering by course; copy the IDs so
+        # a student added mid-iteration cannot break a long-running export
+        if course_id:
+            student_ids = self.get_course_roster(course_id)
+        else:
+            student_ids = list(self.records)
+        
+        for student_id in student_ids:
+            yield student_id, self.summarize_student(student_id, course_id, start_date, end_date)
+    
+    def _iter_summary_columnar(self, course_id: str = None):
+        """Yield summary rows from one bulk reduction of the analytics matrices."""
+        with self._lock.reading():
+            student_ids = self.get_course_roster(course_id) if course_id else list(self.records)
+            names = [self.records[student_id].name for student_id in student_ids]
+            tallies = self._analytics.tallies(student_ids, course_id)
+        for student_id, name, counts in zip(student_ids, names, tallies):
+            yield student_id, self._summary_row(name, *counts)
+    
+    @_reads
+    def get_summary(self, course_id: str = None, start_date: str = None, end_date: str = None):
+        """Generate a summary of attendance for all students, optionally filtered by course and date range.
+        
+        Raises ValueError for a malformed date range. The result is cached until the data
+        it covers changes, so treat it as read-only.
+        """
+        error = self.check_date_range(start_date, end_date)
+        if error:
+            raise ValueError(error)
+        return self._cached(('summary', course_id, start_date, end_date), course_id,
+                            lambda: dict(self.iter_summary(course_id, start_date, end_date)))
+    
+    def _result_stamp(self, course_id: str = None):
+        """Version of the data a whole-school or single-course result is built from."""
+        if course_id:
+            return self._generation, self._course_versions.get(course_id, 0)
+        return self._generation, self.data_version
+    
+    @_reads
+    def data_stamp(self, student_id: str = None, course_id: str = None):
+        """Return (tag, last-modified time) of one student's marks, one course, or all the data.
+        
+        The tag changes with every mutation touching that data, so it can serve as an ETag.
+        """
+        if student_id:
+            key, version = ('student', student_id), self._student_versions.get(student_id, 0)
+        elif course_id:
+            key, version = ('course', course_id), self._course_versions.get(course_id, 0)
+        else:
+            key, version = None, self._journal_seq
+        # Nothing in the snapshot is newer than the snapshot itself
+        seq, written = self._snapshot_stamp
+        changed = max(self._changed_at.get(key, 0.0), written)
+        return str(max(version, seq)), datetime.fromtimestamp(changed, timezone.utc)
+    
+    TREND_PERIODS = ('week', 'month')
+    
+    def _daily_counts(self, course_id: str = None):
+        """Return Counter((day, status code)) of a course's register, or of every register for None."""
+        daily = self._daily.get(course_id)
+        if daily is None:
+            # Marks stay in a course's register after an unenroll, so every student is visited
+            daily = Counter()
+            for student in self.records.values():
+                if course_id:
+                    columns = (student.course_attendance.get(course_id),)
+                else:
+                    columns = (student.attendance, *student.course_attendance.values())
+                for column in columns:
+                    if column:
+                        daily.update(zip(column.days, column.codes))
+            self._daily[course_id] = daily
+        return daily
+    
+    @staticmethod
+    def _trend_series(daily, period: str, start_date: str = None, end_date: str = None):
+        """Roll (day, status code) counts up into one row per week (from Monday) or month, oldest first."""
+        low = _parse_day(start_date) if start_date else 0
+        high = _parse_day(end_date) if end_date else sys.maxsize
+        buckets = {}
+        for (day, code), count in daily.items():
+            if count and low <= day <= high:
+                key = day - (day - 1) % 7 if period == 'week' else _to_date(day)[:7]
+                counts = buckets.get(key)
+                if counts is None:
+                    counts = buckets[key] = {'total': 0, 'Present': 0, 'Absent': 0, 'Late': 0, 'Excused': 0}
+                counts['total'] += count
+                counts[_STATUS_NAMES[code]] = counts.get(_STATUS_NAMES[code], 0) + count
+        series = []
+        for key, counts in sorted(buckets.items()):
+            counts['attendance_percentage'] = counts['Present'] / counts['total'] * 100
+            series.append({'period': _to_date(key) if period == 'week' else key, **counts})
+        return series
+    
+    @_reads
+    def get_trends(self, course_id: str = None, student_id: str = None, period: str = "week",
+                   start_date: str = None, end_date: str = None):
+        """Return (success, message, series) of attendance per week or month, oldest first.
+        
+        Each row has 'period' (the week's Monday or YYYY-MM), 'total', a count per status and
+        'attendance_percentage'. The scope is one student (in one course or across their
+        registers), one course, or the whole school; a course covers every mark in its
+        register, including those of students unenrolled since. Undated marks are left out.
+        """
+        if period not in self.TREND_PERIODS:
+            return False, "Error: Period must be 'week' or 'month'.", []
+        if course_id and course_id not in self.courses:
+            return False, f"Error: Course ID {course_id} not found.", []
+        if student_id and student_id not in self.records:
+            return False, f"Error: Student ID {student_id} not found.", []
+        error = self.check_date_range(start_date, end_date)
+        if error:
+            return False, error, []
+        if student_id:
+            # A student's marks are few enough to count straight from their registers
+            student = self.records[student_id]
+            columns = self._registers(student_id, course_id, start_date, end_date) if course_id else \
+                (student.attendance, *student.course_attendance.values(),
+                 *(marks for _, marks in self._archived_registers(student_id, start_date, end_date)))
+            daily = Counter()
+            for column in columns:
+                daily.update(zip(*column.window(start_date, end_date)))
+        else:
+            daily = self._daily_counts(course_id)
+            archives = self._archives_between(start_date, end_date)
+            if archives:
+                daily = daily.copy()
+                for archive in archives:
+                    for registers in self._archive_marks(archive).values():
+                        for register, column in registers.items():
+                            if not course_id or register == course_id:
+                                daily.update(zip(column.days, column.codes))
+        return True, "Success", self._trend_series(daily, period, start_date, end_date)
+    
+    def _risk_entries(self, course_id: str = None):
+        """Return the sorted [(percentage, student_id)] of a course roster, or of every student for None."""
+        index = self._risk_index.get(course_id)
+        if index is None:
+            if course_id:
+                counters = ((student_id, self._course_counts.get((student_id, course_id)))
+                            for student_id in self._course_students.get(course_id, ()))
+            else:
+                counters = self._counts.items()
+            index = []
+            for student_id, counts in counters:
+                rate = self._percentage(counts)
+                if rate is not None:
+                    index.append((rate, student_id))
+            index.sort()
+            self._risk_index[course_id] = index
+        return index
+    
+    @_reads
+    def get_at_risk(self, course_id: str = None, threshold: float = None, limit: int = None, offset: int = 0):
+        """Return (success, message, result) for the students whose attendance is below threshold percent.
+        
+        threshold defaults to risk_threshold. result has 'students', {student_id: summary row}
+        from the lowest percentage up, limit rows from offset at most, and 'total', the number
+        below the threshold. Students without marks are not rated. The percentages are kept
+        in order, so the query costs a bisect plus the rows returned.
+        """
+        if course_id and course_id not in self.courses:
+            return False, f"Error: Course ID {course_id} not found.", {}
+        threshold = self.risk_threshold if threshold is None else threshold
+        index = self._risk_entries(course_id)
+        total = bisect_left(index, (threshold,))
+        stop = total if limit is None else min(total, offset + limit)
+        students = {student_id: self.summarize_student(student_id, course_id) for rate, student_id in index[offset:stop]}
+        return True, f"{total} students below {threshold:g}%.", {'students': students, 'total': total}
+    
+    def _cached(self, key, course_id, build):
+        """Return the cached result for key, building and caching it if the data moved on."""
+        if self._results is None:
+            return build()
+        stamp = self._result_stamp(course_id)
+        value = self._results.get(key, stamp)
+        if value is None:
+            value = build()
+            self._results.put(key, stamp, value)
+        return value
+        
+    @_mutation
+    def add_course(self, course_id: str, course_name: str, instructor: str = ""):
+        """Add a new course to the system."""
+        if not course_id or not course_name:
+            return False, "Course ID and name cannot be empty."
+        if course_id in self.courses:
+            return False, f"Error: Course ID {course_id} already exists."
+            
+        self.courses[course_id] = Course(course_name, instructor)
+        self._course_students[course_id] = set()
+        self._log_op('add_course', course_id=course_id, course_name=course_name, instructor=instructor)
+        return True, f"Course {course_name} added successfully."
+        
+    @_mutation
+    def enroll_student(self, student_id: str, course_id: str):
+        """Enroll a student in a course."""
+        if student_id not in self.records:
+            return False, f"Error: Student ID {student_id} not found."
+        if course_id not in self.courses:
+            return False, f"Error: Course ID {course_id} not found."
+        
+        # Check if already enrolled
+        if course_id in self.records[student_id].courses:
+            return False, f"Student already enrolled in this course."
+            
+        self.records[student_id].courses.add(course_id)
+        self._course_students[course_id].add(student_id)
+        rate = self._percentage(self._course_counts.get((student_id, course_id)))
+        if rate is not None and course_id in self._risk_index:
+            insort(self._risk_index[course_id], (rate, student_id))
+        self._log_op('enroll_student', student_id=student_id, course_id=course_id)
+        return True, f"Student {self.records[student_id].name} enrolled in {self.courses[course_id].name}."
+    
+    @_mutation
+    def unenroll_student(self, student_id: str, course_id: str):
+        """Remove a student from a course."""
+        if student_id not in self.records:
+            return False, f"Error: Student ID {student_id} not found."
+        if course_id not in self.courses:
+            return False, f"Error: Course ID {course_id} not found."
+            
+        if course_id not in self.records[student_id].courses:
+            return False, f"Student not enrolled in this course."
+            
+        self.records[student_id].courses.remove(course_id)
+        self._course_students[course_id].discard(student_id)
+        rate = self._percentage(self._course_counts.get((student_id, course_id)))
+        if rate is not None and course_id in self._risk_index:
+            index = self._risk_index[course_id]
+            del index[bisect_left(index, (rate, student_id))]
+        self._log_op('unenroll_student', student_id=student_id, course_id=course_id)
+        return True, f"Student {self.records[student_id].name} unenrolled from {self.courses[course_id].name}."
+    
+    @_mutation
+    def import_csv(self, kind: str, lines, max_errors: int = 100):
+        """Import students, enrollments or attendance marks from CSV with a header row.
+        
+        lines is any iterable of CSV lines, such as an open text file, and is read one row
+        at a time. Each row gets the checks of the matching form (add_student,
+        enroll_student or mark_attendance); bad rows are skipped and the rest applied.
+        When attached, the whole import is written out once at the end. Returns
+        (success, message, errors) with the first max_errors (line number, message) pairs.
+        """
+        if kind not in self.IMPORT_COLUMNS:
+            return False, f"Error: Unknown import type '{kind}'.", []
+        required, optional = self.IMPORT_COLUMNS[kind]
+        add = {'students': self.add_student, 'enrollments': self.enroll_student,
+               'attendance': self.mark_attendance}[kind]
+        
+        reader = csv.DictReader(lines)
+        try:
+            header = reader.fieldnames
+        except (csv.Error, UnicodeDecodeError) as exc:
+            return False, f"Error: Could not read the CSV file: {exc}", []
+        if not header:
+            return False, "Error: The CSV file is empty.", []
+        reader.fieldnames = [column.strip().lower() for column in header]
+        missing = [column for column in required if column not in reader.fieldnames]
+        if missing:
+            return False, f"Error: Missing column(s): {', '.join(missing)}.", []
+        
+        imported = failed = 0
+        errors = []
+        rows = iter(reader)
+        while True:
+            try:
+                row = next(rows, None)
+            except (csv.Error, UnicodeDecodeError) as exc:
+                # The rest of the file cannot be parsed reliably; keep what came before
+                failed += 1
+                errors.append((reader.line_num, f"Error: Could not read the CSV file: {exc}"))
+                break
+            if row is None:
+                break
+            values = [(row.get(column) or '').strip() for column in required + optional]
+            if kind == 'attendance':
+                values[3] = values[3] or None  # No course_id: a general mark
+                date = values[1]
+                message = self.check_date_range(date) if date else "Error: Date cannot be empty."
+                success = message is None
+            else:
+                success = True
+            if success:
+                success, message = add(*values)
+            if success:
+                imported += 1
+            else:
+                failed += 1
+                if len(errors) < max_errors:
+                    errors.append((reader.line_num, message))
+        
+        if not imported and not failed:
+            return False, "Error: The CSV file has no rows to import.", errors
+        message = f"Imported {imported} of {imported + failed} rows of {kind}."
+        if failed:
+            message += f" {failed} rows were skipped because of errors."
+        return imported > 0, message, errors
+    
+    @_reads
+    def list_students(self, id_prefix: str = "", name: str = "", course_id: str = None,
+                      sort: str = "id", descending: bool = False, page: int = 1, per_page: int = 50):
+        """Return (student IDs on the requested page, total matches) for a filtered, sorted listing.
+        
+        id_prefix and name are prefix filters (name is case-insensitive) answered by bisecting
+        the pre-sorted indexes; course_id restricts the listing to that course's roster.
+        """
+        name = name.lower()
+        by_name = sort == 'name'
+        
+        if course_id:
+            # Rosters are small relative to the school, so order them directly
+            roster = self._course_students.get(course_id, ())
+            if by_name:
+                keys = sorted((self.records[sid].name.lower(), sid) for sid in roster)
+            else:
+                keys = sorted(roster)
+            lo, hi = 0, len(keys)
+        elif by_name:
+            keys = self._names_sorted
+            end = _prefix_end(name)
+            lo = bisect_left(keys, (name,))
+            hi = bisect_left(keys, (end,)) if end is not None else len(keys)
+        else:
+            keys = self._ids_sorted
+            end = _prefix_end(id_prefix)
+            lo = bisect_left(keys, id_prefix)
+            hi = bisect_left(keys, end) if end is not None else len(keys)
+        
+        def matches(key):
+            student_id = key[1] if by_name else key
+            if id_prefix and not student_id.startswith(id_prefix):
+                return False
+            return not name or self.records[student_id].name.lower().startswith(name)
+        
+        start = max(page - 1, 0) * per_page
+        if (course_id or (by_name and id_prefix) or (not by_name and name)):
+            # A filter the range does not cover: scan the range once
+            positions = [i for i in range(lo, hi) if matches(keys[i])]
+        else:
+            positions = range(lo, hi)
+        if descending:
+            positions = positions[::-1]
+        
+        page_keys = [keys[i] for i in positions[start:start + per_page]]
+        student_ids = [key[1] for key in page_keys] if by_name else page_keys
+        return student_ids, len(positions)
+    
+    @_reads
+    def get_student(self, student_id: str):
+        """Return a student's record, or None if the ID is unknown."""
+        return self.records.get(student_id)
+    
+    @_reads
+    def get_students(self, student_ids):
+        """Return {student_id: record} for the known IDs among student_ids, in the order given."""
+        return {student_id: self.records[student_id] for student_id in student_ids if student_id in self.records}
+    
+    @_reads
+    def student_count(self):
+        """Return the number of students."""
+        return len(self.records)
+    
+    @_reads
+    def get_course(self, course_id: str):
+        """Return a course's record, or None if the ID is unknown."""
+        return self.courses.get(course_id)
+    
+    @_reads
+    def data_sizes(self):
+        """Return the number of students, courses and marks."""
+        return {'students': len(self.records), 'courses': len(self.courses), 'marks': self._mark_count}
+    
+    @_reads
+    def get_courses(self):
+        """Return all courses as {course_id: record}."""
+        return self.courses
+    
+    @_reads
+    def get_course_marks(self, course_id: str, date: str):
+        """Return {student_id: status} for the course roster members marked on a date."""
+        course_marks = {}
+        for student_id in self._course_students.get(course_id, ()):
+            status = self._marks(student_id, course_id).get(date)
+            if status is not None:
+                course_marks[student_id] = status
+        return course_marks
+    
+    @_reads
+    def get_course_roster(self, course_id: str):
+        """Return the IDs of the students enrolled in a course, sorted."""
+        return sorted(self._course_students.get(course_id, ()))
+    
+    @_reads
+    def get_course_grid(self, course_id: str, student_ids=None, start_date: str = None, end_date: str = None,
+                        max_dates: int = None):
+        """Return (success, message, grid): a course register of enrolled students by session date.
+        
+        The session dates are the YYYY-MM-DD dates any enrolled student is marked on within
+        the inclusive range; with max_dates only the latest that many are kept. grid has
+        'dates', 'rows' of (student_id, name, [status or None per date]) for the enrolled
+        students among student_ids (default: the whole roster, sorted), and 'earlier', the
+        session date before the first one kept, if any.
+        """
+        if course_id not in self.courses:
+            return False, f"Error: Course ID {course_id} not found.", {}
+        error = self.check_date_range(start_date, end_date)
+        if error:
+            return False, error, {}
+        roster = self._course_students.get(course_id, set())
+        if student_ids is None:
+            student_ids = sorted(roster)
+        
+        # The whole roster decides the columns, but only its distinct session days are kept
+        days = set()
+        for student_id in roster:
+            for column in self._registers(student_id, course_id, start_date, end_date):
+                days.update(column.window(start_date, end_date)[0])
+        days = sorted(days)
+        earlier = None
+        if max_dates and len(days) > max_dates:
+            earlier = _to_date(days[-max_dates - 1])
+            days = days[-max_dates:]
+        dates = [_to_date(day) for day in days]
+        
+        # One pass over each requested student's marks in the window fills their row
+        position = {day: i for i, day in enumerate(days)}
+        rows = []
+        for student_id in student_ids:
+            if student_id not in roster:
+                continue
+            student = self.records[student_id]
+            cells = [None] * len(days)
+            for column in self._registers(student_id, course_id, start_date, end_date) if days else ():
+                for day, code in zip(*column.window(dates[0], dates[-1])):
+                    cells[position[day]] = _STATUS_NAMES[code]
+            rows.append((student_id, student.name, cells))
+        return True, "Success", {'dates': dates, 'rows': rows, 'earlier': earlier}
+    
+    def _iter_export_rows(self, course_id: str = None, start_date: str = None, end_date: str = None):
+        """Yield (student_id, student record, summary row) for the CSV export."""
+        for student_id, data in self.iter_summary(course_id, start_date, end_date):
+            yield student_id, self.records[student_id], data
+    
+    def iter_attendance_csv(self, course_id: str = None, chunk_size: int = 500,
+                            start_date: str = None, end_date: str = None):
+        """Yield the attendance CSV in chunks of chunk_size rows.
+        
+        The totals cover the inclusive date range if one is given; raises ValueError if it is malformed.
+        The CSV is never cached: holding a whole export would undo streaming it.
+        """
+        error = self.check_date_range(start_date, end_date)
+        if error:
+            raise ValueError(error)
+        yield from self._iter_csv_chunks(course_id, chunk_size, start_date, end_date)
+    
+    def _iter_csv_chunks(self, course_id: str = None, chunk_size: int = 500,
+                         start_date: str = None, end_date: str = None):
+        """Build the attendance CSV, yielding it every chunk_size rows."""
+        output = StringIO()
+        writer = csv.writer(output)
+        
+        # Create header row
+        if course_id:
+            writer.writerow(['Student ID', 'Name', 'Email', 'Total Days', 'Present', 'Absent', 'Late', 'Excused', 'Attendance %'])
+        else:
+            writer.writerow(['Student ID', 'Name', 'Email', 'Courses', 'Total Days', 'Present', 'Absent', 'Late', 'Excused', 'Attendance %'])
+        
+        # Write data rows as the summary is computed, flushing the buffer every chunk
+        courses = self.get_courses()
+        rows = 0
+        for student_id, student, data in self._iter_export_rows(course_id, start_date, end_date):
+            if course_id:
+                writer.writerow([
+                    student_id, student['name'], student['email'],
+                    data['total_days'], data['present_days'], data['absent_days'],
+                    data['late_days'], data['excused_days'], f"{data['attendance_percentage']:.2f}%"
+                ])
+            else:
+                course_names = [courses[c]['name'] for c in sorted(student['courses'])]
+                writer.writerow([
+                    student_id, student['name'], student['email'], 
+                    ', '.join(course_names),
+                    data['total_days'], data['present_days'], data['absent_days'],
+                    data['late_days'], data['excused_days'], f"{data['attendance_percentage']:.2f}%"
+                ])
+            rows += 1
+            if rows % chunk_size == 0:
+                yield output.getvalue()
+                output.seek(0)
+                output.truncate()
+                
+        yield output.getvalue()
+    
+    @_reads
+    def export_attendance_csv(self, course_id: str = None, start_date: str = None, end_date: str = None):
+        """Export attendance data as CSV, optionally counting only the marks in a date range."""
+        return ''.join(self.iter_attendance_csv(course_id, start_date=start_date, end_date=end_date))
+    
+    def _log_op(self, op: str, **args):
+        """Record that a mutation succeeded and queue it for the journal."""
+        self.data_version += 1
+        if op in self.CORE_OPS:
+            self._core_dirty = True
+        else:
+            self._dirty_registers.add(args.get('course_id') or None)
+        # A replayed entry comes with its own sequence number and time
+        if self._replaying:
+            now = self._replay_time
+        else:
+            self._journal_seq += 1
+            now = time.time()
+        seq = self._journal_seq
+        self._changed_at[None] = now
+        course_id = args.get('course_id')
+        if course_id:
+            self._course_versions[course_id] = seq
+            self._changed_at[('course', course_id)] = now
+        # A whole-course marking names its students in statuses
+        for student_id in (args['student_id'],) if 'student_id' in args else args.get('statuses', ()):
+            self._student_versions[student_id] = seq
+            self._changed_at[('student', student_id)] = now
+        if not self.journal or self._replaying:
+            return
+        self._pending_ops.append({'seq': seq, 'time': now, 'op': op, 'args': args})
+    
+    @staticmethod
+    def _journal_path(filename):
+        """Path of the journal that belongs to a snapshot file."""
+        return f"{filename}.log"
+    
+    @staticmethod
+    def _json_default(value):
+        """Serialise student and course records, and enrollment sets as sorted lists."""
+        if isinstance(value, (Student, Course)):
+            return value.to_dict()
+        if isinstance(value, set):
+            return sorted(value)
+        raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+    
+    def _write_snapshot(self, filename):
+        """Write the full system state to a snapshot, replacing the old one atomically.
+        
+        The format follows the file name: sharded for SHARDED_SNAPSHOT_SUFFIX, binary for
+        BINARY_SNAPSHOT_SUFFIX, JSON otherwise.
+        """
+        if is_sharded_snapshot(filename):
+            return self._write_shards(filename)
+        start = time.perf_counter()
+        tmp_filename = f"{filename}.tmp"
+        binary = is_binary_snapshot(filename)
+        with open(tmp_filename, 'wb' if binary else 'w') as f:
+            if binary:
+                write_binary_snapshot(f, self.records, self.courses, self._journal_seq)
+            else:
+                # json.dump() streams through the pure-Python encoder; encoding a record at a
+                # time with dumps() uses the C one without building the whole file in memory
+                f.write('{"records": {')
+                for i, (student_id, student) in enumerate(self.records.items()):
+                    f.write(f'{", " if i else ""}{json.dumps(student_id)}: {json.dumps(student.to_dict())}')
+                f.write(f'}}, "courses": {json.dumps(self.courses, default=self._json_default)}, '
+                        f'"journal_seq": {self._journal_seq}}}')
+            f.flush()
+            os.fsync(f.fileno())
+            size = f.tell()
+        if binary and os.name == 'nt':
+            # Windows cannot replace a file that is still mapped: read in what is left of it
+            for student in self.records.values():
+                for column in (student.attendance, *student.course_attendance.values()):
+                    column.materialise()
+        os.replace(tmp_filename, filename)
+        self._record_save('snapshot', size, start)
+        self._stamp_snapshot(filename)
+        return True
+    
+    def _stamp_snapshot(self, filename):
+        """Note the journal position and time of a snapshot just loaded or written as the data file's."""
+        if self._data_file in (None, filename):
+            self._snapshot_stamp = (self._journal_seq, os.stat(filename).st_mtime)
+    
+    def _record_save(self, kind: str, size: int, start: float):
+        """Count a snapshot or journal write that began at perf_counter() time start."""
+        metrics = self.metrics
+        if metrics is not None and metrics.enabled:
+            labels = (('kind', kind),)
+            metrics.observe('attendance_save_duration_seconds', labels, time.perf_counter() - start)
+            metrics.inc('attendance_save_bytes_total', labels, size)
+    
+    def _write_shards(self, dirname):
+        """Write a sharded snapshot: the core if it changed, and the shard of every changed register.
+        
+        Each file is replaced atomically on its own. A directory other than the one the
+        parts in memory came from gets every part.
+        """
+        start = time.perf_counter()
+        full = dirname != self._shards_dir
+        if full:
+            core = True
+            registers = {None}.union(*(student.course_attendance for student in self.records.values()))
+        else:
+            core, registers = self._core_dirty, set(self._dirty_registers)
+        os.makedirs(dirname, exist_ok=True)
+        
+        def replace(path, write):
+            with open(f"{path}.tmp", 'wb') as f:
+                write(f)
+                f.flush()
+                os.fsync(f.fileno())
+                size = f.tell()
+            os.replace(f"{path}.tmp", path)
+            return size
+        
+        size = 0
+        # The core goes first, so a shard never holds marks of a student the core lacks
+        if core:
+            data = {
+                'journal_seq': self._journal_seq,
+                'students': [[student_id, student.name, student.email, sorted(student.courses)]
+                             for student_id, student in self.records.items()],
+                'courses': {course_id: course.to_dict() for course_id, course in self.courses.items()}
+            }
+            size += replace(os.path.join(dirname, _CORE_SHARD), lambda f: f.write(json.dumps(data).encode()))
+        if registers:
+            # One pass over the students gathers the columns of every register to write
+            shards = {register: {} for register in registers}
+            for student_id, student in self.records.items():
+                for register, column in ((None, student.attendance), *student.course_attendance.items()):
+                    if register in shards and column:
+                        shards[register][student_id] = Student('', attendance=column)
+            for register, holders in shards.items():
+                if os.name == 'nt':
+                    # Windows cannot replace a file that is still mapped: read in what is left of it
+                    for holder in holders.values():
+                        holder.attendance.materialise()
+                size += replace(_shard_path(dirname, register),
+                                lambda f: write_binary_snapshot(f, holders, {}, self._journal_seq))
+        if full:
+            # Shards of registers that are gone, archived ones say, would be read back in
+            written = {_shard_path(dirname, register) for register in registers}
+            for entry in os.listdir(dirname):
+                path = os.path.join(dirname, entry)
+                if entry.endswith(BINARY_SNAPSHOT_SUFFIX) and path not in written:
+                    os.remove(path)
+        
+        self._shards_dir = dirname
+        self._core_dirty = False
+        self._dirty_registers.clear()
+        self._record_save('snapshot', size, start)
+        self._stamp_snapshot(dirname)
+        return True
+    
+    def _disk_version(self, filename):
+        """Cheap fingerprint of a data file and its journal: (snapshot stat, journal size)."""
+        try:
+            stat = os.stat(filename)
+            snapshot = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            snapshot = None
+        try:
+            journal_size = os.path.getsize(self._journal_path(filename))
+        except FileNotFoundError:
+            journal_size = 0
+        return snapshot, journal_size
+    
+    def _append_journal(self, filename, entries):
+        """Append journal entries durably; returns the size of the journal after them."""
+        start = time.perf_counter()
+        with open(self._journal_path(filename), 'a') as f:
+            offset = f.tell()
+            for entry in entries:
+                f.write(json.dumps(entry) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+            end = f.tell()
+        self._record_save('journal', end - offset, start)
+        return end
+    
+    def _flush_pending(self, filename):
+        """Write queued changes out: append them to the journal, or rewrite the snapshot."""
+        if not self.journal:
+            self._write_snapshot(filename)
+        elif self._pending_ops:
+            self._journal_offset = self._append_journal(filename, self._pending_ops)
+            self._journal_size += len(self._pending_ops)
+            self._pending_ops = []
+        self._seen_version = self._disk_version(filename)
+    
+    @_exclusive
+    def save_data(self, filename):
+        """Save the system data, appending to the journal when journaling is enabled."""
+        if self.write_behind is not None and filename == self.write_behind.filename:
+            return True  # The write-behind thread will write it out
+        with FileLock(filename):
+            # An attached engine has already written each change as it was made
+            if filename != self._data_file:
+                self._flush_pending(filename)
+            if self.journal and self._journal_size >= self.compact_threshold:
+                self._compact_locked(filename)
+        return True
+    
+    def flush(self, filename):
+        """Write out every queued change, compacting if the journal is due; returns the data version written.
+        
+        Called by the write-behind thread. The queued changes are taken under the engine
+        lock, but appended and synced after it is released, so requests do not wait on
+        the disk. A snapshot is written holding the read side only: it reads the data in
+        memory, so reads carry on while changes wait for it.
+        """
+        if not self.journal:
+            with self._lock.reading(), FileLock(filename):
+                version = self.data_version
+                self._write_snapshot(filename)
+                self._seen_version = self._disk_version(filename)
+            return version
+        
+        with self._lock.writing():
+            entries, self._pending_ops = self._pending_ops, []
+            version, resets = self.data_version, self._journal_resets
+        if entries:
+            try:
+                with FileLock(filename):
+                    end = self._append_journal(filename, entries)
+                    seen = self._disk_version(filename)
+            except Exception:
+                with self._lock.writing():
+                    # Queue them again, ahead of the changes made since
+                    self._pending_ops[:0] = entries
+                raise
+            with self._lock.writing():
+                # A compaction meanwhile already put the changes in the snapshot
+                if self._journal_resets == resets:
+                    self._journal_offset = end
+                    self._journal_size += len(entries)
+                    self._seen_version = seen
+        if self._journal_size >= self.compact_threshold:
+            with self._lock.reading(), FileLock(filename):
+                self._fold_journal(filename)
+        return version
+    
+    def start_write_behind(self, filename: str, interval: float = 1.0, batch_size: int = 100):
+        """Write changes to filename from a background thread instead of in each mutation.
+        
+        Changes are coalesced into one flush every interval seconds, or every batch_size
+        changes, and flushed a last time when the process exits. This process must be
+        the only one writing the file: changes other processes make are not picked up.
+        """
+        with self._lock.writing():
+            self.write_behind = WriteBehind(self, filename, interval, batch_size)
+        self.write_behind.start()
+        atexit.register(self.write_behind.stop)
+        return self.write_behind
+    
+    def stop_write_behind(self):
+        """Write out the remaining changes and go back to saving each change as it is made."""
+        with self._lock.writing():
+            writer, self.write_behind = self.write_behind, None
+        if writer is not None:
+            atexit.unregister(writer.stop)
+            writer.stop()
+    
+    @_exclusive
+    def compact(self, filename):
+        """Fold the journal into a fresh snapshot and truncate the log."""
+        with FileLock(filename):
+            self._compact_locked(filename)
+        return True
+    
+    def _compact_locked(self, filename):
+        """Compact with the file lock already held."""
+        # Include anything other processes logged since we last looked
+        if filename == self._data_file:
+            self._catch_up()
+        self._fold_journal(filename)
+    
+    def _fold_journal(self, filename):
+        """Write the data in memory to a fresh snapshot and truncate the journal it replaces."""
+        # The snapshot records the last sequence number it contains, so a crash
+        # between these two steps only leaves entries that replay will skip
+        self._write_snapshot(filename)
+        self._pending_ops = []
+        open(self._journal_path(filename), 'w').close()
+        self._journal_size = 0
+        self._journal_offset = 0
+        self._journal_resets += 1
+        self._seen_version = self._disk_version(filename)
+    
+    @staticmethod
+    def _archive_dir(filename):
+        """Directory of the archives that belong to a data file."""
+        return f"{filename}.archive"
+    
+    def _load_archives(self, filename):
+        """Read the archive index of a data file."""
+        directory = self._archive_dir(filename)
+        try:
+            with open(os.path.join(directory, 'index.json')) as f:
+                archives = json.load(f)
+        except FileNotFoundError:
+            archives = []
+        for archive in archives:
+            archive['path'] = os.path.join(directory, archive['file'])
+        self._archives = archives
+        befores = [archive['before'] for archive in archives if archive['before']]
+        self._archived_before = max(befores) if befores else None
+        self._archived_courses = {course_id for archive in archives for course_id in archive['courses']}
+    
+    def _archived_parts(self, archive):
+        """Yield (student_id, course_id or None, {date: status}) for each live register holding marks an archive covers."""
+        courses = set(archive['courses'])
+        last = _to_date(_to_day(archive['before']) - 1) if archive['before'] else None
+        for student_id, student in self.records.items():
+            for course_id, column in ((None, student.attendance), *student.course_attendance.items()):
+                if not column:
+                    continue
+                if course_id in courses:
+                    marks = column.as_dict()
+                elif last:
+                    marks = column.between(None, last)
+                else:
+                    continue
+                if marks:
+                    yield student_id, course_id, marks
+    
+    def _drop_archived(self, archive):
+        """Take the marks an archive covers out of the live registers; the indexes need rebuilding after."""
+        for student_id, course_id, marks in list(self._archived_parts(archive)):
+            student = self.records[student_id]
+            kept = MarkColumn({date: status for date, status in student.register(course_id).items() if date not in marks})
+            if course_id is None:
+                student.attendance = kept
+            elif kept:
+                student.course_attendance[course_id] = kept
+            else:
+                del student.course_attendance[course_id]
+    
+    @_exclusive
+    def archive(self, filename, before: str = None, course_ids=()):
+        """Move the marks dated before `before`, and every mark of course_ids, into a compressed archive.
+        
+        The archive is written to "<data file>.archive" and the data file is compacted
+        without those marks, so loading and saving no longer pay for them. Archived marks
+        are read-only, and only queries with a date range reaching back into an archive
+        open it. Returns (success, message).
+        """
+        if before and not _parse_day(before):
+            return False, f"Error: Invalid date '{before}'. Use the YYYY-MM-DD format."
+        if not before and not course_ids:
+            return False, "Error: Give a date or courses to archive."
+        with FileLock(filename):
+            if filename == self._data_file:
+                self._catch_up()
+            for course_id in course_ids:
+                if course_id not in self.courses:
+                    return False, f"Error: Course ID {course_id} not found."
+            archive = {'seq': self._journal_seq + 1, 'before': before or None, 'courses': sorted(set(course_ids))}
+            students = {}
+            for student_id, course_id, marks in self._archived_parts(archive):
+                students.setdefault(student_id, {})[course_id or ''] = marks
+            if not students:
+                return False, "Error: No marks to archive."
+            dates = [date for registers in students.values() for marks in registers.values() for date in marks
+                     if _to_day(date)]
+            archive.update(file=f"{archive['seq']:010d}.json.gz", first_date=min(dates, default=None),
+                           last_date=max(dates, default=None),
+                           marks=sum(len(marks) for registers in students.values() for marks in registers.values()))
+            
+            # The archive and then the index go first; the snapshot written last carries the
+            # archive's sequence number, so load_data() can tell if it was never written
+            directory = self._archive_dir(filename)
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, archive['file'])
+            with open(f"{path}.tmp", 'wb') as f:
+                with gzip.GzipFile(fileobj=f, mode='wb') as compressed:
+                    compressed.write(json.dumps({**archive, 'students': students}).encode())
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(f"{path}.tmp", path)
+            self._load_archives(filename)
+            index = [{key: value for key, value in entry.items() if key != 'path'} for entry in self._archives]
+            index.append(archive)
+            with open(os.path.join(directory, 'index.json.tmp'), 'w') as f:
+                json.dump(index, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(os.path.join(directory, 'index.json.tmp'), os.path.join(directory, 'index.json'))
+            self._load_archives(filename)
+            
+            self._drop_archived(archive)
+            self._rebuild_indexes()
+            self._journal_seq = archive['seq']
+            self._shards_dir = None  # Every shard may have lost marks
+            self._compact_locked(filename)
+        return True, f"Archived {archive['marks']} marks to {path}."
+    
+    @_exclusive
+    def load_data(self, filename, repair: bool = True):
+        """Load the system data from a JSON, binary or sharded snapshot, replaying the journal if enabled.
+        
+        The index of the data file's archives is read too; their marks stay on disk.
+        """
+        loaded = False
+        self._shard_seqs = None
+        if is_sharded_snapshot(filename):
+            if os.path.exists(os.path.join(filename, _CORE_SHARD)):
+                self.records, self.courses, self._shard_seqs = read_sharded_snapshot(filename)
+                self._journal_seq = max(self._shard_seqs.values())
+                self._rebuild_indexes()
+                loaded = True
+        elif os.path.exists(filename) and is_binary_snapshot(filename):
+            self.records, self.courses, self._journal_seq = read_binary_snapshot(filename)
+            self._rebuild_indexes()
+            loaded = True
+        elif os.path.exists(filename):
+            with open(filename, 'r') as f:
+                data = json.load(f)
+                records = data.get('records', {})
+                courses = data.get('courses', {})
+                self._journal_seq = data.get('journal_seq', 0)
+            for student in records.values():
+                self._upgrade_record(student)
+            self.records = {
+                student_id: Student(student['name'], student.get('email', ''), student.get('courses', ()),
+                                    student['attendance'], student['course_attendance'])
+                for student_id, student in records.items()
+            }
+            self.courses = {course_id: Course.from_dict(course) for course_id, course in courses.items()}
+            self._rebuild_indexes()
+            loaded = True
+        
+        # Whatever is in memory now is what the file holds, until replayed changes mark it dirty
+        self._shards_dir = filename if loaded and self._shard_seqs is not None else None
+        if loaded:
+            self._stamp_snapshot(filename)
+        else:
+            self._snapshot_stamp = (0, 0.0)
+        self._core_dirty = False
+        self._dirty_registers.clear()
+        
+        # An archive newer than the snapshot was cut short before the snapshot was rewritten:
+        # its marks are still in the snapshot as well, so finish moving them out
+        self._load_archives(filename)
+        written = min(self._shard_seqs.values()) if self._shard_seqs else self._journal_seq
+        unfinished = [archive for archive in self._archives if archive['seq'] > written]
+        if unfinished:
+            for archive in unfinished:
+                self._drop_archived(archive)
+            self._rebuild_indexes()
+            self._shards_dir = None
+        self._journal_offset = 0
+        self._journal_size = 0
+        self._journal_resets += 1
+        if self.journal and os.path.exists(self._journal_path(filename)):
+            self._replay_journal(self._journal_path(filename), repair)
+            loaded = True
+        # Archiving takes a sequence number without a journal entry; never hand it out again
+        self._journal_seq = max([self._journal_seq, *(archive['seq'] for archive in self._archives)])
+        self._seen_version = self._disk_version(filename)
+        if self.write_behind is not None:
+            self.write_behind.synced()
+        self.ready.set()
+        return loaded
+    
+    @_exclusive
+    def attach(self, filename):
+        """Load a data file and keep this engine in step with other processes sharing it.
+        
+        Once attached, every mutation is written out under an inter-process lock as it
+        is made, and refresh() picks up what other processes wrote in the meantime.
+        """
+        with FileLock(filename):
+            loaded = self.load_data(filename)
+        self._data_file = filename
+        return loaded
+    
+    def attach_in_background(self, filename):
+        """Run attach() on a daemon thread so the caller can start serving at once; wait on self.ready."""
+        def load():
+            try:
+                self.attach(filename)
+            except Exception as exc:
+                # ready stays unset: serving a half-loaded engine could overwrite the real data
+                self.load_error = exc
+                raise
+        
+        self.ready.clear()
+        thread = threading.Thread(target=load, name='attendance-load', daemon=True)
+        thread.start()
+        return thread
+    
+    def refresh(self):
+        """Catch up with the attached data file if another process changed it; cheap when nothing moved."""
+        if self._data_file is None or self.write_behind is not None:
+            return False  # In write-behind mode the unwritten changes in memory are the newest
+        if self._disk_version(self._data_file) == self._seen_version:
+            return False
+        with self._lock.writing(), FileLock(self._data_file, shared=True):
+            self._catch_up()
+        return True
+    
+    def _catch_up(self):
+        """Apply what changed on disk since we last looked (engine and file locks held)."""
+        snapshot, journal_size = self._disk_version(self._data_file)
+        if self._seen_version is None or snapshot != self._seen_version[0]:
+            # Another process wrote a new snapshot: start again from it
+            self.load_data(self._data_file, repair=False)
+        elif self.journal and journal_size > self._journal_offset:
+            self._replay_journal(self._journal_path(self._data_file), repair=False)
+            self._seen_version = self._disk_version(self._data_file)
+    
+    def _snapshot_seq(self, entry):
+        """Sequence number of the last journal entry already in the loaded state of the part entry changes.
+        
+        A sharded snapshot's parts are written at different times, so each has its own.
+        """
+        if self._shard_seqs is None:
+            return self._journal_seq
+        part = 'core' if entry['op'] in self.CORE_OPS else entry['args'].get('course_id') or None
+        return self._shard_seqs.get(part, 0)
+    
+    def _replay_op(self, op: str, args: dict):
+        """Apply one journal entry; return an error message if it could not be applied, else None.
+        
+        Marks were checked when they were made, and go straight into the registers: a
+        sharded snapshot's core can be newer than its shards, so checking them again
+        against its enrollments would turn away marks of students unenrolled since.
+        """
+        if op not in self.MARK_OPS:
+            success, message = getattr(self, op)(**args)
+            return None if success else message
+        course_id = args.get('course_id')
+        if course_id and course_id not in self.courses:
+            return f"Error: Course ID {course_id} not found."
+        if self._archived_error(args['date'], course_id):
+            return None  # Archived after it was logged: the archive holds the mark
+        marks = args['statuses'] if op == 'mark_course_attendance' else {args['student_id']: args['status']}
+        missing = [student_id for student_id in marks if student_id not in self.records]
+        if missing:
+            return f"Error: Student ID {', '.join(missing)} not found."
+        for student_id, status in marks.items():
+            self._set_mark(student_id, course_id, args['date'], status)
+        self._log_op(op, **args)
+        return None
+    
+    def _replay_journal(self, journal_filename, repair: bool = True):
+        """Apply journal entries past the current offset that are newer than the loaded state."""
+        replayed = 0
+        valid_bytes = 0
+        self._replaying = True
+        try:
+            with open(journal_filename, 'rb') as f:
+                f.seek(self._journal_offset)
+                for line in f:
+                    # A crash mid-append can leave a partial last line; stop there
+                    if not line.endswith(b'\n'):
+                        break
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break
+                    valid_bytes += len(line)
+                    if entry['op'] not in self.JOURNAL_OPS or entry['seq'] <= self._snapshot_seq(entry):
+                        continue
+                    self._journal_seq = entry['seq']
+                    self._replay_time = entry.get('time', 0.0)
+                    error = self._replay_op(entry['op'], entry['args'])
+                    if error:
+                        log.warning("Journal entry %s (%s) could not be replayed: %s", entry['seq'], entry['op'], error)
+                    replayed += 1
+        finally:
+            self._replaying = False
+        
+        self._journal_offset += valid_bytes
+        # Drop any torn tail so new entries are not appended after garbage
+        if repair and os.path.getsize(journal_filename) > self._journal_offset:
+            with open(journal_filename, 'r+b') as f:
+                f.truncate(self._journal_offset)
+        self._journal_size += replayed
+        return replayed
 
+@_instrumented
+class SQLiteAttendanceSystem(EnhancedAttendanceSystem):
+    """Attendance system stored in an SQLite database instead of in-memory dicts.
+    
+    Implements the same public methods and (success, message) results as
+    EnhancedAttendanceSystem, but every query runs against indexed tables, so
+    memory use and startup time no longer grow with the size of the school.
+    General (non-course) marks are stored with an empty course_id.
+    """
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS students (
+            student_id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            name_key TEXT NOT NULL,
+            email TEXT NOT NULL DEFAULT ''
+        );
+        CREATE INDEX IF NOT EXISTS idx_students_name ON students (name_key, student_id);
+        CREATE TABLE IF NOT EXISTS courses (
+            course_id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            instructor TEXT NOT NULL DEFAULT ''
+        );
+        CREATE TABLE IF NOT EXISTS enrollments (
+            student_id TEXT NOT NULL,
+            course_id TEXT NOT NULL,
+            PRIMARY KEY (student_id, course_id)
+        );
+        CREATE INDEX IF NOT EXISTS idx_enrollments_course ON enrollments (course_id, student_id);
+        CREATE TABLE IF NOT EXISTS attendance (
+            student_id TEXT NOT NULL,
+            course_id TEXT NOT NULL DEFAULT '',
+            date TEXT NOT NULL,
+            status TEXT NOT NULL,
+            PRIMARY KEY (student_id, course_id, date)
+        );
+        CREATE INDEX IF NOT EXISTS idx_attendance_course_date ON attendance (course_id, date);
+        CREATE INDEX IF NOT EXISTS idx_attendance_date ON attendance (date);
+        CREATE TABLE IF NOT EXISTS revision (
+            version INTEGER NOT NULL,
+            changed_at REAL NOT NULL
+        );
+        INSERT INTO revision SELECT 0, (julianday('now') - 2440587.5) * 86400.0
+            WHERE NOT EXISTS (SELECT 1 FROM revision);
+    """ + ''.join(f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_{event.lower()}_revision AFTER {event} ON {table} BEGIN
+            UPDATE revision SET version = version + 1, changed_at = (julianday('now') - 2440587.5) * 86400.0;
+        END;""" for table in ('students', 'courses', 'enrollments', 'attendance') for event in ('INSERT', 'UPDATE', 'DELETE'))
+    
+    def __init__(self, db_path: str, cache_size: int = 32):
+        """Open (creating if needed) the database at db_path."""
+        self.db_path = db_path
+        self._lock = ReadWriteLock()
+        self._data_file = None
+        self._syncing = False
+        self._replaying = False
+        self._results = ResultCache(cache_size) if cache_size else None
+        self.ready = threading.Event()
+        self.ready.set()
+        self.load_error = None
+        self.write_behind = None  # Every change is committed as it is made
+        self.metrics = None
+        self.risk_threshold = 75.0
+        self._risk_listeners = []
+        # Flask may serve requests from several threads; they share this connection
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._in_transaction = False
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(self.SCHEMA)
+    
+    def _result_stamp(self, course_id: str = None):
+        """Version of the whole database: other connections' commits plus our own changes.
+        
+        Other processes can write at any time without saying which course they touched,
+        so every cached result is stamped with the same whole-database version.
+        """
+        return self._db.execute("PRAGMA data_version").fetchone()[0], self._db.total_changes
+    
+    @_reads
+    def data_stamp(self, student_id: str = None, course_id: str = None):
+        """Return (tag, last-modified time); without per-entity versions every tag is the database's.
+        
+        Triggers count every write in the revision table, so all connections agree on it.
+        """
+        version, changed = self._db.execute("SELECT version, changed_at FROM revision").fetchone()
+        return str(version), datetime.fromtimestamp(changed, timezone.utc)
+    
+    @contextmanager
+    def _transaction(self):
+        """Commit the changes of a with block, or roll them back if it raises.
+        
+        A nested block joins the enclosing transaction instead of committing on its
+        own, so a batch of mutations is committed once at the end.
+        """
+        if self._in_transaction:
+            yield
+            return
+        self._in_transaction = True
+        try:
+            with self._db:
+                yield
+        finally:
+            self._in_transaction = False
+    
+    def _student_name(self, student_id: str):
+        """Return a student's name, or None if the ID is unknown."""
+        row = self._db.execute("SELECT name FROM students WHERE student_id = ?", (student_id,)).fetchone()
+        return row[0] if row else None
+    
+    def _is_enrolled(self, student_id: str, course_id: str):
+        """Check whether a student is enrolled in a course."""
+        return self._db.execute(
+            "SELECT 1 FROM enrollments WHERE student_id = ? AND course_id = ?", (student_id, course_id)
+        ).fetchone() is not None
+    
+    @_mutation
     def add_student(self, student_id: str, name: str, email: str = ""):
         """Add a new student to the attendance system with error handling."""
         if not student_id or not name:
             return False, "Student ID and name cannot be empty."
-        if student_id in self.records:
+        if self._student_name(student_id) is not None:
             return False, f"Error: Student ID {student_id} already exists."
-        else:
-            self.records[student_id] = {
-                'name': name, 
-                'email': email,
-                'attendance': {},
-                'courses': []  # Track enrolled courses
-            }
-            return True, f"Student {name} added successfully."
-
+        with self._transaction():
+            self._db.execute("INSERT INTO students (student_id, name, name_key, email) VALUES (?, ?, ?, ?)",
+                             (student_id, name, name.lower(), email))
+        return True, f"Student {name} added successfully."
+    
+    @_mutation
     def mark_attendance(self, student_id: str, date: str, status: str = "Present", course_id: str = None):
         """Mark a student's attendance for a specific date with validation."""
-        if student_id not in self.records:
+        name = self._student_name(student_id)
+        if name is None:
             return False, f"Error: Student ID {student_id} not found."
         
-        # Create attendance by course if course_id is provided
         if course_id:
-            if course_id not in self.courses:
+            if self.get_course(course_id) is None:
                 return False, f"Error: Course ID {course_id} not found."
-            
-            if course_id not in self.records[student_id]['courses']:
-                return False, f"Error: Student not enrolled in this course."
-                
-            attendance_key = f"{date}_{course_id}"
-        else:
-            attendance_key = date
-            
-        if attendance_key in self.records[student_id]['attendance']:
-            return False, f"Error: Attendance for {self.records[student_id]['name']} on {date} is already recorded."
+            if not self._is_enrolled(student_id, course_id):
+                return False, "Error: Student not enrolled in this course."
         
-        if status not in ["Present", "Absent", "Late", "Excused"]:  # Added more status options
+        if date in self._marks(student_id, course_id):
+            return False, f"Error: Attendance for {name} on {date} is already recorded."
+        
+        if status not in self.STATUSES:
             return False, "Error: Status must be 'Present', 'Absent', 'Late', or 'Excused'."
         
-        self.records[student_id]['attendance'][attendance_key] = status
-        return True, f"Attendance marked for {self.records[student_id]['name']} on {date} as {status}."
-
+        before = self._rates([student_id], course_id) if self._risk_listeners else None
+        with self._transaction():
+            self._db.execute("INSERT INTO attendance (student_id, course_id, date, status) VALUES (?, ?, ?, ?)",
+                             (student_id, course_id or '', date, status))
+        if before is not None:
+            self._rates_moved(before, self._rates([student_id], course_id))
+        return True, f"Attendance marked for {name} on {date} as {status}."
+    
+    @_mutation
+    def mark_course_attendance(self, course_id: str, date: str, statuses: dict = None,
+                               default_status: str = "Present", skip_marked: bool = False):
+        """Mark a whole course roster for one date in a single transaction."""
+        course = self.get_course(course_id)
+        if course is None:
+            return False, f"Error: Course ID {course_id} not found."
+        if not date:
+            return False, "Error: Date cannot be empty."
+        
+        statuses = statuses or {}
+        roster = self.get_course_roster(course_id)
+        enrolled = set(roster)
+        already_marked = self.get_course_marks(course_id, date)
+        
+        # Validate the whole batch before touching any record
+        errors = [f"{student_id} is not enrolled in this course" for student_id in statuses if student_id not in enrolled]
+        marks = {}
+        for student_id in roster:
+            status = statuses.get(student_id, default_status)
+            if status not in self.STATUSES:
+                errors.append(f"{student_id} has invalid status '{status}'")
+            elif student_id in already_marked:
+                if not skip_marked:
+                    errors.append(f"{student_id} is already marked on {date}")
+            else:
+                marks[student_id] = status
+        if errors:
+            more = f" (and {len(errors) - 5} more)" if len(errors) > 5 else ""
+            return False, "Error: " + "; ".join(errors[:5]) + more + "."
+        if not marks:
+            return False, f"Error: No students left to mark in this course on {date}."
+        
+        before = self._rates(list(marks), course_id) if self._risk_listeners else None
+        with self._transaction():
+            self._db.executemany("INSERT INTO attendance (student_id, course_id, date, status) VALUES (?, ?, ?, ?)",
+                                 [(student_id, course_id, date, status) for student_id, status in marks.items()])
+        if before is not None:
+            self._rates_moved(before, self._rates(list(marks), course_id))
+        return True, f"Attendance marked for {len(marks)} students in {course['name']} on {date}."
+    
+    @_mutation
     def edit_attendance(self, student_id: str, date: str, status: str, course_id: str = None):
         """Edit an existing attendance record."""
-        if student_id not in self.records:
+        name = self._student_name(student_id)
+        if name is None:
             return False, f"Error: Student ID {student_id} not found."
-            
-        attendance_key = f"{date}_{course_id}" if course_id else date
-            
-        if attendance_key not in self.records[student_id]['attendance']:
-            return False, f"Error: No attendance record found for this date."
-            
-        if status not in ["Present", "Absent", "Late", "Excused"]:
+        
+        if date not in self._marks(student_id, course_id):
+            return False, "Error: No attendance record found for this date."
+        
+        if status not in self.STATUSES:
             return False, "Error: Status must be 'Present', 'Absent', 'Late', or 'Excused'."
-            
-        self.records[student_id]['attendance'][attendance_key] = status
-        return True, f"Attendance updated for {self.records[student_id]['name']} on {date} as {status}."
-
-    def get_attendance(self, student_id: str, course_id: str = None):
+        
+        before = self._rates([student_id], course_id) if self._risk_listeners else None
+        with self._transaction():
+            self._db.execute("UPDATE attendance SET status = ? WHERE student_id = ? AND course_id = ? AND date = ?",
+                             (status, student_id, course_id or '', date))
+        if before is not None:
+            self._rates_moved(before, self._rates([student_id], course_id))
+        return True, f"Attendance updated for {name} on {date} as {status}."
+    
+    def _rates(self, student_ids, course_id: str = None):
+        """Return {(student_id, None or course_id): percentage} across all registers and in a course."""
+        rates = {}
+        # Each ID is bound twice; stay well under SQLite's limit on bound parameters
+        for start in range(0, len(student_ids), 400):
+            chunk = student_ids[start:start + 400]
+            placeholders = ', '.join('?' * len(chunk))
+            for student_id, scope, total, present in self._db.execute(f"""
+                    SELECT student_id, NULL, COUNT(*), SUM(status = 'Present') FROM attendance
+                    WHERE student_id IN ({placeholders}) GROUP BY student_id
+                    UNION ALL
+                    SELECT student_id, course_id, COUNT(*), SUM(status = 'Present') FROM attendance
+                    WHERE course_id = ? AND student_id IN ({placeholders}) GROUP BY student_id""",
+                    (*chunk, course_id or '', *chunk)):
+                if scope is None or course_id:
+                    rates[(student_id, scope)] = present / total * 100
+        return rates
+    
+    def _rates_moved(self, before, after):
+        """Call the risk listeners for the percentages that moved across risk_threshold."""
+        for (student_id, course_id), rate in after.items():
+            self._check_risk(student_id, course_id, before.get((student_id, course_id)), rate)
+    
+    @_reads
+    def get_at_risk(self, course_id: str = None, threshold: float = None, limit: int = None, offset: int = 0):
+        """Return (success, message, result) for the students below threshold percent, lowest first.
+        
+        The database aggregates and sorts every rated student on each call.
+        """
+        if course_id and self.get_course(course_id) is None:
+            return False, f"Error: Course ID {course_id} not found.", {}
+        threshold = self.risk_threshold if threshold is None else threshold
+        columns = """
+            s.student_id, s.name, COUNT(*), SUM(a.status = 'Present'), SUM(a.status = 'Absent'),
+            SUM(a.status = 'Late'), SUM(a.status = 'Excused')
+        """
+        if course_id:
+            rows = self._db.execute(f"""
+                SELECT {columns} FROM enrollments e
+                JOIN students s ON s.student_id = e.student_id
+                JOIN attendance a ON a.student_id = e.student_id AND a.course_id = e.course_id
+                WHERE e.course_id = ? GROUP BY s.student_id
+            """, (course_id,))
+        else:
+            rows = self._db.execute(f"""
+                SELECT {columns} FROM students s JOIN attendance a ON a.student_id = s.student_id
+                GROUP BY s.student_id
+            """)
+        # Rated in Python as the JSON engine does, so both agree at the threshold
+        rated = sorted((present / total * 100, student_id, name, total, present, *counts)
+                       for student_id, name, total, present, *counts in rows)
+        below = rated[:bisect_left(rated, (threshold,))]
+        page = below[offset:] if limit is None else below[offset:offset + limit]
+        students = {student_id: self._summary_row(name, *counts) for rate, student_id, name, *counts in page}
+        return True, f"{len(below)} students below {threshold:g}%.", {'students': students, 'total': len(below)}
+    
+    def _marks(self, student_id: str, course_id: str = None):
+        """Return the date -> status dict for a student, scoped to a course if given."""
+        return dict(self._db.execute(
+            "SELECT date, status FROM attendance WHERE student_id = ? AND course_id = ? ORDER BY rowid",
+            (student_id, course_id or '')
+        ))
+    
+    @_reads
+    def get_attendance(self, student_id: str, course_id: str = None, start_date: str = None, end_date: str = None):
         """Retrieve the attendance record of a specific student with validation."""
-        if student_id not in self.records:
+        if self._student_name(student_id) is None:
             return False, f"Error: Student ID {student_id} not found.", {}
-        
+        error = self.check_date_range(start_date, end_date)
+        if error:
+            return False, error, {}
+        if start_date or end_date:
+            dates_sql, params = self._date_filter(start_date, end_date)
+            return True, "Success", dict(self._db.execute(
+                "SELECT date, status FROM attendance WHERE student_id = ? AND course_id = ?" + dates_sql + " ORDER BY date",
+                (student_id, course_id or '', *params)
+            ))
+        return True, "Success", self._marks(student_id, course_id)
+    
+    @classmethod
+    def _date_filter(cls, start_date: str = None, end_date: str = None, column: str = "date"):
+        """Return an SQL condition (starting with AND) and its parameters limiting column to a date range."""
+        if not (start_date or end_date):
+            return "", ()
+        # Match the JSON engine, whose date index only holds real YYYY-MM-DD days: a
+        # modifier makes date() roll impossible ones such as 2025-02-30 over, and Python
+        # has no year 0
+        sql = f" AND date({column}, '+0 days') = {column} AND {column} >= '0001-01-01'"
+        params = []
+        if start_date:
+            sql += f" AND {column} >= ?"
+            params.append(start_date)
+        if end_date:
+            sql += f" AND {column} <= ?"
+            params.append(end_date)
+        return sql, tuple(params)
+    
+    @_reads
+    def get_attendance_rows(self, student_id: str, start_date: str = None, end_date: str = None):
+        """List every mark of a student as {'date', 'course_id', 'status'} rows ordered by date, optionally within a date range."""
+        dates_sql, params = self._date_filter(start_date, end_date)
+        return [
+            {'date': date, 'course_id': course_id or None, 'status': status}
+            for date, course_id, status in self._db.execute(
+                "SELECT date, course_id, status FROM attendance WHERE student_id = ?" + dates_sql + " ORDER BY date, course_id",
+                (student_id, *params))
+        ]
+    
+    # Status counts for a student, optionally restricted to one course
+    _COUNTS_SQL = """
+        SELECT COUNT(*), SUM(status = 'Present'), SUM(status = 'Absent'),
+               SUM(status = 'Late'), SUM(status = 'Excused')
+        FROM attendance WHERE student_id = ?
+    """
+    
+    @_reads
+    def summarize_student(self, student_id: str, course_id: str = None, start_date: str = None, end_date: str = None):
+        """Build the summary row of one student with an aggregate query."""
+        dates_sql, params = self._date_filter(start_date, end_date)
         if course_id:
-            # Filter attendance records for the specific course
-            course_attendance = {
-                k.split('_')[0]: v for k, v in self.records[student_id]['attendance'].items() 
-                if k.endswith(f"_{course_id}")
-            }
-            return True, "Success", course_attendance
+            counts = self._db.execute(self._COUNTS_SQL + " AND course_id = ?" + dates_sql,
+                                      (student_id, course_id, *params)).fetchone()
         else:
-            # Return all attendance records
-            return True, "Success", self.records[student_id]['attendance']
-
-    def get_summary(self, course_id: str = None):
-        """Generate a summary of attendance for all students, optionally filtered by course."""
-        summary = {}
-        
-        for student_id, data in self.records.items():
-            if course_id and course_id not in data['courses']:
-                continue  # Skip students not enrolled in this course
-                
-            # Filter attendance records for the course if specified
-            if course_id:
-                attendance_records = {
-                    k: v for k, v in data['attendance'].items() 
-                    if k.endswith(f"_{course_id}")
-                }
-            else:
-                attendance_records = data['attendance']
-                
-            total_days = len(attendance_records)
-            present_days = sum(1 for status in attendance_records.values() if status == "Present")
-            absent_days = sum(1 for status in attendance_records.values() if status == "Absent")
-            late_days = sum(1 for status in attendance_records.values() if status == "Late")
-            excused_days = sum(1 for status in attendance_records.values() if status == "Excused")
-            
-            summary[student_id] = {
-                'name': data['name'],
-                'total_days': total_days,
-                'present_days': present_days,
-                'absent_days': absent_days,
-                'late_days': late_days,
-                'excused_days': excused_days,
-                'attendance_percentage': (present_days / total_days * 100) if total_days > 0 else 0.0
-            }
-        return summary
-        
+            counts = self._db.execute(self._COUNTS_SQL + dates_sql, (student_id, *params)).fetchone()
+        return self._summary_row(self._student_name(student_id), *counts)
+    
+    def _summary_query(self, course_id: str = None, start_date: str = None, end_date: str = None):
+        """Run the per-student aggregate for the whole school or one course roster."""
+        columns = """
+            s.student_id, s.name, s.email,
+            COUNT(a.status), SUM(a.status = 'Present'), SUM(a.status = 'Absent'),
+            SUM(a.status = 'Late'), SUM(a.status = 'Excused')
+        """
+        # The range goes in the join so students without marks in it still get a row
+        dates_sql, params = self._date_filter(start_date, end_date, "a.date")
+        if course_id:
+            return self._db.execute(f"""
+                SELECT {columns}
+                FROM enrollments e
+                JOIN students s ON s.student_id = e.student_id
+                LEFT JOIN attendance a ON a.student_id = e.student_id AND a.course_id = e.course_id{dates_sql}
+                WHERE e.course_id = ?
+                GROUP BY s.student_id ORDER BY s.student_id
+            """, (*params, course_id))
+        return self._db.execute(f"""
+            SELECT {columns}
+            FROM students s LEFT JOIN attendance a ON a.student_id = s.student_id{dates_sql}
+            GROUP BY s.student_id ORDER BY s.rowid
+        """, params)
+    
+    def iter_summary(self, course_id: str = None, start_date: str = None, end_date: str = None):
+        """Yield (student_id, summary row) pairs straight from the database cursor."""
+        for student_id, name, email, *counts in self._summary_query(course_id, start_date, end_date):
+            yield student_id, self._summary_row(name, *counts)
+    
+    def _iter_export_rows(self, course_id: str = None, start_date: str = None, end_date: str = None):
+        """Yield (student_id, student record, summary row) for the CSV export."""
+        enrollments = {}
+        if not course_id:
+            for student_id, enrolled_course in self._db.execute("SELECT student_id, course_id FROM enrollments"):
+                enrollments.setdefault(student_id, set()).add(enrolled_course)
+        for student_id, name, email, *counts in self._summary_query(course_id, start_date, end_date):
+            student = {'name': name, 'email': email, 'courses': enrollments.get(student_id, set())}
+            yield student_id, student, self._summary_row(name, *counts)
+    
+    @_mutation
     def add_course(self, course_id: str, course_name: str, instructor: str = ""):
         """Add a new course to the system."""
         if not course_id or not course_name:
             return False, "Course ID and name cannot be empty."
-        if course_id in self.courses:
+        if self.get_course(course_id) is not None:
             return False, f"Error: Course ID {course_id} already exists."
-            
-        self.courses[course_id] = {
-            'name': course_name,
-            'instructor': instructor,
-            'schedule': []
-        }
+        with self._transaction():
+            self._db.execute("INSERT INTO courses (course_id, name, instructor) VALUES (?, ?, ?)",
+                             (course_id, course_name, instructor))
         return True, f"Course {course_name} added successfully."
-        
+    
+    @_mutation
     def enroll_student(self, student_id: str, course_id: str):
         """Enroll a student in a course."""
-        if student_id not in self.records:
+        name = self._student_name(student_id)
+        if name is None:
             return False, f"Error: Student ID {student_id} not found."
-        if course_id not in self.courses:
+        course = self.get_course(course_id)
+        if course is None:
             return False, f"Error: Course ID {course_id} not found."
-        
-        # Check if already enrolled
-        if course_id in self.records[student_id]['courses']:
-            return False, f"Student already enrolled in this course."
-            
-        self.records[student_id]['courses'].append(course_id)
-        return True, f"Student {self.records[student_id]['name']} enrolled in {self.courses[course_id]['name']}."
+        if self._is_enrolled(student_id, course_id):
+            return False, "Student already enrolled in this course."
+        with self._transaction():
+            self._db.execute("INSERT INTO enrollments (student_id, course_id) VALUES (?, ?)", (student_id, course_id))
+        return True, f"Student {name} enrolled in {course['name']}."
     
+    @_mutation
     def unenroll_student(self, student_id: str, course_id: str):
         """Remove a student from a course."""
-        if student_id not in self.records:
+        name = self._student_name(student_id)
+        if name is None:
             return False, f"Error: Student ID {student_id} not found."
-        if course_id not in self.courses:
+        course = self.get_course(course_id)
+        if course is None:
             return False, f"Error: Course ID {course_id} not found."
-            
-        if course_id not in self.records[student_id]['courses']:
-            return False, f"Student not enrolled in this course."
-            
-        self.records[student_id]['courses'].remove(course_id)
-        return True, f"Student {self.records[student_id]['name']} unenrolled from {self.courses[course_id]['name']}."
+        if not self._is_enrolled(student_id, course_id):
+            return False, "Student not enrolled in this course."
+        with self._transaction():
+            self._db.execute("DELETE FROM enrollments WHERE student_id = ? AND course_id = ?", (student_id, course_id))
+        return True, f"Student {name} unenrolled from {course['name']}."
     
-    def export_attendance_csv(self, course_id: str = None):
-        """Export attendance data as CSV."""
-        output = StringIO()
-        writer = csv.writer(output)
+    @_reads
+    def get_student(self, student_id: str):
+        """Return a student's record, or None if the ID is unknown."""
+        return self.get_students([student_id]).get(student_id)
+    
+    @_reads
+    def get_students(self, student_ids):
+        """Return {student_id: record} for the known IDs among student_ids, in the order given."""
+        student_ids = list(student_ids)
+        found = {}
+        # Stay well under SQLite's limit on bound parameters
+        for start in range(0, len(student_ids), 500):
+            chunk = student_ids[start:start + 500]
+            placeholders = ', '.join('?' * len(chunk))
+            for student_id, name, email in self._db.execute(
+                    f"SELECT student_id, name, email FROM students WHERE student_id IN ({placeholders})", chunk):
+                found[student_id] = {'name': name, 'email': email, 'courses': set()}
+            for student_id, course_id in self._db.execute(
+                    f"SELECT student_id, course_id FROM enrollments WHERE student_id IN ({placeholders})", chunk):
+                found[student_id]['courses'].add(course_id)
+        return {student_id: found[student_id] for student_id in student_ids if student_id in found}
+    
+    @_reads
+    def student_count(self):
+        """Return the number of students."""
+        return self._db.execute("SELECT COUNT(*) FROM students").fetchone()[0]
+    
+    @_reads
+    def data_sizes(self):
+        """Return the number of students, courses and marks."""
+        return {name: self._db.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                for name, table in (('students', 'students'), ('courses', 'courses'), ('marks', 'attendance'))}
+    
+    @_reads
+    def get_course(self, course_id: str):
+        """Return a course's record, or None if the ID is unknown."""
+        row = self._db.execute("SELECT name, instructor FROM courses WHERE course_id = ?", (course_id,)).fetchone()
+        return {'name': row[0], 'instructor': row[1], 'schedule': []} if row else None
+    
+    @_reads
+    def get_courses(self):
+        """Return all courses as {course_id: record}."""
+        return {
+            course_id: {'name': name, 'instructor': instructor, 'schedule': []}
+            for course_id, name, instructor in self._db.execute(
+                "SELECT course_id, name, instructor FROM courses ORDER BY rowid")
+        }
+    
+    @_reads
+    def get_course_marks(self, course_id: str, date: str):
+        """Return {student_id: status} for the course roster members marked on a date."""
+        return dict(self._db.execute("""
+            SELECT a.student_id, a.status FROM attendance a
+            JOIN enrollments e ON e.student_id = a.student_id AND e.course_id = a.course_id
+            WHERE a.course_id = ? AND a.date = ?
+        """, (course_id, date)))
+    
+    @_reads
+    def get_course_roster(self, course_id: str):
+        """Return the IDs of the students enrolled in a course, sorted."""
+        return [row[0] for row in self._db.execute(
+            "SELECT student_id FROM enrollments WHERE course_id = ? ORDER BY student_id", (course_id,))]
+    
+    @_reads
+    def get_trends(self, course_id: str = None, student_id: str = None, period: str = "week",
+                   start_date: str = None, end_date: str = None):
+        """Return (success, message, series) of attendance per week or month, grouped by the database."""
+        if period not in self.TREND_PERIODS:
+            return False, "Error: Period must be 'week' or 'month'.", []
+        if course_id and self.get_course(course_id) is None:
+            return False, f"Error: Course ID {course_id} not found.", []
+        if student_id and self._student_name(student_id) is None:
+            return False, f"Error: Student ID {student_id} not found.", []
+        error = self.check_date_range(start_date, end_date)
+        if error:
+            return False, error, []
+        # A lower bound makes the filter keep YYYY-MM-DD dates only, as the JSON engine does
+        condition, params = self._date_filter(start_date or '0000-01-01', end_date)
+        for column, value in (('course_id', course_id), ('student_id', student_id)):
+            if value:
+                condition += f" AND {column} = ?"
+                params += (value,)
+        # Bucket by the first day of each period, so _trend_series() can label it as usual
+        bucket = "date(date, '-6 days', 'weekday 1')" if period == 'week' else "substr(date, 1, 7) || '-01'"
+        daily = Counter()
+        for first_day, status, count in self._db.execute(
+                f"SELECT {bucket}, status, COUNT(*) FROM attendance WHERE 1 = 1{condition} GROUP BY 1, 2", params):
+            daily[(_to_day(first_day), _status_code(status))] += count
+        return True, "Success", self._trend_series(daily, period)
+    
+    @_reads
+    def get_course_grid(self, course_id: str, student_ids=None, start_date: str = None, end_date: str = None,
+                        max_dates: int = None):
+        """Return (success, message, grid): a course register of enrolled students by session date."""
+        if self.get_course(course_id) is None:
+            return False, f"Error: Course ID {course_id} not found.", {}
+        error = self.check_date_range(start_date, end_date)
+        if error:
+            return False, error, {}
+        student_ids = self.get_course_roster(course_id) if student_ids is None else list(student_ids)
         
-        # Create header row
+        # A lower bound makes the filter keep YYYY-MM-DD dates only, as the JSON engine does
+        condition, params = self._date_filter(start_date or '0000-01-01', end_date, 'a.date')
+        sql = f"""
+            SELECT DISTINCT a.date FROM attendance a
+            JOIN enrollments e ON e.student_id = a.student_id AND e.course_id = a.course_id
+            WHERE a.course_id = ?{condition} ORDER BY a.date DESC
+        """
+        if max_dates:
+            sql += " LIMIT ?"
+            params += (max_dates + 1,)
+        dates = [row[0] for row in self._db.execute(sql, (course_id, *params))][::-1]
+        earlier = None
+        if max_dates and len(dates) > max_dates:
+            earlier = dates[0]
+            dates = dates[1:]
+        
+        position = {date: i for i, date in enumerate(dates)}
+        names = {}
+        cells = {}
+        # Stay well under SQLite's limit on bound parameters
+        for start in range(0, len(student_ids), 500):
+            chunk = student_ids[start:start + 500]
+            placeholders = ', '.join('?' * len(chunk))
+            for student_id, name in self._db.execute(f"""
+                    SELECT s.student_id, s.name FROM students s
+                    JOIN enrollments e ON e.student_id = s.student_id
+                    WHERE e.course_id = ? AND s.student_id IN ({placeholders})""", (course_id, *chunk)):
+                names[student_id] = name
+                cells[student_id] = [None] * len(dates)
+            if not dates:
+                continue
+            for student_id, date, status in self._db.execute(f"""
+                    SELECT student_id, date, status FROM attendance
+                    WHERE course_id = ? AND student_id IN ({placeholders}) AND date BETWEEN ? AND ?""",
+                    (course_id, *chunk, dates[0], dates[-1])):
+                if student_id in cells and date in position:
+                    cells[student_id][position[date]] = status
+        rows = [(student_id, names[student_id], cells[student_id]) for student_id in student_ids if student_id in names]
+        return True, "Success", {'dates': dates, 'rows': rows, 'earlier': earlier}
+    
+    @_reads
+    def list_students(self, id_prefix: str = "", name: str = "", course_id: str = None,
+                      sort: str = "id", descending: bool = False, page: int = 1, per_page: int = 50):
+        """Return (student IDs on the requested page, total matches) using the table indexes."""
+        conditions = []
+        params = []
+        for column, prefix in (('student_id', id_prefix), ('name_key', name.lower())):
+            if prefix:
+                conditions.append(f"{column} >= ?")
+                params.append(prefix)
+                end = _prefix_end(prefix)
+                if end is not None:
+                    conditions.append(f"{column} < ?")
+                    params.append(end)
         if course_id:
-            writer.writerow(['Student ID', 'Name', 'Email', 'Total Days', 'Present', 'Absent', 'Late', 'Excused', 'Attendance %'])
-        else:
-            writer.writerow(['Student ID', 'Name', 'Email', 'Courses', 'Total Days', 'Present', 'Absent', 'Late', 'Excused', 'Attendance %'])
+            conditions.append("student_id IN (SELECT student_id FROM enrollments WHERE course_id = ?)")
+            params.append(course_id)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
         
-        # Get summary data
-        summary = self.get_summary(course_id)
+        direction = "DESC" if descending else "ASC"
+        order = f"name_key {direction}, student_id {direction}" if sort == 'name' else f"student_id {direction}"
         
-        # Write data rows
-        for student_id, data in summary.items():
-            student = self.records[student_id]
-            if course_id:
-                writer.writerow([
-                    student_id, student['name'], student['email'],
-                    data['total_days'], data['present_days'], data['absent_days'],
-                    data['late_days'], data['excused_days'], f"{data['attendance_percentage']:.2f}%"
-                ])
-            else:
-                course_names = [self.courses[c]['name'] for c in student['courses']]
-                writer.writerow([
-                    student_id, student['name'], student['email'], 
-                    ', '.join(course_names),
-                    data['total_days'], data['present_days'], data['absent_days'],
-                    data['late_days'], data['excused_days'], f"{data['attendance_percentage']:.2f}%"
-                ])
-                
-        return output.getvalue()
+        total = self._db.execute(f"SELECT COUNT(*) FROM students {where}", params).fetchone()[0]
+        rows = self._db.execute(
+            f"SELECT student_id FROM students {where} ORDER BY {order} LIMIT ? OFFSET ?",
+            params + [per_page, max(page - 1, 0) * per_page])
+        return [row[0] for row in rows], total
+    
+    def import_system(self, source):
+        """Copy every student, course, enrollment and mark of another system into the database."""
+        with self._transaction():
+            for course_id, course in source.get_courses().items():
+                self._db.execute("INSERT OR REPLACE INTO courses (course_id, name, instructor) VALUES (?, ?, ?)",
+                                 (course_id, course['name'], course.get('instructor', '')))
+            for student_id, student in source.records.items():
+                self._db.execute("INSERT OR REPLACE INTO students (student_id, name, name_key, email) VALUES (?, ?, ?, ?)",
+                                 (student_id, student['name'], student['name'].lower(), student.get('email', '')))
+                self._db.executemany("INSERT OR IGNORE INTO enrollments (student_id, course_id) VALUES (?, ?)",
+                                     [(student_id, course_id) for course_id in student['courses']])
+                self._db.executemany("INSERT OR REPLACE INTO attendance (student_id, course_id, date, status) VALUES (?, ?, ?, ?)",
+                                     [(student_id, row['course_id'] or '', row['date'], row['status'])
+                                      for row in source.get_attendance_rows(student_id)])
+        return True
+    
+    @_mutation
+    def import_csv(self, kind: str, lines, max_errors: int = 100):
+        """Import rows like the JSON engine does, committing them all in one transaction."""
+        with self._transaction():
+            return super().import_csv(kind, lines, max_errors)
     
     def save_data(self, filename):
-        """Save the system data to a JSON file."""
-        data = {
-            'records': self.records,
-            'courses': self.courses
-        }
-        with open(filename, 'w') as f:
-            json.dump(data, f)
+        """Every mutation is committed as it happens, so there is nothing left to write."""
         return True
-        
+    
+    def flush(self, filename):
+        """Nothing is ever queued: every mutation is committed as it happens."""
+        return True
+    
+    def compact(self, filename):
+        """There is no journal to fold into a snapshot: the database is the only copy."""
+        return True
+    
+    def start_write_behind(self, filename: str, interval: float = 1.0, batch_size: int = 100):
+        """SQLite commits every change itself, so it has no writer thread to hand changes to."""
+        return False, "Error: Write-behind is only available with the JSON backend."
+    
+    def archive(self, filename, before: str = None, course_ids=()):
+        """Indexed queries only read the rows they need, so the database keeps every mark."""
+        return False, "Error: Archiving is only available with the JSON backend."
+    
+    def attach(self, filename):
+        """SQLite coordinates processes itself, so attaching only imports an existing JSON file."""
+        return self.load_data(filename)
+    
     def load_data(self, filename):
-        """Load the system data from a JSON file."""
-        if os.path.exists(filename):
-            with open(filename, 'r') as f:
-                data = json.load(f)
-                self.records = data.get('records', {})
-                self.courses = data.get('courses', {})
-            return True
-        return False
+        """Import an existing JSON or binary data file (and its journal) into an empty database."""
+        if self.student_count() or self._db.execute("SELECT COUNT(*) FROM courses").fetchone()[0]:
+            loaded = True
+        else:
+            source = EnhancedAttendanceSystem(journal=True)
+            loaded = source.load_data(filename) and self.import_system(source)
+        self.ready.set()
+        return loaded
+
+def convert_snapshot(source: str, target: str):
+    """Rewrite a data file, journal folded in, in the snapshot format target's name selects.
+    
+    Converts between JSON, binary (BINARY_SNAPSHOT_SUFFIX) and sharded (SHARDED_SNAPSHOT_SUFFIX)
+    snapshots, copying any archives along. The source is left as it is.
+    """
+    engine = EnhancedAttendanceSystem(journal=True)
+    try:
+        loaded = engine.load_data(source, repair=False)
+    except (OSError, ValueError) as exc:
+        return False, f"Error: Could not read {source}: {exc}"
+    if not loaded:
+        return False, f"Error: {source} not found."
+    archives = EnhancedAttendanceSystem._archive_dir(source)
+    if os.path.isdir(archives):
+        shutil.copytree(archives, EnhancedAttendanceSystem._archive_dir(target), dirs_exist_ok=True)
+    engine.compact(target)
+    return True, f"Converted {source} to {target}."
+
+def archive_data(filename: str, before: str = None, course_ids=()):
+    """Archive the marks of a data file dated before `before`, or of whole courses; see archive()."""
+    engine = create_attendance_system("json", cache_size=0)
+    try:
+        if not engine.attach(filename):
+            return False, f"Error: {filename} not found."
+    except (OSError, ValueError) as exc:
+        return False, f"Error: Could not read {filename}: {exc}"
+    return engine.archive(filename, before, course_ids)
+
+def create_attendance_system(backend: str = "json", db_path: str = "attendance_data.db", analytics: bool = False,
+                             cache_size: int = 32):
+    """Build the attendance system for a storage backend: 'json' or 'sqlite'.
+    
+    analytics turns on the columnar summary mode of the JSON backend; SQLite already
+    aggregates in the database. cache_size bounds the summary result cache (0 disables it).
+    """
+    if backend == "sqlite":
+        return SQLiteAttendanceSystem(db_path, cache_size)
+    if backend == "json":
+        # Mutations are journaled; the snapshot is rewritten every 1000 logged changes
+        return EnhancedAttendanceSystem(journal=True, compact_threshold=1000, analytics=analytics,
+                                        cache_size=cache_size)
+    raise ValueError(f"Unknown storage backend: {backend}")
+
+# The routes; create_app() registers them on a Flask application
+routes = Blueprint('attendance', __name__)
+
+# The engine of the app handling the current request; create_app() keeps it in app.extensions
+attendance_system = LocalProxy(lambda: current_app.extensions['attendance'])
+
+def create_app(config: dict = None):
+    """Application factory: build the Flask app and its attendance system.
+    
+    Settings come from the ATTENDANCE_* environment variables unless config overrides
+    them. The data file is loaded on a background thread, so the app can take requests
+    straight away: they wait up to ATTENDANCE_LOAD_WAIT seconds for the load, then get
+    a 503, and /ready reports when loading is done. Each app gets an attendance system
+    of its own, which the routes reach through current_app.
+    """
+    app = Flask(__name__)
+    app.secret_key = 'attendance_system_secret_key'  # for flash messages and session
+    app.config.update(
+        # Storage backend: 'json' (default) or 'sqlite'
+        ATTENDANCE_BACKEND=os.environ.get('ATTENDANCE_BACKEND', 'json'),
+        ATTENDANCE_DATA_FILE=os.environ.get('ATTENDANCE_DATA_FILE', 'attendance_data.json'),
+        ATTENDANCE_DB=os.environ.get('ATTENDANCE_DB', 'attendance_data.db'),
+        # ATTENDANCE_ANALYTICS=1 keeps a columnar copy of the marks for faster summaries and exports
+        ATTENDANCE_ANALYTICS=os.environ.get('ATTENDANCE_ANALYTICS', '') == '1',
+        ATTENDANCE_BACKGROUND_LOAD=os.environ.get('ATTENDANCE_BACKGROUND_LOAD', '1') == '1',
+        ATTENDANCE_LOAD_WAIT=float(os.environ.get('ATTENDANCE_LOAD_WAIT', '10')),
+        # ATTENDANCE_WRITE_BEHIND=<seconds> writes changes out from a background thread at most
+        # that long after they are made, or once ATTENDANCE_WRITE_BEHIND_BATCH of them are waiting
+        ATTENDANCE_WRITE_BEHIND=float(os.environ.get('ATTENDANCE_WRITE_BEHIND', '0')),
+        ATTENDANCE_WRITE_BEHIND_BATCH=int(os.environ.get('ATTENDANCE_WRITE_BEHIND_BATCH', '100')),
+        # ATTENDANCE_METRICS=0 stops timing requests and engine calls for /metrics
+        ATTENDANCE_METRICS=os.environ.get('ATTENDANCE_METRICS', '1') == '1',
+        # Attendance percentage below which /at-risk lists a student and a warning is logged
+        ATTENDANCE_RISK_THRESHOLD=float(os.environ.get('ATTENDANCE_RISK_THRESHOLD', '75')),
+    )
+    if config:
+        app.config.update(config)
+    
+    app.extensions['attendance_metrics'] = Metrics(app.config['ATTENDANCE_METRICS'])
+    
+    # Compiled templates are kept on disk, so new workers skip compiling them again
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache()
+    
+    attendance_system = app.extensions['attendance'] = create_attendance_system(
+        app.config['ATTENDANCE_BACKEND'], app.config['ATTENDANCE_DB'], app.config['ATTENDANCE_ANALYTICS'])
+    data_file = app.config['ATTENDANCE_DATA_FILE']
+    attendance_system.risk_threshold = app.config['ATTENDANCE_RISK_THRESHOLD']
+    attendance_system.metrics = app.extensions['attendance_metrics']
+    
+    def log_risk(student_id, course_id, percentage, below):
+        scope = f"course {course_id}" if course_id else "overall"
+        if below:
+            app.logger.warning("Student %s is at risk: %.1f%% attendance %s", student_id, percentage, scope)
+        else:
+            app.logger.info("Student %s is no longer at risk: %.1f%% attendance %s", student_id, percentage, scope)
+    attendance_system.add_risk_listener(log_risk)
+    # Load existing data and stay in step with other worker processes sharing the file
+    if app.config['ATTENDANCE_BACKGROUND_LOAD']:
+        attendance_system.attach_in_background(data_file)
+    else:
+        attendance_system.attach(data_file)
+    # SQLite commits every change itself, so write-behind only applies to the JSON backend
+    if app.config['ATTENDANCE_WRITE_BEHIND'] > 0 and app.config['ATTENDANCE_BACKEND'] == 'json':
+        attendance_system.start_write_behind(data_file, app.config['ATTENDANCE_WRITE_BEHIND'],
+                                             app.config['ATTENDANCE_WRITE_BEHIND_BATCH'])
+    
+    app.register_blueprint(routes)
+    return app
+
+@routes.before_request
+def start_request_timer():
+    """Note when the request started; registered first, so the load wait and refresh count too."""
+    g.request_started = time.perf_counter()
+
+@routes.after_request
+def record_request_time(response):
+    """Add the request to the latency histogram, labelled by route pattern, method and status."""
+    started = g.pop('request_started', None)
+    if started is not None and metrics.enabled:
+        labels = (('route', request.url_rule.rule), ('method', request.method), ('status', response.status_code))
+        metrics.observe('attendance_http_request_duration_seconds', labels, time.perf_counter() - started)
+    return response
+
+@routes.before_request
+def sync_attendance_data():
+    """Wait for the data to finish loading, then pick up changes other worker processes saved."""
+    if request.endpoint in ('attendance.ready', 'attendance.persistence', 'attendance.prometheus_metrics'):
+        return None
+    if not attendance_system.ready.wait(current_app.config['ATTENDANCE_LOAD_WAIT']):
+        return "Attendance data is still loading. Please try again shortly.", 503, {'Retry-After': '1'}
+    attendance_system.refresh()
+
+@routes.route('/ready')
+def ready():
+    """Readiness probe: 200 once the data file is loaded, 503 while loading or after a failed load."""
+    if attendance_system.ready.is_set():
+        return {'status': 'ready'}
+    return {'status': 'failed' if attendance_system.load_error else 'loading'}, 503
+
+@routes.route('/persistence')
+def persistence():
+    """How changes reach the data file, and in write-behind mode how far the file lags behind."""
+    if attendance_system.write_behind is None:
+        return {'mode': 'synchronous', 'pending_changes': 0, 'lag_seconds': 0.0}
+    return attendance_system.write_behind.status()
+
+@routes.route('/metrics')
+def prometheus_metrics():
+    """Request and engine latencies, bytes saved and data sizes in the Prometheus text format."""
+    loaded = attendance_system.ready.is_set()
+    gauges = [('attendance_ready', (), int(loaded))]
+    if loaded:  # A load in progress holds the engine lock; don't wait for it
+        gauges += [(f'attendance_{name}', (), count) for name, count in attendance_system.data_sizes().items()]
+    return metrics.render(gauges), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
+def _listing_args(per_page: int = 50):
+    """Read the filter, sort and paging query arguments shared by the list pages."""
+    return {
+        'id_prefix': request.args.get('id_prefix', '').strip(),
+        'name': request.args.get('name', '').strip(),
+        'course_id': request.args.get('course_id') or None,
+        'sort': 'name' if request.args.get('sort') == 'name' else 'id',
+        'descending': request.args.get('order') == 'desc',
+        'page': max(request.args.get('page', 1, type=int), 1),
+        'per_page': min(max(request.args.get('per_page', per_page, type=int), 1), 500)
+    }
 
-# Initialize Flask application
-app = Flask(__name__)
-app.secret_key = 'attendance_system_secret_key'  # for flash messages and session
+def _pagination(total: int, page: int, per_page: int):
+    """Describe the current page and link to its neighbours, keeping the other query arguments."""
+    pages = max((total + per_page - 1) // per_page, 1)
+    args = request.args.to_dict()
+    args.update(request.view_args or {})
+    args.pop('page', None)
+    return {
+        'page': page,
+        'pages': pages,
+        'total': total,
+        'prev_url': url_for(request.endpoint, page=page - 1, **args) if page > 1 else None,
+        'next_url': url_for(request.endpoint, page=page + 1, **args) if page < pages else None
+    }
 
-# Create a global instance of the attendance system
-attendance_system = EnhancedAttendanceSystem()
-data_file = 'attendance_data.json'
+def _date_range_args():
+    """Read the optional start_date/end_date query arguments; returns (start_date, end_date, error)."""
+    start_date = request.args.get('start_date', '').strip() or None
+    end_date = request.args.get('end_date', '').strip() or None
+    error = attendance_system.check_date_range(start_date, end_date)
+    if error:
+        return None, None, error
+    return start_date, end_date, None
 
-# Try to load existing data
-if os.path.exists(data_file):
-    attendance_system.load_data(data_file)
+def _student_page(per_page: int = 50):
+    """Look up the students on the requested page; returns ({student_id: record}, pagination, filters)."""
+    filters = _listing_args(per_page)
+    student_ids, total = attendance_system.list_students(**filters)
+    page_students = attendance_system.get_students(student_ids)
+    return page_students, _pagination(total, filters['page'], filters['per_page']), filters
 
-@app.route('/')
+@routes.route('/')
 def index():
     """Main dashboard page."""
     return render_template('index.html', 
-                          student_count=len(attendance_system.records),
-                          course_count=len(attendance_system.courses))
+                          student_count=attendance_system.student_count(),
+                          course_count=len(attendance_system.get_courses()))
 
-@app.route('/students')
+@routes.route('/students')
 def students():
-    """View all students."""
-    return render_template('students.html', students=attendance_system.records)
+    """View students a page at a time, filtered and sorted by the query arguments."""
+    page_students, pagination, filters = _student_page()
+    return render_template('students.html',
+                          students=page_students,
+                          courses=attendance_system.get_courses(),
+                          pagination=pagination,
+                          filters=filters)
 
-@app.route('/students/add', methods=['GET', 'POST'])
+@routes.route('/students/add', methods=['GET', 'POST'])
 def add_student():
     """Add a new student."""
     if request.method == 'POST':
@@ -248,19 +3555,19 @@ def add_student():
         success, message = attendance_system.add_student(student_id, name, email)
         if success:
             flash(message, 'success')
-            attendance_system.save_data(data_file)
-            return redirect(url_for('students'))
+            attendance_system.save_data(current_app.config['ATTENDANCE_DATA_FILE'])
+            return redirect(url_for('attendance.students'))
         else:
             flash(message, 'danger')
     
     return render_template('add_student.html')
 
-@app.route('/courses')
+@routes.route('/courses')
 def courses():
     """View all courses."""
-    return render_template('courses.html', courses=attendance_system.courses)
+    return render_template('courses.html', courses=attendance_system.get_courses())
 
-@app.route('/courses/add', methods=['GET', 'POST'])
+@routes.route('/courses/add', methods=['GET', 'POST'])
 def add_course():
     """Add a new course."""
     if request.method == 'POST':
@@ -271,14 +3578,14 @@ def add_course():
         success, message = attendance_system.add_course(course_id, name, instructor)
         if success:
             flash(message, 'success')
-            attendance_system.save_data(data_file)
-            return redirect(url_for('courses'))
+            attendance_system.save_data(current_app.config['ATTENDANCE_DATA_FILE'])
+            return redirect(url_for('attendance.courses'))
         else:
             flash(message, 'danger')
     
     return render_template('add_course.html')
 
-@app.route('/attendance', methods=['GET', 'POST'])
+@routes.route('/attendance', methods=['GET', 'POST'])
 def mark_attendance():
     """Mark attendance for students."""
     if request.method == 'POST':
@@ -290,21 +3597,63 @@ def mark_attendance():
         success, message = attendance_system.mark_attendance(student_id, date, status, course_id)
         if success:
             flash(message, 'success')
-            attendance_system.save_data(data_file)
+            attendance_system.save_data(current_app.config['ATTENDANCE_DATA_FILE'])
         else:
             flash(message, 'danger')
     
+    # Only offer the students matching the filter form, a page at a time
+    page_students, pagination, filters = _student_page(per_page=100)
     return render_template('mark_attendance.html', 
-                          students=attendance_system.records,
-                          courses=attendance_system.courses,
+                          students=page_students,
+                          courses=attendance_system.get_courses(),
+                          pagination=pagination,
+                          filters=filters,
                           today=datetime.now().strftime('%Y-%m-%d'))
 
-@app.route('/attendance/edit/<student_id>', methods=['GET', 'POST'])
+@routes.route('/attendance/course', methods=['GET', 'POST'])
+def mark_course_attendance():
+    """Take roll call for a whole course in one submission."""
+    course_id = request.values.get('course_id', '')
+    date = request.values.get('date') or datetime.now().strftime('%Y-%m-%d')
+    
+    if request.method == 'POST':
+        roster_ids = attendance_system.get_course_roster(course_id)
+        statuses = {
+            student_id: request.form.get(f"status_{student_id}", 'Present')
+            for student_id in roster_ids
+        }
+        
+        success, message = attendance_system.mark_course_attendance(course_id, date, statuses, skip_marked=True)
+        if success:
+            flash(message, 'success')
+            attendance_system.save_data(current_app.config['ATTENDANCE_DATA_FILE'])
+            return redirect(url_for('attendance.course_details', course_id=course_id))
+        else:
+            flash(message, 'danger')
+    
+    # Show the roster with any mark already recorded for the date
+    marks = attendance_system.get_course_marks(course_id, date)
+    roster = []
+    for student_id, student in attendance_system.get_students(attendance_system.get_course_roster(course_id)).items():
+        roster.append({
+            'id': student_id,
+            'name': student['name'],
+            'status': marks.get(student_id)
+        })
+    
+    return render_template('course_attendance.html',
+                          courses=attendance_system.get_courses(),
+                          course_id=course_id,
+                          course=attendance_system.get_course(course_id),
+                          date=date,
+                          roster=roster)
+
+@routes.route('/attendance/edit/<student_id>', methods=['GET', 'POST'])
 def edit_attendance(student_id):
     """Edit attendance for a student."""
-    if student_id not in attendance_system.records:
+    if attendance_system.get_student(student_id) is None:
         flash(f"Student ID {student_id} not found.", 'danger')
-        return redirect(url_for('students'))
+        return redirect(url_for('attendance.students'))
         
     if request.method == 'POST':
         date = request.form.get('date')
@@ -314,66 +3663,115 @@ def edit_attendance(student_id):
         success, message = attendance_system.edit_attendance(student_id, date, status, course_id)
         if success:
             flash(message, 'success')
-            attendance_system.save_data(data_file)
-            return redirect(url_for('student_details', student_id=student_id))
+            attendance_system.save_data(current_app.config['ATTENDANCE_DATA_FILE'])
+            return redirect(url_for('attendance.student_details', student_id=student_id))
         else:
             flash(message, 'danger')
     
     # Get the student's attendance records
-    success, message, attendance_data = attendance_system.get_attendance(student_id)
+    attendance_data = attendance_system.get_attendance_rows(student_id)
     
     return render_template('edit_attendance.html',
-                          student=attendance_system.records[student_id],
+                          student=attendance_system.get_student(student_id),
                           student_id=student_id,
                           attendance=attendance_data,
-                          courses=attendance_system.courses)
+                          courses=attendance_system.get_courses())
 
-@app.route('/student/<student_id>')
+@routes.route('/import', methods=['GET', 'POST'])
+def import_csv():
+    """Bulk-import students, enrollments or attendance marks from an uploaded CSV file."""
+    kind = request.form.get('kind', 'students')
+    errors = []
+    if request.method == 'POST':
+        upload = request.files.get('file')
+        if not upload or not upload.filename:
+            flash("Error: Choose a CSV file to import.", 'danger')
+        else:
+            # Decode the upload line by line as the engine reads it; large uploads stay spooled on disk
+            success, message, errors = attendance_system.import_csv(kind, codecs.iterdecode(upload.stream, 'utf-8-sig'))
+            flash(message, 'success' if success else 'danger')
+            if success:
+                attendance_system.save_data(current_app.config['ATTENDANCE_DATA_FILE'])
+    return render_template('import.html', kinds=attendance_system.IMPORT_COLUMNS, kind=kind, errors=errors)
+
+@routes.route('/student/<student_id>')
 def student_details(student_id):
     """View details for a specific student."""
-    if student_id not in attendance_system.records:
+    student = attendance_system.get_student(student_id)
+    if student is None:
         flash(f"Student ID {student_id} not found.", 'danger')
-        return redirect(url_for('students'))
+        return redirect(url_for('attendance.students'))
     
-    success, message, attendance_data = attendance_system.get_attendance(student_id)
+    attendance_data = attendance_system.get_attendance_rows(student_id)
+    courses = attendance_system.get_courses()
     
     # Get courses this student is enrolled in
     enrolled_courses = []
-    for course_id in attendance_system.records[student_id]['courses']:
-        if course_id in attendance_system.courses:
+    for course_id in sorted(student['courses']):
+        if course_id in courses:
             enrolled_courses.append({
                 'id': course_id,
-                'name': attendance_system.courses[course_id]['name']
+                'name': courses[course_id]['name']
             })
     
     return render_template('student_details.html',
-                          student=attendance_system.records[student_id],
+                          student=student,
                           student_id=student_id,
                           attendance=attendance_data,
-                          enrolled_courses=enrolled_courses)
+                          enrolled_courses=enrolled_courses,
+                          courses=courses)
 
-@app.route('/courses/<course_id>')
+@routes.route('/courses/<course_id>')
 def course_details(course_id):
     """View details for a specific course."""
-    if course_id not in attendance_system.courses:
+    course = attendance_system.get_course(course_id)
+    if course is None:
         flash(f"Course ID {course_id} not found.", 'danger')
-        return redirect(url_for('courses'))
+        return redirect(url_for('attendance.courses'))
     
     # Find enrolled students
     enrolled_students = []
-    for student_id, student_data in attendance_system.records.items():
-        if course_id in student_data['courses']:
-            enrolled_students.append({
-                'id': student_id,
-                'name': student_data['name']
-            })
+    for student_id, student in attendance_system.get_students(attendance_system.get_course_roster(course_id)).items():
+        enrolled_students.append({
+            'id': student_id,
+            'name': student['name']
+        })
     
     return render_template('course_details.html',
-                          course=attendance_system.courses[course_id],
+                          course=course,
                           course_id=course_id,
                           enrolled_students=enrolled_students)
 
-@app.route('/enroll', methods=['GET', 'POST'])
+@routes.route('/courses/<course_id>/grid')
+def course_grid(course_id):
+    """A course register: enrolled students by session date, a page of students and a window of dates at a time."""
+    filters = _listing_args()
+    filters['course_id'] = course_id
+    start_date, end_date, error = _date_range_args()
+    if error:
+        flash(error, 'danger')
+    max_dates = min(max(request.args.get('max_dates', 31, type=int), 1), 366)
+    student_ids, total = attendance_system.list_students(**filters)
+    success, message, grid = attendance_system.get_course_grid(course_id, student_ids, start_date, end_date, max_dates)
+    if not success:
+        flash(message, 'danger')
+        return redirect(url_for('attendance.courses'))
+    
+    # Earlier dates end the window just before the first date shown; the course comes from the path
+    args = request.args.to_dict()
+    args.pop('end_date', None)
+    args.pop('course_id', None)
+    return render_template('course_grid.html',
+                          course=attendance_system.get_course(course_id),
+                          course_id=course_id,
+                          grid=grid,
+                          earlier_url=url_for('attendance.course_grid', course_id=course_id, end_date=grid['earlier'], **args)
+                          if grid['earlier'] else None,
+                          latest_url=url_for('attendance.course_grid', course_id=course_id, **args) if end_date else None,
+                          pagination=_pagination(total, filters['page'], filters['per_page']),
+                          filters=dict(filters, start_date=start_date or '', end_date=end_date or '', max_dates=max_dates))
+
+@routes.route('/enroll', methods=['GET', 'POST'])
 def enroll_student():
     """Enroll a student in a course."""
     if request.method == 'POST':
@@ -383,739 +3781,257 @@ def enroll_student():
         success, message = attendance_system.enroll_student(student_id, course_id)
         if success:
             flash(message, 'success')
-            attendance_system.save_data(data_file)
-            return redirect(url_for('student_details', student_id=student_id))
+            attendance_system.save_data(current_app.config['ATTENDANCE_DATA_FILE'])
+            return redirect(url_for('attendance.student_details', student_id=student_id))
         else:
             flash(message, 'danger')
     
+    page_students, pagination, filters = _student_page(per_page=100)
     return render_template('enroll.html',
-                          students=attendance_system.records,
-                          courses=attendance_system.courses)
+                          students=page_students,
+                          courses=attendance_system.get_courses(),
+                          pagination=pagination,
+                          filters=filters)
 
-@app.route('/unenroll/<student_id>/<course_id>')
+@routes.route('/unenroll/<student_id>/<course_id>')
 def unenroll_student(student_id, course_id):
     """Unenroll a student from a course."""
     success, message = attendance_system.unenroll_student(student_id, course_id)
     if success:
         flash(message, 'success')
-        attendance_system.save_data(data_file)
+        attendance_system.save_data(current_app.config['ATTENDANCE_DATA_FILE'])
     else:
         flash(message, 'danger')
     
-    return redirect(url_for('student_details', student_id=student_id))
+    return redirect(url_for('attendance.student_details', student_id=student_id))
 
-@app.route('/summary')
+@routes.route('/summary')
 def summary():
-    """View attendance summary for all students."""
-    course_id = request.args.get('course_id', None)
-    summary_data = attendance_system.get_summary(course_id)
+    """View attendance summary for all students, a page at a time."""
+    filters = _listing_args()
+    course_id = filters['course_id']
+    start_date, end_date, error = _date_range_args()
+    if error:
+        flash(error, 'danger')
+    student_ids, total = attendance_system.list_students(**filters)
+    summary_data = {
+        student_id: attendance_system.summarize_student(student_id, course_id, start_date, end_date)
+        for student_id in student_ids
+    }
     
     return render_template('summary.html',
                           summary=summary_data,
-                          courses=attendance_system.courses,
-                          selected_course=course_id)
+                          courses=attendance_system.get_courses(),
+                          selected_course=course_id,
+                          export_url=url_for('attendance.export_csv', course_id=course_id, start_date=start_date, end_date=end_date),
+                          pagination=_pagination(total, filters['page'], filters['per_page']),
+                          filters=dict(filters, start_date=start_date or '', end_date=end_date or ''))
+
+@routes.route('/trends')
+def trends():
+    """Weekly or monthly attendance for the school, a course or a student."""
+    course_id = request.args.get('course_id') or None
+    student_id = request.args.get('student_id', '').strip() or None
+    period = 'month' if request.args.get('period') == 'month' else 'week'
+    start_date, end_date, error = _date_range_args()
+    if error:
+        flash(error, 'danger')
+    success, message, series = attendance_system.get_trends(course_id, student_id, period, start_date, end_date)
+    if not success:
+        flash(message, 'danger')
+    return render_template('trends.html',
+                          series=series,
+                          courses=attendance_system.get_courses(),
+                          filters={'course_id': course_id, 'student_id': student_id or '', 'period': period,
+                                   'start_date': start_date or '', 'end_date': end_date or ''})
+
+def _risk_args():
+    """Read the course_id and threshold query arguments of the at-risk views."""
+    course_id = request.args.get('course_id') or None
+    threshold = request.args.get('threshold', type=float)
+    if threshold is None:
+        threshold = attendance_system.risk_threshold
+    return course_id, min(max(threshold, 0.0), 100.0)
 
-@app.route('/export')
+@routes.route('/at-risk')
+def at_risk():
+    """Students below the attendance threshold, lowest first, a page at a time."""
+    course_id, threshold = _risk_args()
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 50, type=int), 1), 500)
+    success, message, result = attendance_system.get_at_risk(course_id, threshold, per_page, (page - 1) * per_page)
+    if not success:
+        flash(message, 'danger')
+        result = {'students': {}, 'total': 0}
+    return render_template('at_risk.html',
+                          students=result['students'],
+                          courses=attendance_system.get_courses(),
+                          filters={'course_id': course_id, 'threshold': threshold},
+                          pagination=_pagination(result['total'], page, per_page))
+
+@routes.route('/export')
 def export_csv():
     """Export attendance data as CSV."""
     course_id = request.args.get('course_id', None)
-    csv_data = attendance_system.export_attendance_csv(course_id)
+    start_date, end_date, error = _date_range_args()
+    if error:
+        flash(error, 'danger')
+        return redirect(url_for('attendance.summary'))
+    # Stream the rows as they are produced instead of building the whole file first
+    csv_data = stream_with_context(attendance_system.iter_attendance_csv(course_id, start_date=start_date,
+                                                                         end_date=end_date))
     
     course_name = "all_courses"
-    if course_id and course_id in attendance_system.courses:
-        course_name = attendance_system.courses[course_id]['name'].lower().replace(' ', '_')
+    course = attendance_system.get_course(course_id) if course_id else None
+    if course:
+        course_name = course['name'].lower().replace(' ', '_')
     
-    return app.response_class(
+    return current_app.response_class(
         csv_data,
         mimetype='text/csv',
         headers={'Content-Disposition': f'attachment;filename=attendance_{course_name}_{datetime.now().strftime("%Y%m%d")}.csv'}
     )
 
+def _conditional_json(stamp, build):
+    """Answer with build()'s JSON and the data's ETag/Last-Modified, or with a bare 304 if the client is current.
+    
+    build only runs when a body is sent. The stamp is read before the body is built, so a
+    change in between only costs the client one more full response.
+    """
+    tag, changed = stamp
+    if is_resource_modified(request.environ, etag=tag, last_modified=changed):
+        response = jsonify(build())
+    else:
+        response = current_app.response_class(status=304)
+    response.set_etag(tag)
+    response.last_modified = changed
+    response.cache_control.no_cache = True  # Keep a copy, but check back every time
+    return response
+
+@routes.route('/api/summary')
+def api_summary():
+    """get_summary() as JSON, optionally for one course and date range."""
+    course_id = request.args.get('course_id') or None
+    start_date, end_date, error = _date_range_args()
+    if error:
+        return {'error': error}, 400
+    if course_id and attendance_system.get_course(course_id) is None:
+        return {'error': f"Error: Course ID {course_id} not found."}, 404
+    return _conditional_json(attendance_system.data_stamp(course_id=course_id), lambda: {
+        'course_id': course_id,
+        'start_date': start_date,
+        'end_date': end_date,
+        'summary': attendance_system.get_summary(course_id, start_date, end_date)
+    })
+
+@routes.route('/api/students/<student_id>/attendance')
+def api_student_attendance(student_id):
+    """A student's marks as JSON: every register, as on the student page, or one course's, optionally within a date range."""
+    course_id = request.args.get('course_id') or None
+    start_date, end_date, error = _date_range_args()
+    if error:
+        return {'error': error}, 400
+    student = attendance_system.get_student(student_id)
+    if student is None:
+        return {'error': f"Error: Student ID {student_id} not found."}, 404
+    
+    def build():
+        if course_id:
+            _, _, marks = attendance_system.get_attendance(student_id, course_id, start_date, end_date)
+            rows = [{'date': date, 'course_id': course_id, 'status': status} for date, status in marks.items()]
+        else:
+            rows = attendance_system.get_attendance_rows(student_id, start_date, end_date)
+        return {
+            'student_id': student_id,
+            'name': student['name'],
+            'course_id': course_id,
+            'start_date': start_date,
+            'end_date': end_date,
+            'attendance': rows
+        }
+    return _conditional_json(attendance_system.data_stamp(student_id=student_id), build)
+
+@routes.route('/api/trends')
+def api_trends():
+    """get_trends() as JSON, for charts."""
+    course_id = request.args.get('course_id') or None
+    student_id = request.args.get('student_id') or None
+    period = request.args.get('period', 'week')
+    start_date, end_date, error = _date_range_args()
+    if period not in attendance_system.TREND_PERIODS:
+        error = "Error: Period must be 'week' or 'month'."
+    if error:
+        return {'error': error}, 400
+    if course_id and attendance_system.get_course(course_id) is None:
+        return {'error': f"Error: Course ID {course_id} not found."}, 404
+    if student_id and attendance_system.get_student(student_id) is None:
+        return {'error': f"Error: Student ID {student_id} not found."}, 404
+    return _conditional_json(attendance_system.data_stamp(student_id=student_id, course_id=course_id), lambda: {
+        'course_id': course_id,
+        'student_id': student_id,
+        'period': period,
+        'start_date': start_date,
+        'end_date': end_date,
+        'series': attendance_system.get_trends(course_id, student_id, period, start_date, end_date)[2]
+    })
+
+@routes.route('/api/at-risk')
+def api_at_risk():
+    """get_at_risk() as JSON; limit gives the bottom N."""
+    course_id, threshold = _risk_args()
+    limit = request.args.get('limit', type=int)
+    if course_id and attendance_system.get_course(course_id) is None:
+        return {'error': f"Error: Course ID {course_id} not found."}, 404
+    
+    def build():
+        success, message, result = attendance_system.get_at_risk(course_id, threshold, limit)
+        return {
+            'course_id': course_id,
+            'threshold': threshold,
+            'total': result['total'],
+            'students': [dict(row, student_id=student_id) for student_id, row in result['students'].items()]
+        }
+    return _conditional_json(attendance_system.data_stamp(course_id=course_id), build)
+
+@routes.route('/api/courses/<course_id>/roster')
+def api_course_roster(course_id):
+    """A course and its enrolled students as JSON."""
+    course = attendance_system.get_course(course_id)
+    if course is None:
+        return {'error': f"Error: Course ID {course_id} not found."}, 404
+    
+    def build():
+        students = attendance_system.get_students(attendance_system.get_course_roster(course_id))
+        return {
+            'course_id': course_id,
+            'name': course['name'],
+            'instructor': course.get('instructor', ''),
+            'students': [{'student_id': student_id, 'name': student['name'], 'email': student.get('email', '')}
+                         for student_id, student in students.items()]
+        }
+    return _conditional_json(attendance_system.data_stamp(course_id=course_id), build)
+
+@routes.cli.command('convert')
+@click.argument('source')
+@click.argument('target')
+def convert_command(source, target):
+    """Convert a data file between JSON, the binary .snap format and a .shards directory."""
+    success, message = convert_snapshot(source, target)
+    click.echo(message, err=not success)
+    if not success:
+        raise SystemExit(1)
+
+@routes.cli.command('archive')
+@click.argument('data_file')
+@click.option('--before', metavar='YYYY-MM-DD', help='archive the marks dated before this day')
+@click.option('--course', 'course_ids', multiple=True, metavar='COURSE_ID', help='archive every mark of a closed course')
+def archive_command(data_file, before, course_ids):
+    """Move old or closed-course marks of a data file into a compressed, read-only archive."""
+    success, message = archive_data(data_file, before, course_ids)
+    click.echo(message, err=not success)
+    if not success:
+        raise SystemExit(1)
+
 if __name__ == "__main__":
-    # Create templates directory if it doesn't exist
-    if not os.path.exists('templates'):
-        os.makedirs('templates')
-    
-    # Create basic templates for the application
-    # In a real application, you'd want to create proper HTML files
-    # Here's a simplified approach to get started
-    
-    # Create a basic layout template
-    with open('templates/layout.html', 'w') as f:
-        f.write('''
-<!DOCTYPE html>
-<html>
-<head>
-    <title>Attendance Management System</title>
-    <link rel="stylesheet" href="https://cdn.jsdelivr.net/npm/bootstrap@5.2.3/dist/css/bootstrap.min.css">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <style>
-        .sidebar { min-height: 100vh; background-color: #f8f9fa; }
-        .main-content { padding: 20px; }
-    </style>
-</head>
-<body>
-    <div class="container-fluid">
-        <div class="row">
-            <div class="col-md-2 sidebar p-3">
-                <h3 class="text-center mb-4">Attendance System</h3>
-                <ul class="nav flex-column">
-                    <li class="nav-item"><a class="nav-link" href="/">Dashboard</a></li>
-                    <li class="nav-item"><a class="nav-link" href="/students">Students</a></li>
-                    <li class="nav-item"><a class="nav-link" href="/courses">Courses</a></li>
-                    <li class="nav-item"><a class="nav-link" href="/attendance">Mark Attendance</a></li>
-                    <li class="nav-item"><a class="nav-link" href="/summary">Summary</a></li>
-                    <li class="nav-item"><a class="nav-link" href="/export">Export Data</a></li>
-                </ul>
-            </div>
-            <div class="col-md-10 main-content">
-                {% with messages = get_flashed_messages(with_categories=true) %}
-                    {% if messages %}
-                        {% for category, message in messages %}
-                            <div class="alert alert-{{ category }} alert-dismissible fade show">
-                                {{ message }}
-                                <button type="button" class="btn-close" data-bs-dismiss="alert"></button>
-                            </div>
-                        {% endfor %}
-                    {% endif %}
-                {% endwith %}
-                
-                {% block content %}{% endblock %}
-            </div>
-        </div>
-    </div>
-    
-    <script src="https://cdn.jsdelivr.net/npm/bootstrap@5.2.3/dist/js/bootstrap.bundle.min.js"></script>
-</body>
-</html>
-        ''')
-    
-    # Create index/dashboard template
-    with open('templates/index.html', 'w') as f:
-        f.write('''
-{% extends "layout.html" %}
-{% block content %}
-    <h1 class="mb-4">Attendance Management Dashboard</h1>
-    
-    <div class="row">
-        <div class="col-md-4">
-            <div class="card text-center mb-4">
-                <div class="card-body">
-                    <h5 class="card-title">Students</h5>
-                    <p class="card-text display-4">{{ student_count }}</p>
-                    <a href="/students" class="btn btn-primary">View Students</a>
-                </div>
-            </div>
-        </div>
-        
-        <div class="col-md-4">
-            <div class="card text-center mb-4">
-                <div class="card-body">
-                    <h5 class="card-title">Courses</h5>
-                    <p class="card-text display-4">{{ course_count }}</p>
-                    <a href="/courses" class="btn btn-primary">View Courses</a>
-                </div>
-            </div>
-        </div>
-        
-        <div class="col-md-4">
-            <div class="card text-center mb-4">
-                <div class="card-body">
-                    <h5 class="card-title">Quick Actions</h5>
-                    <div class="d-grid gap-2">
-                        <a href="/attendance" class="btn btn-success">Mark Attendance</a>
-                        <a href="/summary" class="btn btn-info">View Summary</a>
-                    </div>
-                </div>
-            </div>
-        </div>
-    </div>
-    
-    <div class="card mt-4">
-        <div class="card-header">
-            <h5 class="card-title">About This System</h5>
-        </div>
-        <div class="card-body">
-            <p>The Enhanced Attendance Management System allows you to:</p>
-            <ul>
-                <li>Manage students and courses</li>
-                <li>Track attendance with multiple status options</li>
-                <li>Generate attendance reports</li>
-                <li>Export data to CSV format</li>
-            </ul>
-            <p>Use the navigation menu on the left to access different features.</p>
-        </div>
-    </div>
-{% endblock %}
-        ''')
-    
-    # Create students template
-    with open('templates/students.html', 'w') as f:
-        f.write('''
-{% extends "layout.html" %}
-{% block content %}
-    <div class="d-flex justify-content-between align-items-center mb-4">
-        <h1>Students</h1>
-        <a href="/students/add" class="btn btn-primary">Add New Student</a>
-    </div>
-    
-    <div class="card">
-        <div class="card-body">
-            <div class="table-responsive">
-                <table class="table table-striped">
-                    <thead>
-                        <tr>
-                            <th>ID</th>
-                            <th>Name</th>
-                            <th>Email</th>
-                            <th>Courses</th>
-                            <th>Actions</th>
-                        </tr>
-                    </thead>
-                    <tbody>
-                        {% for student_id, student in students.items() %}
-                            <tr>
-                                <td>{{ student_id }}</td>
-                                <td>{{ student.name }}</td>
-                                <td>{{ student.email }}</td>
-                                <td>{{ student.courses|length }}</td>
-                                <td>
-                                    <a href="/student/{{ student_id }}" class="btn btn-sm btn-info">View</a>
-                                </td>
-                            </tr>
-                        {% else %}
-                            <tr>
-                                <td colspan="5" class="text-center">No students found</td>
-                            </tr>
-                        {% endfor %}
-                    </tbody>
-                </table>
-            </div>
-        </div>
-    </div>
-{% endblock %}
-        ''')
-    
-    # Create add student template
-    with open('templates/add_student.html', 'w') as f:
-        f.write('''
-{% extends "layout.html" %}
-{% block content %}
-    <h1 class="mb-4">Add New Student</h1>
-    
-    <div class="card">
-        <div class="card-body">
-            <form method="post">
-                <div class="mb-3">
-                    <label for="student_id" class="form-label">Student ID</label>
-                    <input type="text" class="form-control" id="student_id" name="student_id" required>
-                </div>
-                <div class="mb-3">
-                    <label for="name" class="form-label">Name</label>
-                    <input type="text" class="form-control" id="name" name="name" required>
-                </div>
-                <div class="mb-3">
-                    <label for="email" class="form-label">Email</label>
-                    <input type="email" class="form-control" id="email" name="email">
-                </div>
-                <div class="d-flex justify-content-between">
-                    <a href="/students" class="btn btn-secondary">Cancel</a>
-                    <button type="submit" class="btn btn-primary">Add Student</button>
-                </div>
-            </form>
-        </div>
-    </div>
-{% endblock %}
-        ''')
-    
-    # Create courses template
-    with open('templates/courses.html', 'w') as f:
-        f.write('''
-{% extends "layout.html" %}
-{% block content %}
-    <div class="d-flex justify-content-between align-items-center mb-4">
-        <h1>Courses</h1>
-        <a href="/courses/add" class="btn btn-primary">Add New Course</a>
-    </div>
-    
-    <div class="card">
-        <div class="card-body">
-            <div class="table-responsive">
-                <table class="table table-striped">
-                    <thead>
-                        <tr>
-                            <th>ID</th>
-                            <th>Name</th>
-                            <th>Instructor</th>
-                            <th>Actions</th>
-                        </tr>
-                    </thead>
-                    <tbody>
-                        {% for course_id, course in courses.items() %}
-                            <tr>
-                                <td>{{ course_id }}</td>
-                                <td>{{ course.name }}</td>
-                                <td>{{ course.instructor }}</td>
-                                <td>
-                                    <a href="/courses/{{ course_id }}" class="btn btn-sm btn-info">View</a>
-                                </td>
-                            </tr>
-                        {% else %}
-                            <tr>
-                                <td colspan="4" class="text-center">No courses found</td>
-                            </tr>
-                        {% endfor %}
-                    </tbody>
-                </table>
-            </div>
-        </div>
-    </div>
-{% endblock %}
-        ''')
-    
-    # Create add course template
-    with open('templates/add_course.html', 'w') as f:
-        f.write('''
-{% extends "layout.html" %}
-{% block content %}
-    <h1 class="mb-4">Add New Course</h1>
-    
-    <div class="card">
-        <div class="card-body">
-            <form method="post">
-                <div class="mb-3">
-                    <label for="course_id" class="form-label">Course ID</label>
-                    <input type="text" class="form-control" id="course_id" name="course_id" required>
-                </div>
-                <div class="mb-3">
-                    <label for="name" class="form-label">Course Name</label>
-                    <input type="text" class="form-control" id="name" name="name" required>
-                </div>
-                <div class="mb-3">
-                    <label for="instructor" class="form-label">Instructor</label>
-                    <input type="text" class="form-control" id="instructor" name="instructor">
-                </div>
-                <div class="d-flex justify-content-between">
-                    <a href="/courses" class="btn btn-secondary">Cancel</a>
-                    <button type="submit" class="btn btn-primary">Add Course</button>
-                </div>
-            </form>
-        </div>
-    </div>
-{% endblock %}
-        ''')
-    
-    # Create mark attendance template
-    with open('templates/mark_attendance.html', 'w') as f:
-        f.write('''
-{% extends "layout.html" %}
-{% block content %}
-    <h1 class="mb-4">Mark Attendance</h1>
-    
-    <div class="card">
-        <div class="card-body">
-            <form method="post">
-                <div class="row mb-3">
-                    <div class="col-md-6">
-                        <label for="student_id" class="form-label">Student</label>
-                        <select class="form-select" id="student_id" name="student_id" required>
-                            <option value="">Select Student</option>
-                            {% for student_id, student in students.items() %}
-                                <option value="{{ student_id }}">{{ student_id }} - {{ student.name }}</option>
-                            {% endfor %}
-                        </select>
-                    </div>
-                    <div class="col-md-6">
-                        <label for="date" class="form-label">Date</label>
-                        <input type="date" class="form-control" id="date" name="date" value="{{ today }}" required>
-                    </div>
-                </div>
-                <div class="row mb-3">
-                    <div class="col-md-6">
-                        <label for="status" class="form-label">Status</label>
-                        <select class="form-select" id="status" name="status" required>
-                            <option value="Present">Present</option>
-                            <option value="Absent">
-                <option value="Absent">Absent</option>
-                            <option value="Late">Late</option>
-                            <option value="Excused">Excused</option>
-                        </select>
-                    </div>
-                    <div class="col-md-6">
-                        <label for="course_id" class="form-label">Course (Optional)</label>
-                        <select class="form-select" id="course_id" name="course_id">
-                            <option value="">All Courses</option>
-                            {% for course_id, course in courses.items() %}
-                                <option value="{{ course_id }}">{{ course.name }}</option>
-                            {% endfor %}
-                        </select>
-                    </div>
-                </div>
-                <div class="d-flex justify-content-end">
-                    <button type="submit" class="btn btn-primary">Mark Attendance</button>
-                </div>
-            </form>
-        </div>
-    </div>
-{% endblock %}
-        ''')
-    
-    # Create student details template
-    with open('templates/student_details.html', 'w') as f:
-        f.write('''
-{% extends "layout.html" %}
-{% block content %}
-    <div class="d-flex justify-content-between align-items-center mb-4">
-        <h1>Student Details: {{ student.name }}</h1>
-        <a href="/students" class="btn btn-secondary">Back to Students</a>
-    </div>
-    
-    <div class="row">
-        <div class="col-md-4">
-            <div class="card mb-4">
-                <div class="card-header">
-                    <h5 class="card-title">Student Information</h5>
-                </div>
-                <div class="card-body">
-                    <p><strong>ID:</strong> {{ student_id }}</p>
-                    <p><strong>Name:</strong> {{ student.name }}</p>
-                    <p><strong>Email:</strong> {{ student.email if student.email else 'Not provided' }}</p>
-                </div>
-            </div>
-            
-            <div class="card mb-4">
-                <div class="card-header d-flex justify-content-between align-items-center">
-                    <h5 class="card-title mb-0">Enrolled Courses</h5>
-                    <a href="/enroll" class="btn btn-sm btn-primary">Enroll</a>
-                </div>
-                <div class="card-body">
-                    {% if enrolled_courses %}
-                        <ul class="list-group">
-                            {% for course in enrolled_courses %}
-                                <li class="list-group-item d-flex justify-content-between align-items-center">
-                                    {{ course.name }}
-                                    <a href="/unenroll/{{ student_id }}/{{ course.id }}" class="btn btn-sm btn-danger" 
-                                       onclick="return confirm('Are you sure you want to unenroll this student?')">Unenroll</a>
-                                </li>
-                            {% endfor %}
-                        </ul>
-                    {% else %}
-                        <p class="text-muted">Not enrolled in any courses</p>
-                    {% endif %}
-                </div>
-            </div>
-        </div>
-        
-        <div class="col-md-8">
-            <div class="card">
-                <div class="card-header d-flex justify-content-between align-items-center">
-                    <h5 class="card-title mb-0">Attendance Records</h5>
-                    <a href="/attendance/edit/{{ student_id }}" class="btn btn-sm btn-primary">Edit Attendance</a>
-                </div>
-                <div class="card-body">
-                    {% if attendance %}
-                        <div class="table-responsive">
-                            <table class="table table-striped">
-                                <thead>
-                                    <tr>
-                                        <th>Date</th>
-                                        <th>Course</th>
-                                        <th>Status</th>
-                                    </tr>
-                                </thead>
-                                <tbody>
-                                    {% for date_key, status in attendance.items() %}
-                                        <tr>
-                                            {% if '_' in date_key %}
-                                                {% set date, course_id = date_key.split('_') %}
-                                                <td>{{ date }}</td>
-                                                <td>{{ courses[course_id].name if course_id in courses else 'Unknown' }}</td>
-                                            {% else %}
-                                                <td>{{ date_key }}</td>
-                                                <td>All</td>
-                                            {% endif %}
-                                            <td>
-                                                <span class="badge bg-{{ 'success' if status == 'Present' else 'danger' if status == 'Absent' else 'warning' if status == 'Late' else 'secondary' }}">
-                                                    {{ status }}
-                                                </span>
-                                            </td>
-                                        </tr>
-                                    {% endfor %}
-                                </tbody>
-                            </table>
-                        </div>
-                    {% else %}
-                        <p class="text-muted">No attendance records found</p>
-                    {% endif %}
-                </div>
-            </div>
-        </div>
-    </div>
-{% endblock %}
-        ''')
-    
-    # Create course details template
-    with open('templates/course_details.html', 'w') as f:
-        f.write('''
-{% extends "layout.html" %}
-{% block content %}
-    <div class="d-flex justify-content-between align-items-center mb-4">
-        <h1>Course Details: {{ course.name }}</h1>
-        <a href="/courses" class="btn btn-secondary">Back to Courses</a>
-    </div>
-    
-    <div class="row">
-        <div class="col-md-4">
-            <div class="card mb-4">
-                <div class="card-header">
-                    <h5 class="card-title">Course Information</h5>
-                </div>
-                <div class="card-body">
-                    <p><strong>ID:</strong> {{ course_id }}</p>
-                    <p><strong>Name:</strong> {{ course.name }}</p>
-                    <p><strong>Instructor:</strong> {{ course.instructor if course.instructor else 'Not assigned' }}</p>
-                </div>
-            </div>
-        </div>
-        
-        <div class="col-md-8">
-            <div class="card">
-                <div class="card-header d-flex justify-content-between align-items-center">
-                    <h5 class="card-title mb-0">Enrolled Students</h5>
-                    <a href="/enroll" class="btn btn-sm btn-primary">Enroll Student</a>
-                </div>
-                <div class="card-body">
-                    {% if enrolled_students %}
-                        <div class="table-responsive">
-                            <table class="table table-striped">
-                                <thead>
-                                    <tr>
-                                        <th>ID</th>
-                                        <th>Name</th>
-                                        <th>Actions</th>
-                                    </tr>
-                                </thead>
-                                <tbody>
-                                    {% for student in enrolled_students %}
-                                        <tr>
-                                            <td>{{ student.id }}</td>
-                                            <td>{{ student.name }}</td>
-                                            <td>
-                                                <a href="/student/{{ student.id }}" class="btn btn-sm btn-info">View</a>
-                                                <a href="/unenroll/{{ student.id }}/{{ course_id }}" class="btn btn-sm btn-danger"
-                                                   onclick="return confirm('Are you sure you want to unenroll this student?')">Unenroll</a>
-                                            </td>
-                                        </tr>
-                                    {% endfor %}
-                                </tbody>
-                            </table>
-                        </div>
-                    {% else %}
-                        <p class="text-muted">No students enrolled in this course</p>
-                    {% endif %}
-                </div>
-            </div>
-        </div>
-    </div>
-{% endblock %}
-        ''')
-    
-    # Create edit attendance template
-    with open('templates/edit_attendance.html', 'w') as f:
-        f.write('''
-{% extends "layout.html" %}
-{% block content %}
-    <div class="d-flex justify-content-between align-items-center mb-4">
-        <h1>Edit Attendance for {{ student.name }}</h1>
-        <a href="/student/{{ student_id }}" class="btn btn-secondary">Back to Student</a>
-    </div>
-    
-    <div class="card">
-        <div class="card-body">
-            <form method="post">
-                <div class="row mb-3">
-                    <div class="col-md-4">
-                        <label for="date" class="form-label">Date</label>
-                        <input type="date" class="form-control" id="date" name="date" required>
-                    </div>
-                    <div class="col-md-4">
-                        <label for="status" class="form-label">Status</label>
-                        <select class="form-select" id="status" name="status" required>
-                            <option value="Present">Present</option>
-                            <option value="Absent">Absent</option>
-                            <option value="Late">Late</option>
-                            <option value="Excused">Excused</option>
-                        </select>
-                    </div>
-                    <div class="col-md-4">
-                        <label for="course_id" class="form-label">Course (Optional)</label>
-                        <select class="form-select" id="course_id" name="course_id">
-                            <option value="">All Courses</option>
-                            {% for course_id, course in courses.items() %}
-                                {% if course_id in student.courses %}
-                                    <option value="{{ course_id }}">{{ course.name }}</option>
-                                {% endif %}
-                            {% endfor %}
-                        </select>
-                    </div>
-                </div>
-                <div class="d-flex justify-content-end">
-                    <button type="submit" class="btn btn-primary">Update Attendance</button>
-                </div>
-            </form>
-            
-            <hr>
-            
-            <h5 class="mt-4">Current Attendance Records</h5>
-            {% if attendance %}
-                <div class="table-responsive">
-                    <table class="table table-striped">
-                        <thead>
-                            <tr>
-                                <th>Date</th>
-                                <th>Course</th>
-                                <th>Status</th>
-                            </tr>
-                        </thead>
-                        <tbody>
-                            {% for date_key, status in attendance.items() %}
-                                <tr>
-                                    {% if '_' in date_key %}
-                                        {% set date, course_id = date_key.split('_') %}
-                                        <td>{{ date }}</td>
-                                        <td>{{ courses[course_id].name if course_id in courses else 'Unknown' }}</td>
-                                    {% else %}
-                                        <td>{{ date_key }}</td>
-                                        <td>All</td>
-                                    {% endif %}
-                                    <td>
-                                        <span class="badge bg-{{ 'success' if status == 'Present' else 'danger' if status == 'Absent' else 'warning' if status == 'Late' else 'secondary' }}">
-                                            {{ status }}
-                                        </span>
-                                    </td>
-                                </tr>
-                            {% endfor %}
-                        </tbody>
-                    </table>
-                </div>
-            {% else %}
-                <p class="text-muted">No attendance records found</p>
-            {% endif %}
-        </div>
-    </div>
-{% endblock %}
-        ''')
-    
-    # Create enroll template
-    with open('templates/enroll.html', 'w') as f:
-        f.write('''
-{% extends "layout.html" %}
-{% block content %}
-    <h1 class="mb-4">Enroll Student in Course</h1>
-    
-    <div class="card">
-        <div class="card-body">
-            <form method="post">
-                <div class="mb-3">
-                    <label for="student_id" class="form-label">Student</label>
-                    <select class="form-select" id="student_id" name="student_id" required>
-                        <option value="">Select Student</option>
-                        {% for student_id, student in students.items() %}
-                            <option value="{{ student_id }}">{{ student_id }} - {{ student.name }}</option>
-                        {% endfor %}
-                    </select>
-                </div>
-                <div class="mb-3">
-                    <label for="course_id" class="form-label">Course</label>
-                    <select class="form-select" id="course_id" name="course_id" required>
-                        <option value="">Select Course</option>
-                        {% for course_id, course in courses.items() %}
-                            <option value="{{ course_id }}">{{ course.name }}</option>
-                        {% endfor %}
-                    </select>
-                </div>
-                <div class="d-flex justify-content-between">
-                    <a href="javascript:history.back()" class="btn btn-secondary">Cancel</a>
-                    <button type="submit" class="btn btn-primary">Enroll Student</button>
-                </div>
-            </form>
-        </div>
-    </div>
-{% endblock %}
-        ''')
-    
-    # Create summary template
-    with open('templates/summary.html', 'w') as f:
-        f.write('''
-{% extends "layout.html" %}
-{% block content %}
-    <div class="d-flex justify-content-between align-items-center mb-4">
-        <h1>Attendance Summary</h1>
-        <a href="/export{% if selected_course %}?course_id={{ selected_course }}{% endif %}" class="btn btn-success">Export to CSV</a>
-    </div>
-    
-    <div class="card mb-4">
-        <div class="card-body">
-            <form method="get" class="row g-3">
-                <div class="col-auto">
-                    <label for="course_id" class="visually-hidden">Course</label>
-                    <select class="form-select" id="course_id" name="course_id" onchange="this.form.submit()">
-                        <option value="">All Courses</option>
-                        {% for course_id, course in courses.items() %}
-                            <option value="{{ course_id }}" {% if selected_course == course_id %}selected{% endif %}>
-                                {{ course.name }}
-                            </option>
-                        {% endfor %}
-                    </select>
-                </div>
-            </form>
-        </div>
-    </div>
-    
-    <div class="card">
-        <div class="card-body">
-            {% if summary %}
-                <div class="table-responsive">
-                    <table class="table table-striped">
-                        <thead>
-                            <tr>
-                                <th>ID</th>
-                                <th>Name</th>
-                                <th>Total Days</th>
-                                <th>Present</th>
-                                <th>Absent</th>
-                                <th>Late</th>
-                                <th>Excused</th>
-                                <th>Attendance %</th>
-                                <th>Actions</th>
-                            </tr>
-                        </thead>
-                        <tbody>
-                            {% for student_id, data in summary.items() %}
-                                <tr>
-                                    <td>{{ student_id }}</td>
-                                    <td>{{ data.name }}</td>
-                                    <td>{{ data.total_days }}</td>
-                                    <td>{{ data.present_days }}</td>
-                                    <td>{{ data.absent_days }}</td>
-                                    <td>{{ data.late_days }}</td>
-                                    <td>{{ data.excused_days }}</td>
-                                    <td>{{ "%.2f"|format(data.attendance_percentage) }}%</td>
-                                    <td>
-                                        <a href="/student/{{ student_id }}" class="btn btn-sm btn-info">Details</a>
-                                    </td>
-                                </tr>
-                            {% endfor %}
-                        </tbody>
-                    </table>
-                </div>
-            {% else %}
-                <p class="text-muted">No data available for summary</p>
-            {% endif %}
-        </div>
-    </div>
-{% endblock %}
-        ''')
-    
-    # Run the app
-    app.run(debug=True)
\ No newline at end of file
+    # The templates under templates/ are used as checked in
+    create_app().run(debug=True)
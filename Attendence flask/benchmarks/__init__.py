@@ -0,0 +1,10 @@
+"""Benchmarks for the attendance system.
+
+Run from the "Attendence flask" directory:
+
+    python -m benchmarks --size small --output results.json
+    python -m benchmarks --size small --compare results.json
+
+Datasets are synthetic but reproducible: the same size preset and seed always
+produce the same students, courses and marks.
+"""
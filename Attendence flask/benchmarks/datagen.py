@@ -0,0 +1,79 @@
+"""Reproducible synthetic school datasets for the benchmarks."""
+import json
+import random
+from datetime import date, timedelta
+
+# students, courses, courses per student, school days
+SIZES = {
+    'tiny': (200, 10, 3, 40),
+    'small': (1000, 50, 4, 180),
+    'medium': (10000, 200, 5, 180),
+    'large': (100000, 500, 5, 180),
+}
+
+# Rough share of each status in real registers
+STATUS_WEIGHTS = (("Present", 85), ("Absent", 8), ("Late", 5), ("Excused", 2))
+
+FIRST_NAMES = ("Arun", "Bhuvanesh", "Divya", "Gokul", "Hemanth", "Kavya", "Lakshmi",
+               "Meena", "Priya", "Rahul", "Ramya", "Sanjay", "Srinivasan", "Vignesh")
+LAST_NAMES = ("Kumar", "Krishnan", "Murugan", "Natarajan", "Raman", "Senthil", "Subramaniam")
+
+def school_days(start: date, count: int):
+    """Return the first count weekdays on or after start, as ISO strings."""
+    days = []
+    day = start
+    while len(days) < count:
+        if day.weekday() < 5:
+            days.append(day.isoformat())
+        day += timedelta(days=1)
+    return days
+
+def generate_dataset(students: int, courses: int, courses_per_student: int, days: int,
+                     seed: int = 42, start: date = date(2024, 9, 2)):
+    """Build a snapshot dict in the attendance_data.json layout.
+    
+    Every course meets on two or three fixed weekdays, each student takes
+    courses_per_student courses and has a mark for every session of each one.
+    """
+    rng = random.Random(seed)
+    statuses = [status for status, _ in STATUS_WEIGHTS]
+    weights = [weight for _, weight in STATUS_WEIGHTS]
+    calendar = school_days(start, days)
+    
+    course_data = {}
+    sessions = {}
+    for c in range(courses):
+        course_id = f"C{c:04d}"
+        course_data[course_id] = {
+            'name': f"Course {c:04d}",
+            'instructor': f"{rng.choice(FIRST_NAMES)}.{rng.choice(LAST_NAMES)[0]}",
+            'schedule': []
+        }
+        meeting_days = set(rng.sample(range(5), rng.choice((2, 3))))
+        sessions[course_id] = [d for d in calendar if date.fromisoformat(d).weekday() in meeting_days]
+    
+    course_ids = list(course_data)
+    records = {}
+    for s in range(students):
+        student_id = f"{24 - s % 3}BFN{s:06d}"
+        enrolled = rng.sample(course_ids, min(courses_per_student, len(course_ids)))
+        records[student_id] = {
+            'name': f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            'email': f"student{s}@example.edu",
+            'attendance': {},
+            'course_attendance': {
+                course_id: dict(zip(sessions[course_id],
+                                    rng.choices(statuses, weights, k=len(sessions[course_id]))))
+                for course_id in enrolled
+            },
+            'courses': sorted(enrolled)
+        }
+    return {'records': records, 'courses': course_data, 'journal_seq': 0}
+
+def write_dataset(path: str, size: str = 'small', seed: int = 42):
+    """Generate a dataset for a size preset and write it as a JSON snapshot; returns mark count."""
+    dataset = generate_dataset(*SIZES[size], seed=seed)
+    with open(path, 'w') as f:
+        json.dump(dataset, f)
+    return sum(len(marks) for student in dataset['records'].values()
+               for marks in student['course_attendance'].values())
@@ -0,0 +1,300 @@
+"""Time the attendance engine and its Flask routes against a synthetic dataset."""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+from .datagen import SIZES, write_dataset
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def summarise(durations):
+    """Summarise a list of durations in seconds."""
+    return {
+        'repeat': len(durations),
+        'min': min(durations),
+        'median': statistics.median(durations),
+        'mean': statistics.fmean(durations)
+    }
+
+def timed(fn, repeat: int):
+    """Call fn repeat times and summarise the wall-clock durations in seconds."""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - start)
+    return summarise(durations)
+
+# Run in a fresh interpreter: seconds from the start of the import until the app exists,
+# until the data is loaded and until the first page has been served
+STARTUP_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+sys.path.insert(0, {app_dir!r})
+import attendence
+app = attendence.create_app({config!r})
+created = time.perf_counter()
+app.extensions['attendance'].ready.wait()
+loaded = time.perf_counter()
+app.test_client().get('/summary').get_data()
+served = time.perf_counter()
+print(json.dumps({{'create_app': created - start, 'ready': loaded - start, 'first_request': served - start}}))
+"""
+
+# Run in a fresh interpreter: bytes still allocated once an engine has loaded the dataset
+MEMORY_SCRIPT = """
+import gc, json, sys, tracemalloc
+sys.path.insert(0, {app_dir!r})
+import attendence
+tracemalloc.start()
+engine = attendence.create_attendance_system({backend!r}, {db_path!r}, {analytics!r})
+engine.load_data({data_file!r})
+gc.collect()
+print(json.dumps(tracemalloc.get_traced_memory()[0]))
+"""
+
+def measure_memory(data_file: str, marks: int, backend: str, analytics: bool, workdir: str):
+    """Measure the memory an engine holds after loading the dataset, in total and per mark."""
+    script = MEMORY_SCRIPT.format(app_dir=APP_DIR, backend=backend, analytics=analytics, data_file=data_file,
+                                  db_path=os.path.join(workdir, f"memory-{time.monotonic_ns()}.db"))
+    output = subprocess.run([sys.executable, '-c', script], cwd=workdir, check=True,
+                            capture_output=True, text=True).stdout
+    engine_bytes = json.loads(output)
+    return {'engine_bytes': engine_bytes, 'bytes_per_mark': engine_bytes / marks if marks else 0.0}
+
+def measure_startup(config: dict, repeat: int, workdir: str):
+    """Time cold starts of the app in new processes; returns results keyed 'startup.<phase>'."""
+    script = STARTUP_SCRIPT.format(app_dir=APP_DIR, config=config)
+    samples = {}
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', script], cwd=workdir, check=True,
+                                capture_output=True, text=True).stdout
+        for phase, seconds in json.loads(output).items():
+            samples.setdefault(f'startup.{phase}', []).append(seconds)
+    return {name: summarise(durations) for name, durations in samples.items()}
+
+def _unique_dates():
+    """Yield dates no generated dataset uses, so every timed mark is a new one."""
+    day = date(2100, 1, 1)
+    while True:
+        yield day.isoformat()
+        day += timedelta(days=1)
+
+def run_benchmarks(size: str = 'small', seed: int = 42, repeat: int = 5, backend: str = 'json',
+                   analytics: bool = False, cache_size: int = 0, snapshot: str = 'json',
+                   write_behind: float = 0.0):
+    """Generate a dataset, time each engine method and route, and return a result document.
+    
+    snapshot 'binary' converts the dataset to a .snap file and runs everything against that;
+    'sharded' does the same with a .shards directory.
+    write_behind > 0 saves the timed engine's changes from a write-behind thread with that interval.
+    """
+    workdir = tempfile.mkdtemp(prefix='attendance-bench-')
+    previous_cwd = os.getcwd()
+    # The app keeps its data files relative to the working directory
+    os.chdir(workdir)
+    sys.path.insert(0, APP_DIR)
+    engine = None
+    try:
+        import attendence
+        
+        data_file = os.path.join(workdir, 'attendance_data.json')
+        results = {}
+        marks = write_dataset(data_file, size, seed)
+        suffix = '.json'
+        if snapshot in ('binary', 'sharded'):
+            suffix = attendence.BINARY_SNAPSHOT_SUFFIX if snapshot == 'binary' else attendence.SHARDED_SNAPSHOT_SUFFIX
+            json_file, data_file = data_file, os.path.join(workdir, f'attendance_data{suffix}')
+            results['convert_snapshot'] = timed(lambda: attendence.convert_snapshot(json_file, data_file), 1)
+        memory = measure_memory(data_file, marks, backend, analytics, workdir)
+        
+        def load():
+            engine = attendence.create_attendance_system(backend, os.path.join(workdir, f"bench-{time.monotonic_ns()}.db"),
+                                                         analytics, cache_size)
+            # Record calls as an app's engine does, so the timings include that cost
+            engine.metrics = attendence.Metrics()
+            engine.load_data(data_file)
+            return engine
+        
+        results.update(measure_startup({
+            'ATTENDANCE_BACKEND': backend,
+            'ATTENDANCE_DATA_FILE': data_file,
+            'ATTENDANCE_DB': os.path.join(workdir, 'startup.db'),
+            'ATTENDANCE_ANALYTICS': analytics
+        }, repeat, workdir))
+        results['engine.load_data'] = timed(load, 1 if backend == 'sqlite' else repeat)
+        engine = load()
+        if write_behind and backend == 'json':
+            engine.start_write_behind(data_file, write_behind)
+        
+        student_id = engine.list_students(page=1, per_page=1)[0][0]
+        course_id = sorted(engine.get_student(student_id)['courses'])[0]
+        dates = _unique_dates()
+        
+        engine_cases = {
+            'engine.get_summary': lambda: engine.get_summary(),
+            'engine.get_summary(course)': lambda: engine.get_summary(course_id),
+            'engine.export_attendance_csv': lambda: engine.export_attendance_csv(),
+            'engine.export_attendance_csv(course)': lambda: engine.export_attendance_csv(course_id),
+            'engine.get_attendance(course)': lambda: engine.get_attendance(student_id, course_id),
+            'engine.get_attendance_rows': lambda: engine.get_attendance_rows(student_id),
+            'engine.list_students(name)': lambda: engine.list_students(sort='name', page=2),
+            'engine.get_course_grid': lambda: engine.get_course_grid(course_id, max_dates=31),
+            'engine.get_trends(course)': lambda: engine.get_trends(course_id),
+            'engine.get_trends(month)': lambda: engine.get_trends(period='month'),
+            'engine.get_trends(student)': lambda: engine.get_trends(student_id=student_id),
+            'engine.get_at_risk(course)': lambda: engine.get_at_risk(course_id),
+            'engine.get_at_risk(every course)': lambda: [engine.get_at_risk(course) for course in engine.get_courses()],
+            'engine.mark_attendance+save_data': lambda: (
+                engine.mark_attendance(student_id, next(dates), 'Present', course_id),
+                engine.save_data(data_file)
+            ),
+        }
+        import_ids = engine.list_students(page=1, per_page=1000)[0]
+        
+        def import_marks():
+            # One general mark per student for a new date, as an uploaded register would be
+            day = next(dates)
+            rows = ['student_id,date,status'] + [f'{import_id},{day},Present' for import_id in import_ids]
+            engine.import_csv('attendance', rows)
+            engine.save_data(data_file)
+        
+        engine_cases['engine.import_csv(1000 marks)+save_data'] = import_marks
+        if backend == 'json':
+            engine_cases['engine.compact'] = lambda: engine.compact(os.path.join(workdir, f'snapshot{suffix}'))
+            # A sharded data file only rewrites what the mark touched
+            engine_cases['engine.mark_attendance+compact'] = lambda: (
+                engine.mark_attendance(student_id, next(dates), 'Present', course_id),
+                engine.compact(data_file)
+            )
+        for name, case in engine_cases.items():
+            results[name] = timed(case, repeat)
+        
+        # Routes run against the same engine through the Flask test client
+        app = attendence.create_app({
+            'ATTENDANCE_DATA_FILE': os.path.join(workdir, 'unused.json'),
+            'ATTENDANCE_DB': os.path.join(workdir, 'unused.db'),
+            'ATTENDANCE_BACKGROUND_LOAD': False
+        })
+        app.extensions['attendance'] = engine
+        engine.metrics = app.extensions['attendance_metrics']
+        app.config['ATTENDANCE_DATA_FILE'] = data_file
+        client = app.test_client()
+        route_cases = {
+            'GET /': '/',
+            'GET /students': '/students',
+            'GET /summary': '/summary',
+            'GET /summary?course_id': f'/summary?course_id={course_id}',
+            'GET /export': '/export',
+            'GET /export?course_id': f'/export?course_id={course_id}',
+            'GET /student/<id>': f'/student/{student_id}',
+            'GET /courses/<id>': f'/courses/{course_id}',
+            'GET /courses/<id>/grid': f'/courses/{course_id}/grid',
+            'GET /attendance': '/attendance',
+            'GET /trends': '/trends',
+            'GET /at-risk': '/at-risk',
+            'GET /api/summary': '/api/summary',
+            'GET /api/students/<id>/attendance': f'/api/students/{student_id}/attendance',
+            'GET /metrics': '/metrics',
+        }
+        for name, url in route_cases.items():
+            results[name] = timed(lambda: client.get(url).get_data(), repeat)
+        # A client revalidating an unchanged summary should get a 304 without the summary being built
+        etag = client.get('/api/summary').headers['ETag']
+        
+        def revalidate():
+            response = client.get('/api/summary', headers={'If-None-Match': etag})
+            assert response.status_code == 304, response.status
+        results['GET /api/summary (304)'] = timed(revalidate, repeat)
+        results['POST /attendance'] = timed(lambda: client.post('/attendance', data={
+            'student_id': student_id, 'date': next(dates), 'status': 'Present', 'course_id': course_id
+        }).get_data(), repeat)
+    finally:
+        if engine is not None and engine.write_behind is not None:
+            engine.stop_write_behind()
+        os.chdir(previous_cwd)
+        # The dataset and every data file the run wrote out
+        shutil.rmtree(workdir, ignore_errors=True)
+    
+    students, courses, courses_per_student, days = SIZES[size]
+    return {
+        'meta': {
+            'size': size,
+            'seed': seed,
+            'backend': backend,
+            'analytics': analytics,
+            'cache_size': cache_size,
+            'snapshot': snapshot,
+            'write_behind': write_behind,
+            'students': students,
+            'courses': courses,
+            'courses_per_student': courses_per_student,
+            'school_days': days,
+            'marks': marks,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'timestamp': datetime.now().isoformat(timespec='seconds')
+        },
+        'memory': memory,
+        'results': results
+    }
+
+def compare(previous: dict, current: dict):
+    """Print median timings, and memory per mark, side by side with the ratio current / previous."""
+    print(f"{'benchmark':40} {'before (ms)':>12} {'after (ms)':>12} {'ratio':>8}")
+    for name, stats in current['results'].items():
+        before = previous['results'].get(name)
+        after_ms = stats['median'] * 1000
+        if before is None:
+            print(f"{name:40} {'-':>12} {after_ms:12.3f} {'-':>8}")
+        else:
+            before_ms = before['median'] * 1000
+            ratio = after_ms / before_ms if before_ms else float('inf')
+            print(f"{name:40} {before_ms:12.3f} {after_ms:12.3f} {ratio:8.2f}")
+    if 'memory' in current:
+        after = current['memory']['bytes_per_mark']
+        before = previous.get('memory', {}).get('bytes_per_mark')
+        if before is None:
+            print(f"{'memory (bytes per mark)':40} {'-':>12} {after:12.1f} {'-':>8}")
+        else:
+            print(f"{'memory (bytes per mark)':40} {before:12.1f} {after:12.1f} {after / before:8.2f}")
+
+def main(argv=None):
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description=__doc__)
+    parser.add_argument('--size', choices=sorted(SIZES), default='small',
+                        help="dataset preset; 'large' needs several GB of memory")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeat', type=int, default=5, help='timed runs per benchmark')
+    parser.add_argument('--backend', choices=('json', 'sqlite'), default='json')
+    parser.add_argument('--analytics', action='store_true', help='turn on the columnar summary mode')
+    parser.add_argument('--cache-size', type=int, default=0,
+                        help='result cache entries; the default 0 times every summary uncached')
+    parser.add_argument('--snapshot', choices=('json', 'binary', 'sharded'), default='json',
+                        help='data file format the engine loads and compacts to')
+    parser.add_argument('--write-behind', type=float, default=0.0, metavar='SECONDS',
+                        help='save changes from a write-behind thread with this flush interval')
+    parser.add_argument('--output', help='write the JSON results here instead of stdout')
+    parser.add_argument('--compare', metavar='RESULTS', help='print a comparison with an earlier results file')
+    args = parser.parse_args(argv)
+    
+    report = run_benchmarks(args.size, args.seed, args.repeat, args.backend, args.analytics,
+                            args.cache_size, args.snapshot, args.write_behind)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    elif not args.compare:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+    return 0
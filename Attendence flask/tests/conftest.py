@@ -0,0 +1,61 @@
+import os
+import sys
+
+import pytest
+
+# The app is a single module one directory up, not an installed package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import attendence
+
+
+def _populate(engine):
+    """Give an engine two students, two courses, enrollments and marks in both kinds of register."""
+    engine.add_student('S1', 'Ada', 'ada@example.com')
+    engine.add_student('S2', 'Bob')
+    engine.add_course('C1', 'Maths', 'Turing')
+    engine.add_course('C2', 'Physics')
+    engine.enroll_student('S1', 'C1')
+    engine.enroll_student('S2', 'C1')
+    engine.enroll_student('S2', 'C2')
+    engine.mark_course_attendance('C1', '2025-01-06', {'S2': 'Absent'})
+    engine.mark_attendance('S2', '2025-01-07', 'Late', 'C2')
+    engine.mark_attendance('S1', '2025-02-03', 'Excused')
+    engine.edit_attendance('S1', '2025-01-06', 'Late', 'C1')
+    return engine
+
+
+def _contents(engine):
+    """Return everything an engine holds as plain values, so two engines can be compared."""
+    return {
+        'courses': {course_id: (course.name, course.instructor) for course_id, course in engine.get_courses().items()},
+        'rosters': {course_id: engine.get_course_roster(course_id) for course_id in engine.get_courses()},
+        'students': {student_id: (student.name, student.email, engine.get_attendance_rows(student_id))
+                     for student_id, student in engine.records.items()},
+    }
+
+
+@pytest.fixture
+def populate():
+    """The function filling an engine with a small school."""
+    return _populate
+
+
+@pytest.fixture
+def contents():
+    """The function flattening an engine's data for comparisons."""
+    return _contents
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    """Return a function building an app on data files in tmp_path, loaded before it returns."""
+    def make_app(backend='json', **config):
+        return attendence.create_app({
+            'ATTENDANCE_BACKEND': backend,
+            'ATTENDANCE_DATA_FILE': str(tmp_path / 'data.json'),
+            'ATTENDANCE_DB': str(tmp_path / 'data.db'),
+            'ATTENDANCE_BACKGROUND_LOAD': False,
+            **config
+        })
+    return make_app
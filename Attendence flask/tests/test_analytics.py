@@ -0,0 +1,51 @@
+import pytest
+
+import attendence
+
+
+@pytest.fixture(params=['numpy', 'stdlib'])
+def analytics_engine(request, monkeypatch):
+    """A columnar analytics engine, using NumPy or its standard library fallback."""
+    if request.param == 'numpy':
+        pytest.importorskip('numpy')
+    else:
+        monkeypatch.setattr(attendence, 'numpy', None)
+        monkeypatch.setattr(attendence, '_numpy_checked', True)
+    return attendence.EnhancedAttendanceSystem(analytics=True, cache_size=0)
+
+
+def reports(engine):
+    return [
+        engine.get_summary(),
+        engine.get_summary('C1'),
+        engine.get_summary('C2'),
+        engine.summarize_student('S2'),
+        engine.summarize_student('S1', 'C1'),
+        ''.join(engine.iter_attendance_csv()),
+        ''.join(engine.iter_attendance_csv('C1')),
+    ]
+
+
+def test_analytics_summaries_match_the_counters(analytics_engine, populate):
+    plain = populate(attendence.EnhancedAttendanceSystem(cache_size=0))
+    populate(analytics_engine)
+    assert reports(analytics_engine) == reports(plain)
+    
+    # The matrices follow new marks, edits, new dates, new students and unenrollments
+    for engine in (plain, analytics_engine):
+        engine.add_student('S3', 'Cy')
+        engine.enroll_student('S3', 'C2')
+        engine.mark_course_attendance('C2', '2025-03-10', {'S2': 'Excused', 'S3': 'Absent'})
+        engine.edit_attendance('S2', '2025-01-07', 'Present', 'C2')
+        engine.mark_attendance('S3', 'last tuesday', 'Late')
+        engine.unenroll_student('S2', 'C1')
+    assert reports(analytics_engine) == reports(plain)
+
+
+def test_analytics_survive_a_reload(tmp_path, analytics_engine, populate):
+    filename = str(tmp_path / 'data.snap')
+    populate(attendence.EnhancedAttendanceSystem()).save_data(filename)
+    plain = attendence.EnhancedAttendanceSystem(cache_size=0)
+    plain.load_data(filename)
+    analytics_engine.load_data(filename)
+    assert reports(analytics_engine) == reports(plain)
@@ -0,0 +1,51 @@
+import os
+
+import attendence
+
+
+def make_school(filename, populate):
+    engine = attendence.EnhancedAttendanceSystem(journal=True)
+    engine.attach(filename)
+    return populate(engine)
+
+
+def test_archived_marks_survive_a_reload(tmp_path, populate):
+    filename = str(tmp_path / 'data.json')
+    engine = make_school(filename, populate)
+    before = engine.get_attendance_rows('S2', '2025-01-01', '2025-12-31')
+    
+    success, message = engine.archive(filename, before='2025-02-01')
+    assert success, message
+    assert os.path.exists(os.path.join(attendence.EnhancedAttendanceSystem._archive_dir(filename), 'index.json'))
+    
+    reopened = attendence.EnhancedAttendanceSystem(journal=True)
+    reopened.load_data(filename)
+    # Live marks only without a range; a range reaching back reads the archive in
+    assert reopened.get_attendance_rows('S2') == []
+    assert reopened.get_attendance_rows('S2', '2025-01-01', '2025-12-31') == before
+    assert reopened.get_attendance('S1', 'C1', '2025-01-01')[2] == {'2025-01-06': 'Late'}
+    assert reopened.get_attendance_rows('S1') == [{'date': '2025-02-03', 'course_id': None, 'status': 'Excused'}]
+    assert reopened.get_summary('C1', '2025-01-01') == engine.get_summary('C1', '2025-01-01')
+
+
+def test_archived_ranges_and_courses_are_read_only(tmp_path, populate):
+    filename = str(tmp_path / 'data.json')
+    engine = make_school(filename, populate)
+    assert engine.archive(filename, before='2025-02-01')[0]
+    engine.mark_attendance('S2', '2025-02-04', 'Absent', 'C2')
+    assert engine.archive(filename, course_ids=['C2'])[0]
+    
+    reopened = attendence.EnhancedAttendanceSystem(journal=True)
+    reopened.attach(filename)
+    assert not reopened.edit_attendance('S1', '2025-01-06', 'Present', 'C1')[0]
+    assert not reopened.mark_attendance('S2', '2025-03-03', 'Present', 'C2')[0]
+    assert reopened.mark_attendance('S2', '2025-03-03', 'Present', 'C1')[0]
+    
+    again = attendence.EnhancedAttendanceSystem(journal=True)
+    again.load_data(filename)
+    assert again.get_attendance_rows('S2', '2025-01-01') == [
+        {'date': '2025-01-06', 'course_id': 'C1', 'status': 'Absent'},
+        {'date': '2025-01-07', 'course_id': 'C2', 'status': 'Late'},
+        {'date': '2025-02-04', 'course_id': 'C2', 'status': 'Absent'},
+        {'date': '2025-03-03', 'course_id': 'C1', 'status': 'Present'},
+    ]
@@ -0,0 +1,94 @@
+import logging
+
+import pytest
+
+import attendence
+
+MARKS = {
+    'S1': ['Present'] * 4,  # 100%
+    'S2': ['Present', 'Present', 'Present', 'Absent'],  # 75%, on the threshold
+    'S3': ['Present', 'Absent'],  # 50%
+    'S4': ['Absent', 'Late'],  # 0%
+    'S5': [],  # not rated
+}
+
+
+@pytest.fixture(params=['json', 'sqlite'])
+def engine(request, tmp_path):
+    engine = attendence.create_attendance_system(request.param, str(tmp_path / 'data.db'))
+    engine.add_course('C1', 'Maths')
+    for student_id, statuses in MARKS.items():
+        engine.add_student(student_id, student_id.lower())
+        engine.enroll_student(student_id, 'C1')
+        for day, status in enumerate(statuses, 6):
+            engine.mark_attendance(student_id, f'2025-01-{day:02d}', status, 'C1')
+    return engine
+
+
+def at_risk(engine, *args, **kwargs):
+    """Return ([student_id, ...] lowest first, total) of an at-risk query."""
+    success, message, result = engine.get_at_risk(*args, **kwargs)
+    assert success, message
+    return list(result['students']), result['total']
+
+
+def test_lowest_first_below_the_threshold(engine):
+    assert at_risk(engine) == (['S4', 'S3'], 2)
+    assert at_risk(engine, 'C1') == (['S4', 'S3'], 2)
+    assert at_risk(engine, threshold=80) == (['S4', 'S3', 'S2'], 3)
+    assert at_risk(engine, threshold=0) == ([], 0)
+    
+    success, message, result = engine.get_at_risk(threshold=80, limit=1, offset=1)
+    assert (list(result['students']), result['total']) == (['S3'], 3)
+    assert result['students']['S3']['attendance_percentage'] == 50.0
+    assert engine.get_at_risk('C9') == (False, "Error: Course ID C9 not found.", {})
+
+
+def test_index_follows_edits(engine):
+    at_risk(engine, 'C1')
+    engine.edit_attendance('S4', '2025-01-06', 'Present', 'C1')
+    engine.edit_attendance('S4', '2025-01-07', 'Present', 'C1')
+    engine.mark_attendance('S1', '2025-01-10', 'Absent', 'C1')  # 80%, still clear
+    engine.mark_attendance('S2', '2025-01-10', 'Absent', 'C1')  # 60%
+    assert at_risk(engine) == (['S3', 'S2'], 2)
+    assert at_risk(engine, 'C1') == (['S3', 'S2'], 2)
+
+
+def test_listeners_hear_crossings_only(engine):
+    events = []
+    engine.add_risk_listener(lambda *event: events.append(event))
+    
+    engine.mark_attendance('S1', '2025-01-10', 'Late', 'C1')  # 100% to 80%: no crossing
+    assert events == []
+    
+    engine.mark_attendance('S2', '2025-01-10', 'Absent', 'C1')  # 75% to 60%
+    assert events == [('S2', None, 60.0, True), ('S2', 'C1', 60.0, True)]
+    
+    events.clear()
+    engine.edit_attendance('S2', '2025-01-10', 'Present', 'C1')  # Back to 80%
+    assert events == [('S2', None, 80.0, False), ('S2', 'C1', 80.0, False)]
+    
+    # A first mark below the threshold counts as crossing it
+    events.clear()
+    engine.mark_attendance('S5', '2025-01-06', 'Absent')
+    assert events == [('S5', None, 0.0, True)]
+
+
+def test_listeners_follow_the_threshold(engine):
+    events = []
+    engine.add_risk_listener(lambda *event: events.append(event))
+    engine.risk_threshold = 90.0
+    engine.mark_attendance('S1', '2025-01-10', 'Late', 'C1')
+    assert [event[:2] + event[3:] for event in events] == [('S1', None, True), ('S1', 'C1', True)]
+
+
+def test_replayed_marks_are_not_reported(make_app, caplog):
+    first = make_app().extensions['attendance']
+    first.add_student('S1', 'Ada')
+    first.mark_attendance('S1', '2025-01-06', 'Absent')
+    
+    caplog.clear()
+    with caplog.at_level(logging.INFO):
+        second = make_app().extensions['attendance']
+    assert second.get_at_risk()[2]['total'] == 1
+    assert not [record for record in caplog.records if 'at risk' in record.getMessage()]
@@ -0,0 +1,26 @@
+import attendence
+
+
+def test_attached_engines_catch_up_with_each_other(tmp_path, populate, contents):
+    filename = str(tmp_path / 'data.json')
+    first = attendence.EnhancedAttendanceSystem(journal=True)
+    second = attendence.EnhancedAttendanceSystem(journal=True)
+    first.attach(filename)
+    second.attach(filename)
+    
+    populate(first)
+    assert second.refresh()
+    assert contents(second) == contents(first)
+    assert not second.refresh()
+    
+    # A mutation catches up before it is applied, so it sees the other engine's changes
+    assert second.mark_attendance('S1', '2025-02-04', 'Present', 'C1')[0]
+    assert first.refresh()
+    assert first.get_attendance('S1', 'C1')[2]['2025-02-04'] == 'Present'
+    
+    # After a compaction the other engine reloads the new snapshot
+    first.add_student('S3', 'Cy')
+    first.compact(filename)
+    assert second.refresh()
+    assert contents(second) == contents(first)
+    assert second.data_stamp() == first.data_stamp()
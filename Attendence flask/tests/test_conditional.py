@@ -0,0 +1,71 @@
+import pytest
+
+API_URLS = [
+    '/api/summary',
+    '/api/summary?course_id=C1',
+    '/api/students/S1/attendance',
+    '/api/trends?course_id=C1',
+    '/api/at-risk',
+    '/api/courses/C1/roster',
+]
+
+
+@pytest.fixture(params=['json', 'sqlite'])
+def app(request, make_app, populate):
+    app = make_app(request.param)
+    populate(app.extensions['attendance'])
+    return app
+
+
+@pytest.mark.parametrize('url', API_URLS)
+def test_current_client_gets_a_bare_304(app, url):
+    client = app.test_client()
+    first = client.get(url)
+    assert first.status_code == 200
+    assert first.headers['ETag'] and first.headers['Last-Modified']
+    assert first.cache_control.no_cache
+    
+    again = client.get(url, headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304
+    assert again.get_data() == b''
+    assert again.headers['ETag'] == first.headers['ETag']
+    
+    dated = client.get(url, headers={'If-Modified-Since': first.headers['Last-Modified']})
+    assert dated.status_code == 304
+
+
+def test_mutation_changes_only_the_touched_tags(app):
+    client = app.test_client()
+    tags = {url: client.get(url).headers['ETag']
+            for url in ('/api/students/S1/attendance', '/api/students/S2/attendance',
+                        '/api/courses/C1/roster', '/api/courses/C2/roster', '/api/summary')}
+    
+    assert app.extensions['attendance'].mark_attendance('S1', '2025-02-10', 'Absent', 'C1')[0]
+    
+    def refetch(url):
+        return client.get(url, headers={'If-None-Match': tags[url]}).status_code
+    
+    assert refetch('/api/students/S1/attendance') == 200
+    assert refetch('/api/courses/C1/roster') == 200
+    assert refetch('/api/summary') == 200
+    # SQLite keeps one version for the whole database, so every tag moves there
+    untouched = 304 if app.config['ATTENDANCE_BACKEND'] == 'json' else 200
+    assert refetch('/api/students/S2/attendance') == untouched
+    assert refetch('/api/courses/C2/roster') == untouched
+
+
+def test_stale_tag_gets_the_new_body(app):
+    client = app.test_client()
+    tag = client.get('/api/students/S2/attendance').headers['ETag']
+    app.extensions['attendance'].mark_attendance('S2', '2025-02-11', 'Excused', 'C2')
+    
+    response = client.get('/api/students/S2/attendance', headers={'If-None-Match': tag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != tag
+    assert {'date': '2025-02-11', 'course_id': 'C2', 'status': 'Excused'} in response.get_json()['attendance']
+
+
+def test_errors_carry_no_validators(app):
+    response = app.test_client().get('/api/students/S9/attendance')
+    assert response.status_code == 404
+    assert 'ETag' not in response.headers
@@ -0,0 +1,59 @@
+import pytest
+
+import attendence
+
+JAN_6, JAN_8, JAN_10 = '2025-01-06', '2025-01-08', '2025-01-10'
+
+
+@pytest.fixture(params=['json', 'sqlite'])
+def school(request, tmp_path, populate):
+    """The small school, with two more Maths sessions after the first."""
+    engine = populate(attendence.create_attendance_system(request.param, str(tmp_path / 'data.db')))
+    engine.mark_course_attendance('C1', JAN_8, {'S1': 'Absent'})
+    engine.mark_attendance('S2', JAN_10, 'Late', 'C1')
+    return engine
+
+
+@pytest.mark.parametrize('kwargs, dates, rows, earlier', [
+    ({}, [JAN_6, JAN_8, JAN_10],
+     [('S1', 'Ada', ['Late', 'Absent', None]), ('S2', 'Bob', ['Absent', 'Present', 'Late'])], None),
+    ({'max_dates': 2}, [JAN_8, JAN_10],
+     [('S1', 'Ada', ['Absent', None]), ('S2', 'Bob', ['Present', 'Late'])], JAN_6),
+    ({'start_date': '2025-01-07', 'end_date': '2025-01-09'}, [JAN_8],
+     [('S1', 'Ada', ['Absent']), ('S2', 'Bob', ['Present'])], None),
+    # Columns come from the whole roster; students outside it get no row
+    ({'student_ids': ['S2', 'S9']}, [JAN_6, JAN_8, JAN_10], [('S2', 'Bob', ['Absent', 'Present', 'Late'])], None),
+    ({'start_date': '2025-03-01'}, [], [('S1', 'Ada', []), ('S2', 'Bob', [])], None),
+])
+def test_grid(school, kwargs, dates, rows, earlier):
+    success, message, grid = school.get_course_grid('C1', **kwargs)
+    assert success, message
+    assert grid == {'dates': dates, 'rows': rows, 'earlier': earlier}
+
+
+def test_grid_refuses_unknown_courses_and_bad_ranges(school):
+    assert school.get_course_grid('C9') == (False, "Error: Course ID C9 not found.", {})
+    success, message, grid = school.get_course_grid('C1', start_date='2025-02-01', end_date='2025-01-01')
+    assert not success and grid == {}
+
+
+def test_grid_page_pages_back_through_dates(make_app, populate):
+    app = make_app()
+    populate(app.extensions['attendance']).mark_attendance('S1', JAN_8, 'Present', 'C1')
+    client = app.test_client()
+    
+    # The course comes from the path even when the query names another
+    page = client.get('/courses/C1/grid?max_dates=1&course_id=C2').get_data(as_text=True)
+    assert 'Register: Maths' in page
+    assert f'title="{JAN_8}"' in page and f'title="{JAN_6}"' not in page
+    assert f'/courses/C1/grid?end_date={JAN_6}&amp;max_dates=1' in page
+    
+    older = client.get(f'/courses/C1/grid?max_dates=1&end_date={JAN_6}').get_data(as_text=True)
+    assert f'title="{JAN_6}"' in older and 'Earlier dates' not in older
+    assert 'Latest dates' in older
+
+
+def test_grid_page_of_unknown_course_goes_back_to_courses(make_app):
+    response = make_app().test_client().get('/courses/C9/grid')
+    assert response.status_code == 302
+    assert response.headers['Location'].endswith('/courses')
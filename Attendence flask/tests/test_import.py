@@ -0,0 +1,85 @@
+import io
+import sqlite3
+
+import pytest
+
+import attendence
+
+
+@pytest.mark.parametrize('backend', ['json', 'sqlite'])
+def test_bad_rows_are_reported_and_the_rest_imported(tmp_path, backend):
+    engine = attendence.create_attendance_system(backend, str(tmp_path / 'data.db'))
+    engine.add_course('C1', 'Maths')
+    
+    success, message, errors = engine.import_csv('students', [
+        ' Student_ID ,Name,email', 'S1,Ada,ada@example.com', 'S2,,', 'S1,Again,', 'S3,Cy,'])
+    assert success and message == "Imported 2 of 4 rows of students. 2 rows were skipped because of errors."
+    assert [line for line, error in errors] == [3, 4]
+    assert engine.list_students() == (['S1', 'S3'], 2)
+    
+    assert engine.import_csv('enrollments', ['student_id,course_id', 'S1,C1', 'S3,C1', 'S9,C1'])[0]
+    success, message, errors = engine.import_csv('attendance', [
+        'student_id,date,status,course_id',
+        'S1,2025-01-06,Present,C1',
+        'S3,2025-02-30,Absent,C1',
+        'S3,,Absent,C1',
+        'S3,2025-01-06,Sleeping,C1',
+        'S3,2025-01-07,Late,',
+    ], max_errors=2)
+    assert message == "Imported 2 of 5 rows of attendance. 3 rows were skipped because of errors."
+    assert errors == [(3, "Error: Invalid date '2025-02-30'. Use the YYYY-MM-DD format."),
+                      (4, "Error: Date cannot be empty.")]
+    assert engine.get_attendance('S1', 'C1')[2] == {'2025-01-06': 'Present'}
+    assert engine.get_attendance('S3')[2] == {'2025-01-07': 'Late'}
+
+
+@pytest.mark.parametrize('kind, lines, message', [
+    ('teachers', ['id'], "Error: Unknown import type 'teachers'."),
+    ('students', [], "Error: The CSV file is empty."),
+    ('students', ['student_id'], "Error: Missing column(s): name."),
+    ('students', ['student_id,name'], "Error: The CSV file has no rows to import."),
+])
+def test_unusable_files_are_refused(kind, lines, message):
+    engine = attendence.EnhancedAttendanceSystem()
+    assert engine.import_csv(kind, lines) == (False, message, [])
+
+
+def test_attached_import_is_written_out_once(tmp_path, monkeypatch):
+    filename = str(tmp_path / 'data.json')
+    engine = attendence.EnhancedAttendanceSystem(journal=True)
+    engine.attach(filename)
+    appends = []
+    append = engine._append_journal
+    monkeypatch.setattr(engine, '_append_journal', lambda filename, entries: appends.append(len(entries)) or append(filename, entries))
+    
+    engine.import_csv('students', ['student_id,name'] + [f'S{i},Student {i}' for i in range(50)])
+    assert appends == [50]
+    reopened = attendence.EnhancedAttendanceSystem(journal=True)
+    reopened.load_data(filename)
+    assert reopened.student_count() == 50
+
+
+def test_sqlite_import_commits_once(tmp_path):
+    db_path = str(tmp_path / 'data.db')
+    engine = attendence.SQLiteAttendanceSystem(db_path)
+    rows = iter(['student_id,name'] + [f'S{i},Student {i}' for i in range(50)])
+    
+    def lines():
+        for i, line in enumerate(rows):
+            if i == 40:
+                # Another connection sees nothing until the whole import is committed
+                with sqlite3.connect(db_path) as other:
+                    assert other.execute("SELECT COUNT(*) FROM students").fetchone() == (0,)
+            yield line
+    assert engine.import_csv('students', lines())[0]
+    with sqlite3.connect(db_path) as other:
+        assert other.execute("SELECT COUNT(*) FROM students").fetchone() == (50,)
+
+
+def test_import_page_reports_bad_rows(make_app):
+    app = make_app()
+    upload = io.BytesIO('\ufeffstudent_id,name\nS1,Ada\n,Nameless\n'.encode())
+    page = app.test_client().post('/import', data={'kind': 'students', 'file': (upload, 'students.csv')})
+    assert page.status_code == 200
+    assert 'Imported 1 of 2 rows of students.' in page.get_data(as_text=True)
+    assert app.extensions['attendance'].get_student('S1').name == 'Ada'
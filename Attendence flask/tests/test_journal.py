@@ -0,0 +1,61 @@
+import os
+
+import attendence
+
+
+def test_journal_replays_changes_since_the_snapshot(tmp_path, populate, contents):
+    filename = str(tmp_path / 'data.json')
+    engine = attendence.EnhancedAttendanceSystem(journal=True)
+    engine.add_student('S0', 'Zoe')
+    engine.compact(filename)
+    engine.attach(filename)
+    populate(engine)
+    assert os.path.getsize(engine._journal_path(filename)) > 0
+    
+    reopened = attendence.EnhancedAttendanceSystem(journal=True)
+    assert reopened.load_data(filename)
+    assert contents(reopened) == contents(engine)
+    assert reopened.get_summary() == engine.get_summary()
+
+
+def test_journal_entries_already_in_the_snapshot_are_skipped(tmp_path, caplog, populate, contents):
+    filename = str(tmp_path / 'data.json')
+    engine = populate(attendence.EnhancedAttendanceSystem(journal=True))
+    engine.save_data(filename)
+    journal = engine._journal_path(filename)
+    with open(journal, 'rb') as f:
+        entries = f.read()
+    engine.compact(filename)
+    # A crash after the snapshot was replaced but before the journal was truncated
+    with open(journal, 'wb') as f:
+        f.write(entries)
+    
+    reopened = attendence.EnhancedAttendanceSystem(journal=True)
+    reopened.load_data(filename)
+    assert contents(reopened) == contents(engine)
+    assert reopened.get_summary() == engine.get_summary()
+    assert not caplog.records  # Nothing was applied twice
+
+
+def test_torn_journal_tail_is_dropped_and_truncated(tmp_path, populate, contents):
+    filename = str(tmp_path / 'data.json')
+    engine = attendence.EnhancedAttendanceSystem(journal=True)
+    engine.attach(filename)
+    populate(engine)
+    journal = engine._journal_path(filename)
+    valid_size = os.path.getsize(journal)
+    # A crash in the middle of appending the next entry
+    with open(journal, 'ab') as f:
+        f.write(b'{"seq": 99, "op": "add_student", "args": {"student_id": "S9"')
+    
+    reopened = attendence.EnhancedAttendanceSystem(journal=True)
+    reopened.attach(filename)
+    assert contents(reopened) == contents(engine)
+    assert os.path.getsize(journal) == valid_size
+    
+    # New entries go after the last whole one and are replayed in turn
+    reopened.add_student('S3', 'Cy')
+    again = attendence.EnhancedAttendanceSystem(journal=True)
+    again.load_data(filename)
+    assert contents(again) == contents(reopened)
+
@@ -0,0 +1,61 @@
+import pytest
+
+import attendence
+
+NAMES = {
+    'A10': 'zoe', 'A2': 'Yann', 'A3': 'xavier', 'B1': 'Wanda', 'B20': 'victor',
+    'A\U0001F600': 'Emoji', 'A\U0010FFFF': 'Last', 'A\uffff': 'Bmp',
+}
+
+
+@pytest.fixture(params=['json', 'sqlite'])
+def school(request, tmp_path):
+    engine = attendence.create_attendance_system(request.param, str(tmp_path / 'data.db'))
+    engine.add_course('C1', 'Maths')
+    for student_id, name in NAMES.items():
+        engine.add_student(student_id, name)
+    for student_id in ('A2', 'B1', 'B20'):
+        engine.enroll_student(student_id, 'C1')
+    return engine
+
+
+def test_pages_cover_every_student_once_in_order(school):
+    pages = [school.list_students(page=page, per_page=3) for page in (1, 2, 3, 4)]
+    assert [total for ids, total in pages] == [8] * 4
+    listed = [student_id for ids, total in pages for student_id in ids]
+    assert listed == sorted(NAMES)
+    assert pages[-1][0] == []
+    
+    assert school.list_students(descending=True, per_page=2)[0] == sorted(NAMES)[::-1][:2]
+
+
+def test_sorting_by_name_ignores_case(school):
+    ids, total = school.list_students(sort='name', per_page=100)
+    assert [NAMES[student_id] for student_id in ids] == sorted(NAMES.values(), key=str.lower)
+
+
+@pytest.mark.parametrize('filters, expected', [
+    ({'id_prefix': 'A1'}, ['A10']),
+    ({'id_prefix': 'B'}, ['B1', 'B20']),
+    ({'id_prefix': 'A\U0001F600'}, ['A\U0001F600']),
+    # Prefixes ending in the last code points have no simple successor
+    ({'id_prefix': 'A\uffff'}, ['A\uffff']),
+    ({'id_prefix': 'A\U0010FFFF'}, ['A\U0010FFFF']),
+    ({'name': 'V'}, ['B20']),
+    ({'name': 'w', 'course_id': 'C1'}, ['B1']),
+    ({'id_prefix': 'A', 'sort': 'name'}, ['A\uffff', 'A\U0001F600', 'A\U0010FFFF', 'A3', 'A2', 'A10']),
+    ({'course_id': 'C1', 'descending': True}, ['B20', 'B1', 'A2']),
+    ({'id_prefix': 'Z'}, []),
+])
+def test_prefix_and_course_filters(school, filters, expected):
+    assert school.list_students(**filters) == (expected, len(expected))
+
+
+def test_student_pages_link_to_their_neighbours(make_app):
+    app = make_app()
+    engine = app.extensions['attendance']
+    for i in range(5):
+        engine.add_student(f'P{i}', f'Pupil {i}')
+    page = app.test_client().get('/students?id_prefix=P&per_page=2&page=2').get_data(as_text=True)
+    assert 'P2' in page and 'P3' in page and 'P1' not in page and 'P4' not in page
+    assert 'page=1' in page and 'page=3' in page
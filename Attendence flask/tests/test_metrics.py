@@ -0,0 +1,69 @@
+import os
+
+
+def test_each_app_keeps_its_own_metrics(make_app, tmp_path):
+    timed = make_app()
+    untimed = make_app(ATTENDANCE_METRICS=False, ATTENDANCE_DATA_FILE=str(tmp_path / 'other.json'),
+                       ATTENDANCE_DB=str(tmp_path / 'other.db'))
+    assert timed.extensions['attendance_metrics'] is not untimed.extensions['attendance_metrics']
+    
+    timed.test_client().get('/students')
+    untimed.test_client().get('/students')
+    body = timed.test_client().get('/metrics').get_data(as_text=True)
+    assert 'attendance_http_request_duration_seconds_count{route="/students",method="GET",status="200"} 1' in body
+    assert 'attendance_engine_call_duration_seconds_count{method="list_students"} 1' in body
+    assert 'attendance_http_request_duration_seconds' not in untimed.test_client().get('/metrics').get_data(as_text=True)
+
+
+def scrape(app):
+    """Return the /metrics body as {sample line name with labels: value}, checking the content type."""
+    response = app.test_client().get('/metrics')
+    assert response.status_code == 200
+    assert response.headers['Content-Type'].startswith('text/plain; version=0.0.4')
+    samples = {}
+    for line in response.get_data(as_text=True).splitlines():
+        if not line.startswith('#'):
+            sample, value = line.rsplit(' ', 1)
+            samples[sample] = float(value)
+    return samples
+
+
+def test_scrape_reports_readiness_and_data_sizes(make_app, populate):
+    app = make_app()
+    populate(app.extensions['attendance'])
+    samples = scrape(app)
+    assert samples['attendance_ready'] == 1
+    assert (samples['attendance_students'], samples['attendance_courses'], samples['attendance_marks']) == (2, 2, 4)
+
+
+def test_scrape_skips_data_sizes_while_loading(make_app):
+    app = make_app()
+    app.extensions['attendance'].ready.clear()
+    samples = scrape(app)
+    assert samples['attendance_ready'] == 0
+    assert 'attendance_students' not in samples
+
+
+def test_saves_are_timed_and_counted_by_kind(make_app, populate, tmp_path):
+    app = make_app()
+    engine = populate(app.extensions['attendance'])
+    journal = engine._journal_path(str(tmp_path / 'data.json'))
+    assert scrape(app)['attendance_save_bytes_total{kind="journal"}'] == os.path.getsize(journal)
+    
+    engine.compact(str(tmp_path / 'data.json'))
+    samples = scrape(app)
+    assert samples['attendance_save_duration_seconds_count{kind="snapshot"}'] >= 1
+    assert samples['attendance_save_bytes_total{kind="snapshot"}'] >= (tmp_path / 'data.json').stat().st_size
+
+
+def test_each_metric_is_described_once(make_app):
+    app = make_app()
+    app.test_client().get('/students')
+    app.test_client().get('/students?page=2')
+    body = app.test_client().get('/metrics').get_data(as_text=True)
+    assert body.count('# HELP attendance_http_request_duration_seconds ') == 1
+    assert '# TYPE attendance_http_request_duration_seconds histogram' in body
+    assert '# TYPE attendance_ready gauge' in body
+    buckets = [line for line in body.splitlines()
+               if line.startswith('attendance_http_request_duration_seconds_bucket{route="/students"')]
+    assert buckets[-1].startswith('attendance_http_request_duration_seconds_bucket{route="/students",method="GET",status="200",le="+Inf"} 2')
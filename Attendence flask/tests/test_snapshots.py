@@ -0,0 +1,133 @@
+import os
+import sys
+import threading
+
+import pytest
+
+import attendence
+
+
+def crash_writing_shards(monkeypatch, engine, filename):
+    """Compact, failing as the first register shard is written, after the core."""
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+    
+    monkeypatch.setattr(attendence, 'write_binary_snapshot', fail)
+    with pytest.raises(OSError):
+        engine.compact(filename)
+    monkeypatch.undo()
+
+
+def test_sharded_crash_between_core_and_shards_keeps_marks(tmp_path, monkeypatch):
+    filename = str(tmp_path / 'data.shards')
+    engine = attendence.EnhancedAttendanceSystem(journal=True)
+    engine.add_student('S1', 'One')
+    engine.add_student('S2', 'Two')
+    engine.add_course('C1', 'Course')
+    engine.enroll_student('S1', 'C1')
+    engine.compact(filename)
+    
+    engine.mark_attendance('S1', '2025-01-06', 'Late', 'C1')
+    engine.mark_course_attendance('C1', '2025-01-07')
+    engine.unenroll_student('S1', 'C1')
+    engine.enroll_student('S2', 'C1')
+    engine.mark_course_attendance('C1', '2025-01-08', {'S2': 'Absent'})
+    engine.save_data(filename)
+    crash_writing_shards(monkeypatch, engine, filename)
+    
+    reopened = attendence.EnhancedAttendanceSystem(journal=True)
+    reopened.load_data(filename)
+    assert reopened.get_attendance('S1', 'C1')[2] == {'2025-01-06': 'Late', '2025-01-07': 'Present'}
+    assert reopened.get_attendance('S2', 'C1')[2] == {'2025-01-08': 'Absent'}
+    assert reopened.get_course_roster('C1') == ['S2']
+    
+    # Compacting again truncates the journal; the marks must be in the shards by then
+    reopened.compact(filename)
+    again = attendence.EnhancedAttendanceSystem(journal=True)
+    again.load_data(filename)
+    assert again.get_summary('C1') == reopened.get_summary('C1')
+    assert again.get_attendance('S1', 'C1')[2] == {'2025-01-06': 'Late', '2025-01-07': 'Present'}
+
+
+@pytest.mark.parametrize('suffix', ['.json', '.snap', '.shards'])
+def test_snapshot_round_trip(tmp_path, populate, contents, suffix):
+    filename = str(tmp_path / f'data{suffix}')
+    engine = populate(attendence.EnhancedAttendanceSystem(journal=True))
+    engine.compact(filename)
+    
+    reopened = attendence.EnhancedAttendanceSystem(journal=True)
+    assert reopened.load_data(filename)
+    assert contents(reopened) == contents(engine)
+    assert reopened.get_summary('C1') == engine.get_summary('C1')
+
+
+@pytest.mark.parametrize('target', ['data.snap', 'data.shards'])
+def test_convert_snapshot_round_trip(tmp_path, populate, contents, target):
+    source = str(tmp_path / 'data.json')
+    engine = populate(attendence.EnhancedAttendanceSystem(journal=True))
+    engine.compact(source)
+    
+    assert attendence.convert_snapshot(source, str(tmp_path / target))[0]
+    back = str(tmp_path / 'back.json')
+    assert attendence.convert_snapshot(str(tmp_path / target), back)[0]
+    reopened = attendence.EnhancedAttendanceSystem(journal=True)
+    reopened.load_data(back)
+    assert contents(reopened) == contents(engine)
+
+
+def test_sharded_compaction_rewrites_only_changed_registers(tmp_path, populate):
+    filename = str(tmp_path / 'data.shards')
+    engine = populate(attendence.EnhancedAttendanceSystem(journal=True))
+    engine.compact(filename)
+    # Shards are written to a temporary file and renamed over, so a rewritten one has a new inode
+    shards = {name: os.stat(os.path.join(filename, name)).st_ino for name in os.listdir(filename)}
+    
+    engine.mark_attendance('S2', '2025-01-08', 'Present', 'C2')
+    engine.compact(filename)
+    changed = {name for name in os.listdir(filename)
+               if os.stat(os.path.join(filename, name)).st_ino != shards.get(name)}
+    assert changed == {os.path.basename(attendence._shard_path(filename, 'C2'))}
+
+
+
+def call_with_read_in(column, method):
+    """Call a method of a mapped column, having another reader read the column in after the method's first line."""
+    lines = []
+    def trace(frame, event, arg):
+        if event == 'call':
+            return trace if frame.f_code is method.__func__.__code__ else None
+        if event == 'line':
+            lines.append(frame.f_lineno)
+            if len(lines) == 2:
+                reader = threading.Thread(target=column.materialise)
+                reader.start()
+                reader.join()
+        return trace
+    
+    previous = sys.gettrace()
+    sys.settrace(trace)
+    try:
+        return method()
+    finally:
+        sys.settrace(previous)
+
+
+@pytest.mark.parametrize('method', ['__len__', 'counts', 'raw'])
+def test_mapped_column_read_in_by_another_reader_mid_call(tmp_path, method):
+    filename = str(tmp_path / 'data.snap')
+    engine = attendence.EnhancedAttendanceSystem()
+    engine.add_student('S1', 'One')
+    engine.mark_attendance('S1', '2025-01-06', 'Present')
+    engine.mark_attendance('S1', '2025-01-07', 'Late')
+    engine.save_data(filename)
+    expected = {'__len__': 2, 'counts': {'total': 2, 'Present': 1, 'Absent': 0, 'Late': 1, 'Excused': 0}}
+    
+    reopened = attendence.EnhancedAttendanceSystem()
+    reopened.load_data(filename)
+    column = reopened.records['S1'].attendance
+    result = call_with_read_in(column, getattr(column, method))
+    assert column.days.tolist() == [attendence._to_day('2025-01-06'), attendence._to_day('2025-01-07')]
+    if method == 'raw':
+        assert [len(part) for part in result] == [8, 2]
+    else:
+        assert result == expected[method]
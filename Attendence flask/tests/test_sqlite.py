@@ -0,0 +1,100 @@
+import pytest
+
+import attendence
+
+
+@pytest.fixture
+def both(tmp_path, populate):
+    """The same small school in a JSON engine and an SQLite engine."""
+    return [populate(attendence.create_attendance_system(backend, str(tmp_path / 'data.db'), cache_size=0))
+            for backend in ('json', 'sqlite')]
+
+
+
+def answers(engine):
+    """Ask an engine the questions the pages and exports ask."""
+    return [
+        engine.get_courses(),
+        {course_id: engine.get_course_roster(course_id) for course_id in ('C1', 'C2')},
+        engine.get_course_marks('C1', '2025-01-06'),
+        engine.get_attendance('S1'),
+        engine.get_attendance('S2', 'C1', '2025-01-01', '2025-01-31'),
+        engine.get_attendance('S9'),
+        engine.get_attendance_rows('S2'),
+        engine.get_summary(),
+        engine.get_summary('C1'),
+        engine.get_summary(None, '2025-01-07'),
+        engine.summarize_student('S1', 'C1'),
+        engine.list_students(sort='name'),
+        ''.join(engine.iter_attendance_csv()),
+    ]
+
+
+def test_backends_answer_alike(both):
+    json_engine, sqlite_engine = both
+    assert answers(sqlite_engine) == answers(json_engine)
+
+
+def test_backends_accept_and_refuse_the_same_changes(both):
+    changes = [
+        ('add_student', ('S1', 'Again')),
+        ('add_student', ('', 'Nameless')),
+        ('add_course', ('C1', 'Again')),
+        ('enroll_student', ('S1', 'C1')),
+        ('enroll_student', ('S1', 'C9')),
+        ('mark_attendance', ('S9', '2025-01-06', 'Present')),
+        ('mark_attendance', ('S1', '2025-01-06', 'Present', 'C2')),
+        ('mark_course_attendance', ('C1', '2025-01-08', {'S1': 'Late', 'S9': 'Absent'})),
+        ('mark_course_attendance', ('C1', '2025-01-08', {'S1': 'Late'})),
+        ('edit_attendance', ('S2', '2025-01-06', 'Excused', 'C1')),
+        ('edit_attendance', ('S2', '2025-03-01', 'Excused', 'C1')),
+        ('unenroll_student', ('S2', 'C2')),
+        ('unenroll_student', ('S2', 'C2')),
+    ]
+    results = [[getattr(engine, method)(*args) for method, args in changes] for engine in both]
+    assert results[1] == results[0]
+    assert answers(both[1]) == answers(both[0])
+
+
+def test_sqlite_imports_a_json_data_file(tmp_path, both):
+    json_engine = both[0]
+    filename = str(tmp_path / 'data.json')
+    json_engine.save_data(filename)
+    imported = attendence.create_attendance_system('sqlite', str(tmp_path / 'imported.db'))
+    assert imported.load_data(filename)
+    assert answers(imported) == answers(json_engine)
+
+
+def test_impossible_dates_stay_out_of_ranges_on_both_backends(both):
+    for engine in both:
+        for date, status in (('2025-02-28', 'Present'), ('2025-02-30', 'Absent'), ('2025-03-03', 'Late')):
+            assert engine.mark_attendance('S1', date, status, 'C1')[0]
+    json_engine, sqlite_engine = both
+    
+    def results(engine):
+        return [
+            engine.get_attendance('S1', 'C1', '2025-02-01', '2025-03-31'),
+            engine.get_attendance_rows('S1', '2025-02-01'),
+            engine.get_summary('C1', '2025-02-01', '2025-03-31'),
+            engine.get_summary('C1'),
+            engine.get_trends('C1', None, 'month'),
+            engine.get_trends('C1', 'S1', 'week', '2025-02-01'),
+            engine.get_course_grid('C1')[2]['dates'],
+            ''.join(engine.iter_attendance_csv('C1', start_date='2025-02-01')),
+        ]
+    assert '2025-02-30' not in results(json_engine)[0][2]
+    assert results(sqlite_engine) == results(json_engine)
+
+
+def test_json_only_persistence_calls_are_harmless_on_sqlite(tmp_path, populate):
+    engine = populate(attendence.create_attendance_system('sqlite', str(tmp_path / 'data.db')))
+    filename = str(tmp_path / 'data.json')
+    assert engine.save_data(filename)
+    assert engine.flush(filename)
+    assert engine.compact(filename)
+    assert not engine.start_write_behind(filename)[0]
+    assert not engine.archive(filename, before='2025-02-01')[0]
+    engine.stop_write_behind()
+    assert engine.write_behind is None
+    assert engine.get_summary('C1')['S2']['total_days'] == 1
+    assert not (tmp_path / 'data.json').exists()
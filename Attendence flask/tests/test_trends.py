@@ -0,0 +1,77 @@
+import pytest
+
+import attendence
+
+
+@pytest.fixture(params=['json', 'sqlite'])
+def engine(request, tmp_path, populate):
+    engine = populate(attendence.create_attendance_system(request.param, str(tmp_path / 'data.db')))
+    # A Sunday ends the week of the first Maths session; the Monday after starts the next
+    engine.mark_attendance('S1', '2025-01-12', 'Present', 'C1')
+    engine.mark_attendance('S1', '2025-01-13', 'Present')
+    return engine
+
+
+def shape(series):
+    """Reduce a series to (period, total, Present, Absent, Late, Excused) rows."""
+    return [(row['period'], row['total'], row['Present'], row['Absent'], row['Late'], row['Excused'])
+            for row in series]
+
+
+def trends(engine, *args, **kwargs):
+    success, message, series = engine.get_trends(*args, **kwargs)
+    assert success, message
+    return series
+
+
+def test_weeks_start_on_monday(engine):
+    series = trends(engine)
+    assert shape(series) == [
+        ('2025-01-06', 4, 1, 1, 2, 0),
+        ('2025-01-13', 1, 1, 0, 0, 0),
+        ('2025-02-03', 1, 0, 0, 0, 1),
+    ]
+    assert [row['attendance_percentage'] for row in series] == [25.0, 100.0, 0.0]
+
+
+def test_months(engine):
+    assert shape(trends(engine, period='month')) == [('2025-01', 5, 2, 1, 2, 0), ('2025-02', 1, 0, 0, 0, 1)]
+
+
+def test_scopes_and_ranges(engine):
+    assert shape(trends(engine, 'C1')) == [('2025-01-06', 3, 1, 1, 1, 0)]
+    assert shape(trends(engine, student_id='S1')) == [
+        ('2025-01-06', 2, 1, 0, 1, 0), ('2025-01-13', 1, 1, 0, 0, 0), ('2025-02-03', 1, 0, 0, 0, 1)]
+    assert shape(trends(engine, 'C2', 'S2', 'month')) == [('2025-01', 1, 0, 0, 1, 0)]
+    assert shape(trends(engine, start_date='2025-01-07', end_date='2025-01-31')) == [
+        ('2025-01-06', 2, 1, 0, 1, 0), ('2025-01-13', 1, 1, 0, 0, 0)]
+
+
+def test_series_follow_later_marks(engine):
+    trends(engine, 'C1')
+    engine.edit_attendance('S2', '2025-01-06', 'Present', 'C1')
+    assert shape(trends(engine, 'C1')) == [('2025-01-06', 3, 2, 0, 1, 0)]
+
+
+@pytest.mark.parametrize('args, error', [
+    ((None, None, 'year'), "Error: Period must be 'week' or 'month'."),
+    (('C9',), "Error: Course ID C9 not found."),
+    ((None, 'S9'), "Error: Student ID S9 not found."),
+])
+def test_refusals(engine, args, error):
+    assert engine.get_trends(*args) == (False, error, [])
+
+
+def test_trend_routes(make_app, populate):
+    app = make_app()
+    populate(app.extensions['attendance'])
+    client = app.test_client()
+    
+    body = client.get('/api/trends?course_id=C1&period=month').get_json()
+    assert body['period'] == 'month'
+    assert [(row['period'], row['total']) for row in body['series']] == [('2025-01', 2)]
+    assert client.get('/api/trends?period=day').status_code == 400
+    assert client.get('/api/trends?student_id=S9').status_code == 404
+    
+    page = client.get('/trends?period=month').get_data(as_text=True)
+    assert '2025-01' in page and '2025-02' in page
@@ -0,0 +1,66 @@
+import threading
+
+import pytest
+
+import attendence
+
+
+def test_flush_syncs_the_journal_without_holding_the_engine_lock(tmp_path, monkeypatch, populate, contents):
+    filename = str(tmp_path / 'data.json')
+    engine = attendence.EnhancedAttendanceSystem(journal=True)
+    engine.attach(filename)
+    writer = engine.start_write_behind(filename, interval=3600, batch_size=10000)
+    populate(engine)
+    
+    syncing, release = threading.Event(), threading.Event()
+    fsync = attendence.os.fsync
+    def slow_fsync(fd):
+        syncing.set()
+        assert release.wait(10)
+        fsync(fd)
+    monkeypatch.setattr(attendence.os, 'fsync', slow_fsync)
+    results = []
+    def use():
+        results.append(engine.get_attendance('S1', 'C1')[0])
+        results.append(engine.mark_attendance('S2', '2025-02-04', 'Present', 'C1')[0])
+    user = threading.Thread(target=use)
+    flusher = threading.Thread(target=writer.flush)
+    flusher.start()
+    try:
+        assert syncing.wait(10)
+        # Both sides of the engine lock are free while the disk catches up
+        user.start()
+        user.join(5)
+        assert results == [True, True]
+    finally:
+        release.set()
+        flusher.join()
+    user.join()
+    monkeypatch.undo()
+    
+    engine.stop_write_behind()
+    reopened = attendence.EnhancedAttendanceSystem(journal=True)
+    reopened.load_data(filename)
+    assert contents(reopened) == contents(engine)
+
+
+def test_failed_flush_keeps_the_changes_queued(tmp_path, monkeypatch, populate, contents):
+    filename = str(tmp_path / 'data.json')
+    engine = attendence.EnhancedAttendanceSystem(journal=True)
+    engine.attach(filename)
+    writer = engine.start_write_behind(filename, interval=3600, batch_size=10000)
+    populate(engine)
+    
+    def full(filename, entries):
+        raise OSError("disk full")
+    monkeypatch.setattr(engine, '_append_journal', full)
+    with pytest.raises(OSError):
+        writer.flush()
+    monkeypatch.undo()
+    assert writer.pending()
+    engine.mark_attendance('S2', '2025-02-04', 'Present', 'C1')
+    
+    engine.stop_write_behind()
+    reopened = attendence.EnhancedAttendanceSystem(journal=True)
+    reopened.load_data(filename)
+    assert contents(reopened) == contents(engine)